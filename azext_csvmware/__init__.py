@@ -6,8 +6,6 @@
 
 from azure.cli.core import AzCommandsLoader
 
-from azext_csvmware._help import helps  # pylint: disable=unused-import
-
 
 class VmwareCsCommandsLoader(AzCommandsLoader):
     """
@@ -21,13 +19,17 @@ class VmwareCsCommandsLoader(AzCommandsLoader):
                                                      custom_command_type=vmware_cs_custom)
 
     def load_command_table(self, args):
+        # The help entries are only registered once the command table of the extension is needed.
+        from azext_csvmware._help import helps  # pylint: disable=unused-import
         from azext_csvmware.commands import load_command_table
         load_command_table(self, args)
         return self.command_table
 
     def load_arguments(self, command):
         from azext_csvmware._params import load_arguments
+        from azext_csvmware._profiling import register
         load_arguments(self, command)
+        register(self.cli_ctx)
 
 
 COMMAND_LOADER_CLS = VmwareCsCommandsLoader
@@ -0,0 +1,83 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains helpers for commands which operate on many resources at once.
+"""
+
+from knack.util import CLIError
+
+from ._config import THROTTLE_MAX_CONCURRENCY
+
+
+def run_in_parallel(func, items, max_parallel=None):
+    """
+    Calls func on every item, using a bounded pool of worker threads.
+    Without max_parallel, the number of requests in flight is left to the client-side throttling of the subscription.
+    Returns a list of (item, result, error) tuples, in the same order as items.
+    An exception raised for one item is captured in its tuple and does not affect the others.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from ._profiling import bind
+
+    items = list(items)
+    if not items:
+        return []
+    workers = min(int(max_parallel or THROTTLE_MAX_CONCURRENCY), len(items))
+
+    def _call(item):
+        try:
+            return item, func(item), None
+        except Exception as ex:  # pylint: disable=broad-except
+            return item, None, ex
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(bind(_call), items))
+
+
+def wait_for_results(client, started, timeout=None):
+    """
+    Waits for the long running operations started by a bulk command, and records their outcome in the results.
+    started is a list of (result, raw response) tuples, the requests having been sent with raw=True and polling=False.
+    All the operations are tracked by a single polling loop.
+    """
+    from ._polling import operation_from_response, operation_error, wait_for_operations
+    from ._profiling import span
+
+    tracked = []
+    for (result, raw_result) in started:
+        operation = operation_from_response(raw_result)
+        if operation is None:
+            result['status'] = 'Succeeded'
+        else:
+            tracked.append((result, operation))
+
+    with span('wait for operations', operations=len(tracked)):
+        outcomes = wait_for_operations(client, [operation for (_, operation) in tracked], timeout)
+    for ((result, _), (operation, error)) in zip(tracked, outcomes):
+        message = error_message(error) if error is not None else operation_error(operation)
+        if message:
+            result['status'] = 'Failed'
+            result['error'] = message
+        else:
+            result['status'] = 'Succeeded'
+
+
+def error_message(error):
+    """
+    Extracts a readable message from an exception raised by the SDK.
+    """
+    message = getattr(error, 'message', None)
+    return message or str(error)
+
+
+def check_accepted(results):
+    """
+    The output of a command run with --no-wait is discarded.
+    Hence the resources whose request could not be sent are reported as an error instead.
+    """
+    failed = [result for result in results if result['status'] == 'Failed']
+    if failed:
+        raise CLIError('; '.join(result['name'] + ': ' + result['error'] for result in failed) +
+                       '. The requests for the other resources were accepted.')
@@ -0,0 +1,133 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains an on-disk cache of the locations of resource groups, which saves a round trip to ARM
+whenever --location is omitted. A location is kept for RG_LOCATION_CACHE_TTL seconds. It can become stale
+before that, when the resource group is deleted and created again in another region: the entry is then
+dropped when a create in the cached location fails (see refresh_stale_location).
+"""
+
+import json
+import os
+import threading
+
+from knack.log import get_logger
+
+from ._config import RG_LOCATION_CACHE_FILE, RG_LOCATION_CACHE_TTL, RG_LOCATION_ERROR_CODES
+
+logger = get_logger(__name__)
+
+_lock = threading.Lock()
+
+# The locations served from the cache by this process, by key.
+_served = {}
+
+
+def _cache_path(cli_ctx):
+    return os.path.join(cli_ctx.config.config_dir, RG_LOCATION_CACHE_FILE)
+
+
+def _load(path):
+    try:
+        with open(path, 'r') as cache_file:
+            entries = json.load(cache_file)
+        return entries if isinstance(entries, dict) else {}
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _save(path, entries):
+    # The file is replaced atomically, so that concurrent az processes never read a partial file.
+    temp_path = path + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temp_path, 'w') as cache_file:
+            json.dump(entries, cache_file)
+        # os.replace is not available on Python 2, where os.rename is atomic on POSIX only.
+        getattr(os, 'replace', os.rename)(temp_path, path)
+    except (IOError, OSError) as ex:
+        logger.debug("Unable to write the resource group location cache: %s", ex)
+
+
+def _key(cli_ctx, resource_group_name):
+    from azure.cli.core.commands.client_factory import get_subscription_id
+
+    return (get_subscription_id(cli_ctx) + '/' + resource_group_name).lower()
+
+
+def get_resource_group_location(cli_ctx, resource_group_name, refresh=False):
+    """
+    Returns the location of a resource group, from the cache if possible.
+    If refresh is True, the location is read from ARM and the cache is updated.
+    """
+    import time
+    from ._client_factory import cf_resource_groups
+
+    key = _key(cli_ctx, resource_group_name)
+    path = _cache_path(cli_ctx)
+    now = time.time()
+
+    if not refresh:
+        with _lock:
+            entry = _load(path).get(key)
+        if entry and entry.get('expires', 0) > now:
+            logger.debug("Location of resource group %s read from the cache.", resource_group_name)
+            _served[key] = entry['location']
+            return entry['location']
+
+    location = cf_resource_groups(cli_ctx).get(resource_group_name).location
+
+    with _lock:
+        entries = {k: v for k, v in _load(path).items() if v.get('expires', 0) > now}
+        entries[key] = {'location': location, 'expires': now + RG_LOCATION_CACHE_TTL}
+        _save(path, entries)
+    return location
+
+
+def is_location_error(ex):
+    """
+    Returns True if a request failed with one of RG_LOCATION_ERROR_CODES,
+    as if the resource group, or the resources, were not in its region.
+    """
+    response = getattr(ex, 'response', None)
+    if response is None:
+        return False
+    try:
+        code = response.json()['error']['code']
+    except (ValueError, TypeError, KeyError):
+        code = None
+    return code in RG_LOCATION_ERROR_CODES
+
+
+def forget_resource_group_location(cli_ctx, resource_group_name):
+    """
+    Drops the cached location of a resource group.
+    Returns the location this process served from the cache for it, or None.
+    """
+    key = _key(cli_ctx, resource_group_name)
+    path = _cache_path(cli_ctx)
+    with _lock:
+        entries = _load(path)
+        if entries.pop(key, None) is not None:
+            _save(path, entries)
+        return _served.pop(key, None)
+
+
+def refresh_stale_location(cli_ctx, resource_group_name, location):
+    """
+    Drops the cached location of a resource group, after a request in location failed with a location error.
+    Returns the location read again from ARM if location was served from the cache and the resource group
+    is now in another region, else None.
+    """
+    from msrestazure.azure_exceptions import CloudError
+
+    served = forget_resource_group_location(cli_ctx, resource_group_name)
+    if served is None or served.lower() != (location or '').lower():
+        return None
+    try:
+        fresh = get_resource_group_location(cli_ctx, resource_group_name, refresh=True)
+    except CloudError as ex:
+        logger.debug("Unable to read the location of resource group %s: %s", resource_group_name, ex)
+        return None
+    return fresh if fresh.lower() != served.lower() else None
@@ -5,12 +5,78 @@
 
 """
 Contains client factory methods used for generating SDK clients.
+The VMwareCloudSimple clients are kept in a registry, by CLI context, subscription and account, so that all
+the factories, validators and threads of an invocation, and the invocations of a long-lived process, share
+a client and its pool of keep-alive connections.
+The requests of every msrest client go through the client-side throttling of its subscription.
 """
 
+import threading
+from weakref import WeakKeyDictionary
 
-def cf_vmware_cs(cli_ctx, *_):
+_clients = WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _account_key(cli_ctx, subscription_id=None):
+    """
+    Identifies the subscription, and the account whose credentials are used for it.
+    The key is memoized in cli_ctx.data, next to the subscription id az memoizes there,
+    so that the profile is read from disk once per subscription and not for every client.
+    """
+    from azure.cli.core._profile import Profile
+
+    keys = cli_ctx.data.setdefault('csvmware_account_keys', {})
+    key = keys.get(subscription_id)
+    if key is None:
+        account = Profile(cli_ctx=cli_ctx).get_subscription(subscription_id)
+        key = keys[subscription_id] = (cli_ctx.cloud.name, account['id'].lower(), account['tenantId'].lower(),
+                                       account['user']['name'].lower(), account['user']['type'])
+    return key
+
+
+def _refresh_headers(cli_ctx, client):
+    """
+    Sets the headers which az sets on a new client, and which change with every invocation,
+    such as x-ms-client-request-id and CommandName.
+    """
+    headers = client.config.headers
+    headers.update(cli_ctx.data['headers'])
+    command_name_suffix = ';completer-request' if cli_ctx.data['completer_active'] else ''
+    headers['CommandName'] = '{}{}'.format(cli_ctx.data['command'], command_name_suffix)
+    if cli_ctx.data.get('safe_params'):
+        headers['ParameterSetName'] = ' '.join(cli_ctx.data['safe_params'])
+    else:
+        headers.pop('ParameterSetName', None)
+    client.config.generate_client_request_id = 'x-ms-client-request-id' not in cli_ctx.data['headers']
+
+
+def _shared_client(cli_ctx, key, factory):
     """
-    Generic client factory
+    Returns the client registered for cli_ctx and key, creating it with factory on first use.
+    The client keeps its connections open, for as long as cli_ctx is alive.
+    Only the vendored VMwareCloudSimpleClient is registered: the headers of a shared client are refreshed
+    through its msrest config, which the track 2 clients of az do not have.
+    """
+    from ._instrumentation import instrument
+    from ._throttling import throttle
+
+    with _lock:
+        clients = _clients.setdefault(cli_ctx, {})
+        client = clients.get(key)
+        if client is None:
+            client = instrument(throttle(factory()))
+            client.config.keep_alive = True
+            clients[key] = client
+            return client
+    _refresh_headers(cli_ctx, client)
+    return client
+
+
+def cf_vmware_cs(cli_ctx, *_, **kwargs):
+    """
+    Generic client factory.
+    The client is created for the current subscription, unless a subscription_id is passed.
     """
     from azure.cli.core.commands.client_factory import get_mgmt_service_client
 
@@ -19,9 +85,12 @@ def cf_vmware_cs(cli_ctx, *_):
     from azext_csvmware.vendored_sdks import VMwareCloudSimpleClient
 
     from ._config import REFERER
-    return get_mgmt_service_client(cli_ctx,
-                                   VMwareCloudSimpleClient,
-                                   referer=REFERER)
+    subscription_id = kwargs.get('subscription_id')
+    return _shared_client(cli_ctx, ('csvmware',) + _account_key(cli_ctx, subscription_id),
+                          lambda: get_mgmt_service_client(cli_ctx,
+                                                          VMwareCloudSimpleClient,
+                                                          subscription_id=subscription_id,
+                                                          referer=REFERER))
 
 
 def cf_private_cloud(cli_ctx, *_):
@@ -59,13 +128,24 @@ def cf_virtual_machine(cli_ctx, *_):
     return cf_vmware_cs(cli_ctx).virtual_machines
 
 
+def cf_operations(cli_ctx, *_):
+    """
+    Client factory for async operations
+    """
+    return cf_vmware_cs(cli_ctx).operations
+
+
 def _resource_client_factory(cli_ctx, **_):
     """
-    Client factory for resource client
+    Client factory for resource client.
+    The client is not shared: its type depends on the version of az, and is a track 2 client on recent ones.
     """
     from azure.cli.core.commands.client_factory import get_mgmt_service_client
     from azure.cli.core.profiles import ResourceType
-    return get_mgmt_service_client(cli_ctx, ResourceType.MGMT_RESOURCE_RESOURCES)
+
+    from ._instrumentation import instrument
+    from ._throttling import throttle
+    return instrument(throttle(get_mgmt_service_client(cli_ctx, ResourceType.MGMT_RESOURCE_RESOURCES)))
 
 
 def cf_resource_groups(cli_ctx, *_):
@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains compact records, which keep only some fields of the items of a list,
+for listings of thousands of virtual machines.
+A record is a namedtuple: it has no __dict__ and no additional_properties, and nested models
+that are not output, such as the disks and controllers of a virtual machine, are never built.
+The fields of a record are named like the keys of the JSON output of the full model.
+"""
+
+from collections import namedtuple
+
+from knack.util import CLIError, to_camel_case
+
+from ._fast_deserializer import compile_fields, dict_converter, extract, fast_pages, list_converter
+
+_record_types = {}
+
+
+def _normalize(name):
+    return name.replace('_', '').lower()
+
+
+def _field_tree(fields):
+    """
+    Turns dotted field paths, e.g. ['name', 'nics.network.name'], into a tree of dicts.
+    None stands for a whole value.
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for part in parts[:-1]:
+            if node.get(part, {}) is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _record_type(model_name, names):
+    key = (model_name, names)
+    if key not in _record_types:
+        _record_types[key] = namedtuple(model_name + 'Record', names)
+    return _record_types[key]
+
+
+class _CompactModel(object):
+    """
+    Builds the records of a model, from JSON data or from a model built by msrest.
+    """
+
+    def __init__(self, data_type, tree, dependencies):
+        model_type = dependencies[data_type]
+        attribute_map = model_type._attribute_map  # pylint: disable=protected-access
+        by_name = {}
+        for (attr, attr_desc) in attribute_map.items():
+            by_name[_normalize(attr)] = attr
+            by_name[_normalize(attr_desc['key'].split('.')[-1])] = attr
+        all_fields = {field[0]: field for field in compile_fields(model_type, dependencies)[0]}
+
+        self._data_type = data_type
+        self._fields = []
+        self._nested = {}
+        selected = {}
+        for (name, subtree) in tree.items():
+            attr = by_name.get(_normalize(name))
+            if attr is None:
+                raise CLIError("'{}' is not a field of {}. Valid fields: {}".format(
+                    name, data_type, ', '.join(sorted(to_camel_case(a) for a in attribute_map))))
+            # The same attribute may be named twice, e.g. guestOs and guest_os. A whole value wins.
+            if attr in selected and (selected[attr] is None or subtree is not None):
+                continue
+            selected[attr] = subtree
+        for (attr, subtree) in selected.items():
+            field = all_fields[attr]
+            if subtree is not None:
+                field = self._compile_nested(attr, attribute_map[attr]['type'], subtree, dependencies, field)
+            self._fields.append(field)
+        self._attrs = [field[0] for field in self._fields]
+        self.record_type = _record_type(model_type.__name__, tuple(to_camel_case(attr) for attr in self._attrs))
+
+    def _compile_nested(self, attr, attr_type, subtree, dependencies, field):
+        item_type = attr_type.strip('[]{}')
+        if not hasattr(dependencies.get(item_type), '_attribute_map'):
+            raise CLIError("'{}' of {} has no fields.".format(to_camel_case(attr), self._data_type))
+        nested = _CompactModel(item_type, subtree, dependencies)
+        convert = nested.from_data
+        if attr_type.startswith('['):
+            convert = list_converter(attr_type, convert)
+        elif attr_type.startswith('{'):
+            convert = dict_converter(attr_type, convert)
+        self._nested[attr] = (attr_type[0], nested)
+        return (field[0], field[1], field[2], convert)
+
+    def from_data(self, data, deserializer):
+        if type(data) is not dict:  # pylint: disable=unidiomatic-typecheck
+            return self.from_model(deserializer.deserialize_data(data, self._data_type))
+        try:
+            attrs = extract(self._fields, data, deserializer)
+        except (AttributeError, TypeError):
+            return self.from_model(deserializer.deserialize_data(data, self._data_type))
+        return self.record_type._make([attrs[attr] for attr in self._attrs])
+
+    def from_model(self, model):
+        if model is None:
+            return None
+        values = []
+        for attr in self._attrs:
+            value = getattr(model, attr, None)
+            if attr in self._nested and value is not None:
+                (container, nested) = self._nested[attr]
+                if container == '[':
+                    value = [nested.from_model(item) for item in value]
+                elif container == '{':
+                    value = {key: nested.from_model(item) for (key, item) in value.items()}
+                else:
+                    value = nested.from_model(value)
+            values.append(value)
+        return self.record_type._make(values)
+
+
+def compact_pages(paged, fields):
+    """
+    Makes a Paged object return records with only the given fields, instead of models.
+    fields are dotted paths, e.g. ['name', 'nics.network.name'], named after the attributes
+    or the JSON keys of the model. Returns the Paged object.
+    """
+    dependencies = paged._derserializer.dependencies  # pylint: disable=protected-access
+    item_type = paged._attribute_map['current_page']['type'].strip('[]')  # pylint: disable=protected-access
+    return fast_pages(paged, _CompactModel(item_type, _field_tree(fields), dependencies).from_data)
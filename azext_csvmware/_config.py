@@ -9,3 +9,79 @@ General config information.
 
 PATH_CHAR = "/"
 REFERER = "https://management.azure.com/"
+
+# Number of requests a subscription starts with in flight. The client-side throttling (_throttling.py)
+# then grows or shrinks it, up to THROTTLE_MAX_CONCURRENCY, the number of workers of a bulk command.
+DEFAULT_MAX_PARALLEL = 10
+THROTTLE_MAX_CONCURRENCY = 32
+
+# Token buckets of the client-side throttling, per subscription and kind of request: (capacity, tokens per second).
+# These mirror the limits of Azure Resource Manager.
+THROTTLE_BUCKETS = {'reads': (250, 25), 'writes': (200, 10), 'deletes': (200, 10)}
+# Number of times a throttled request (HTTP 429) is sent again, and the delay in seconds
+# when the response has no Retry-After header.
+THROTTLE_MAX_RETRIES = 5
+THROTTLE_RETRY_AFTER = 10
+# A request slower than this many times the average latency, and than the floor in seconds,
+# is a sign of congestion which shrinks the number of requests in flight.
+THROTTLE_LATENCY_FACTOR = 4
+THROTTLE_LATENCY_FLOOR = 2
+
+# Number of times a VM update that lost a race (HTTP 412, or a VM changed since it was read) is re-applied,
+# and the base delay in seconds of the exponential backoff between attempts.
+VM_UPDATE_MAX_RETRIES = 5
+VM_UPDATE_RETRY_BACKOFF = 1
+
+# Long running operations started by bulk commands are tracked by a single polling loop.
+# The interval (seconds) is used when the service does not send a Retry-After header.
+OPERATION_POLL_INTERVAL = 10
+OPERATION_POLL_MAX_PARALLEL = 4
+OPERATION_POLL_RATE = 20
+# A poll which fails with a transient error (connection error, HTTP 429 or 5xx) is sent again, at most
+# OPERATION_POLL_MAX_ERRORS times in a row, with an exponential backoff starting at OPERATION_POLL_RETRY_BACKOFF seconds.
+OPERATION_POLL_MAX_ERRORS = 5
+OPERATION_POLL_RETRY_BACKOFF = 2
+
+# On-disk cache of resource group locations, kept in the az configuration directory.
+RG_LOCATION_CACHE_FILE = "csvmware_rg_locations.json"
+RG_LOCATION_CACHE_TTL = 24 * 60 * 60
+# Error codes of a create which suggest that the cached location of the resource group is stale.
+# A missing resource (ResourceNotFound, NotFound) says nothing about the location of its group.
+RG_LOCATION_ERROR_CODES = ["ResourceGroupNotFound", "InvalidResourceLocation", "LocationNotAvailableForResourceType",
+                           "LocationNotAvailableForResourceGroup"]
+
+# Local inventory snapshot (csvmware inventory sync), kept in the az configuration directory.
+# The version is bumped whenever the tables change, which drops the snapshots of older versions.
+INVENTORY_FILE = "csvmware_inventory.db"
+INVENTORY_SCHEMA_VERSION = 4
+# Number of syncs of a subscription whose change sets are kept in the inventory.
+INVENTORY_CHANGE_SETS = 50
+# Number of rows of the inventory per page of the commands served from it (--offline, --max-staleness).
+INVENTORY_PAGE_SIZE = 1000
+# Seconds after which an incremental sync lists the virtual networks and templates of a private cloud again,
+# even if neither the private cloud nor its resource pools changed.
+INVENTORY_SUBTREE_MAX_AGE = 24 * 3600
+
+# Local latency history of the commands (csvmware perf report), kept in the az configuration directory.
+# Only the last PERF_HISTORY_MAX_RECORDS commands are kept.
+PERF_HISTORY_FILE = "csvmware_perf_history.db"
+PERF_HISTORY_SCHEMA_VERSION = 1
+PERF_HISTORY_MAX_RECORDS = 10000
+
+# Choices of the enum arguments. These mirror StopMode, NICType and DiskIndependenceMode
+# of the SDK models, so that loading the arguments does not import the models.
+STOP_MODES = ["reboot", "suspend", "shutdown", "poweroff"]
+NIC_TYPES = ["E1000", "E1000E", "PCNET32", "VMXNET", "VMXNET2", "VMXNET3"]
+DISK_INDEPENDENCE_MODES = ["persistent", "independent_persistent", "independent_nonpersistent"]
+
+# Formats of the streaming output of the list commands (--stream).
+STREAM_FORMATS = ["jsonl", "table"]
+
+# Number of pages of a list requested ahead of the one being output (--prefetch-depth). 0 disables prefetching.
+DEFAULT_PREFETCH_DEPTH = 2
+
+# Section of the az configuration holding the options of the extension, e.g. the tracing options
+# trace_file and trace_exporter, also read from the AZURE_CSVMWARE_TRACE_FILE and AZURE_CSVMWARE_TRACE_EXPORTER
+# environment variables, and the latency history options perf_history and perf_history_file.
+CONFIG_SECTION = "csvmware"
+TRACE_SERVICE_NAME = "azure-cli-csvmware"
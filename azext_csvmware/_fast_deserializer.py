@@ -0,0 +1,257 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains a fast path for the deserialization of list pages, such as VirtualMachinePaged.
+msrest's Deserializer walks the _attribute_map of the model, and of every nested model
+(VirtualNic, VirtualNetwork, VirtualDisk, VirtualDiskController, ResourcePool...), for every item of every page.
+Here each attribute map is compiled once into a list of extractors and converters.
+Values of an unexpected type, and models that cannot be compiled, are handed over to msrest,
+so that the objects built are the same as the ones msrest builds.
+"""
+
+import threading
+from enum import Enum
+
+from msrest.serialization import Deserializer, _FLATTEN, _decode_attribute_map_key
+
+from ._profiling import span
+
+# Basic types whose values are kept as they are when they already have the right type.
+_BASIC_TYPES = {
+    'str': (str, type(u'')),
+    'int': (int,),
+    'bool': (bool,),
+    'float': (float,),
+}
+
+# Compiled converters, by data type. None for a model which is being compiled.
+_converters = {}
+_lock = threading.RLock()
+
+
+class _NotCompilable(Exception):
+    pass
+
+
+def _fallback_converter(data_type):
+    def _convert(value, deserializer):
+        return deserializer.deserialize_data(value, data_type)
+    return _convert
+
+
+def _basic_converter(data_type):
+    types = _BASIC_TYPES[data_type]
+
+    def _convert(value, deserializer):
+        if type(value) in types:  # pylint: disable=unidiomatic-typecheck
+            return value
+        return deserializer.deserialize_data(value, data_type)
+    return _convert
+
+
+def _enum_converter(data_type, enum_type):
+    members = {member.value: member for member in enum_type}
+
+    def _convert(value, deserializer):
+        try:
+            return members[value]
+        except (KeyError, TypeError):
+            return deserializer.deserialize_data(value, data_type)
+    return _convert
+
+
+def list_converter(data_type, convert_item):
+    def _convert(value, deserializer):
+        if type(value) is not list:  # pylint: disable=unidiomatic-typecheck
+            return deserializer.deserialize_data(value, data_type)
+        return [None if item is None else convert_item(item, deserializer) for item in value]
+    return _convert
+
+
+def dict_converter(data_type, convert_item):
+    def _convert(value, deserializer):
+        if type(value) is not dict:  # pylint: disable=unidiomatic-typecheck
+            return deserializer.deserialize_data(value, data_type)
+        return {key: None if item is None else convert_item(item, deserializer) for (key, item) in value.items()}
+    return _convert
+
+
+def compile_fields(model_type, dependencies):
+    """
+    Returns the (attribute, outer key, inner key, converter) tuples of a model,
+    and the keys of the JSON objects that the model knows.
+    inner key is None, unless the attribute is flattened, e.g. properties.amountOfRam.
+    """
+    fields = []
+    known_keys = set()
+    for (attr, attr_desc) in model_type._attribute_map.items():  # pylint: disable=protected-access
+        if attr_desc['key'] == '':
+            raise _NotCompilable()
+        keys = [_decode_attribute_map_key(key) for key in _FLATTEN.split(attr_desc['key'])]
+        if len(keys) > 2:
+            raise _NotCompilable()
+        known_keys.add(keys[0])
+        fields.append((attr, keys[0], keys[1] if len(keys) == 2 else None,
+                       _compile(attr_desc['type'], dependencies)))
+    return fields, known_keys
+
+
+def _constructor_is_plain(model_type, readonly):
+    """
+    Whether the model constructor only stores its arguments, so that it can be skipped.
+    """
+    values = {attr: object() for attr in model_type._attribute_map}  # pylint: disable=protected-access
+    try:
+        instance = model_type(**{attr: value for (attr, value) in values.items() if attr not in readonly})
+    except Exception:  # pylint: disable=broad-except
+        return False
+    expected = set(values) | {'additional_properties'}
+    if set(instance.__dict__) != expected or instance.additional_properties != {}:
+        return False
+    return all(instance.__dict__[attr] is value for (attr, value) in values.items() if attr not in readonly)
+
+
+def _model_converter(data_type, model_type, dependencies):
+    validation = model_type._validation  # pylint: disable=protected-access
+    subtype_map = model_type._subtype_map  # pylint: disable=protected-access
+    if subtype_map or any(v.get('constant') for v in validation.values()):
+        raise _NotCompilable()
+    readonly = set(attr for (attr, v) in validation.items() if v.get('readonly'))
+    fields, known_keys = compile_fields(model_type, dependencies)
+    plain = _constructor_is_plain(model_type, readonly)
+
+    def _convert(data, deserializer):
+        if type(data) is not dict:  # pylint: disable=unidiomatic-typecheck
+            return deserializer.deserialize_data(data, data_type)
+        try:
+            attrs = extract(fields, data, deserializer)
+        except (AttributeError, TypeError):
+            return deserializer.deserialize_data(data, data_type)
+        additional_properties = None
+        if not known_keys.issuperset(data):
+            additional_properties = {key: value for (key, value) in data.items() if key not in known_keys}
+        if plain:
+            model = model_type.__new__(model_type)
+            model.__dict__.update(attrs)
+        else:
+            model = model_type(**{attr: value for (attr, value) in attrs.items() if attr not in readonly})
+            for attr in readonly:
+                setattr(model, attr, attrs[attr])
+        model.additional_properties = additional_properties or {}
+        return model
+    return _convert
+
+
+def extract(fields, data, deserializer):
+    attrs = {}
+    for (attr, key, inner_key, convert) in fields:
+        if inner_key is None:
+            value = data.get(key)
+        else:
+            # Same lookup as msrest's rest_key_extractor, which falls back to data if the key is missing.
+            nested = data.get(key, data)
+            value = None if nested is None else nested.get(inner_key)
+        attrs[attr] = None if value is None else convert(value, deserializer)
+    return attrs
+
+
+def _compile(data_type, dependencies):
+    """
+    Returns the converter of a data type: a function of the value and of the msrest Deserializer to fall back on.
+    """
+    converter = _converters.get(data_type)
+    if converter is not None:
+        return converter
+    with _lock:
+        return _compile_locked(data_type, dependencies)
+
+
+def _compile_locked(data_type, dependencies):
+    converter = _converters.get(data_type)
+    if converter is not None:
+        return converter
+    if data_type in _converters:
+        # A recursive model. The inner occurrences are left to msrest.
+        return _fallback_converter(data_type)
+
+    if data_type in _BASIC_TYPES:
+        converter = _basic_converter(data_type)
+    elif len(data_type) > 2 and data_type[0] + data_type[-1] == '[]':
+        converter = list_converter(data_type, _compile(data_type[1:-1], dependencies))
+    elif len(data_type) > 2 and data_type[0] + data_type[-1] == '{}':
+        converter = dict_converter(data_type, _compile(data_type[1:-1], dependencies))
+    elif isinstance(dependencies.get(data_type), type) and issubclass(dependencies[data_type], Enum):
+        converter = _enum_converter(data_type, dependencies[data_type])
+    elif hasattr(dependencies.get(data_type), '_attribute_map'):
+        _converters[data_type] = None
+        try:
+            converter = _model_converter(data_type, dependencies[data_type], dependencies)
+        except _NotCompilable:
+            converter = _fallback_converter(data_type)
+        finally:
+            del _converters[data_type]
+    else:
+        # Dates, durations, objects, and whatever else msrest knows how to deserialize.
+        converter = _fallback_converter(data_type)
+    _converters[data_type] = converter
+    return converter
+
+
+def deserialize(deserializer, data_type, data):
+    """
+    Deserializes data, already decoded from JSON, to data_type.
+    Returns the same as deserializer.deserialize_data(data, data_type), faster.
+    """
+    if data is None:
+        return None
+    return _compile(data_type, deserializer.dependencies)(data, deserializer)
+
+
+class _PageDeserializer(object):  # pylint: disable=too-few-public-methods
+    """
+    Replaces the msrest Deserializer of a Paged object, which it calls for the responses it cannot handle.
+    """
+
+    def __init__(self, deserializer, convert_item=None):
+        self._deserializer = deserializer
+        self._convert_item = convert_item
+        self._fields = None
+
+    def _compile(self, paged_type):
+        fields = compile_fields(paged_type, self._deserializer.dependencies)[0]
+        if self._convert_item is not None:
+            page_type = paged_type._attribute_map['current_page']['type']  # pylint: disable=protected-access
+            fields = [(attr, key, inner_key, list_converter(page_type, self._convert_item))
+                      if attr == 'current_page' else (attr, key, inner_key, convert)
+                      for (attr, key, inner_key, convert) in fields]
+        return fields
+
+    def __call__(self, paged, response):
+        with span('deserialize ' + type(paged).__name__):
+            return self._deserialize(paged, response)
+
+    def _deserialize(self, paged, response):
+        data = Deserializer._unpack_content(response)  # pylint: disable=protected-access
+        if type(data) is not dict:  # pylint: disable=unidiomatic-typecheck
+            return self._deserializer(paged, response)
+        if self._fields is None:
+            self._fields = self._compile(type(paged))
+        try:
+            attrs = extract(self._fields, data, self._deserializer)
+        except (AttributeError, TypeError):
+            return self._deserializer(paged, response)
+        for (attr, value) in attrs.items():
+            setattr(paged, attr, value)
+        return paged
+
+
+def fast_pages(paged, convert_item=None):
+    """
+    Makes a Paged object, such as the VirtualMachinePaged returned by virtual_machines.list_by_subscription,
+    deserialize its pages with the fast path. Returns the Paged object.
+    convert_item(data, deserializer), if given, replaces the conversion of the items of the pages to models.
+    """
+    paged._derserializer = _PageDeserializer(paged._derserializer, convert_item)  # pylint: disable=protected-access
+    return paged
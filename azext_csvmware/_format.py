@@ -7,6 +7,11 @@ This file contains table transformer functions.
 These are called if the output mode is set to table in any command.
 """
 
+# The fields of a virtual machine read by transform_vm_table_output, the ones kept by vm list --compact.
+VM_TABLE_FIELDS = ['id', 'name', 'status', 'guestOs', 'location', 'numberOfCores', 'amountOfRam',
+                   'publicIp', 'dnsname', 'resourcePool.fullName', 'folder', 'vmwaretools',
+                   'nics.ipAddresses', 'nics.network.name']
+
 
 def transform_vm_table_output(result):
     """
@@ -56,6 +61,29 @@ def transform_vm_table_output(result):
 
 def transform_vm_table_list(vm_list):
     """
-    For list output
+    For list output.
+    The virtual machines listed with only some fields (vm list --fields) are shown as they are.
     """
+    table_keys = set(field.split('.')[0] for field in VM_TABLE_FIELDS)
+    if vm_list and not table_keys.issubset(vm_list[0]):
+        return vm_list
     return [transform_vm_table_output(v) for v in vm_list]
+
+
+def transform_perf_report_table(report):
+    """
+    For perf report output, in the order of the fields.
+    """
+    from collections import OrderedDict
+
+    return [OrderedDict([('Operation', row['operation']),
+                         ('Location', row['location']),
+                         ('Window start', row['windowStart']),
+                         ('Count', row['count']),
+                         ('Failed', row['failed']),
+                         ('p50 (s)', row['p50']),
+                         ('p95 (s)', row['p95']),
+                         ('p99 (s)', row['p99']),
+                         ('LRO p50 (s)', row['lroP50']),
+                         ('LRO p95 (s)', row['lroP95']),
+                         ('LRO p99 (s)', row['lroP99'])]) for row in report]
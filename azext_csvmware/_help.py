@@ -72,6 +72,93 @@ helps['csvmware vm create'] = """
         - name: Customizing specific properties of a VM. Changing the size of "Hard disk 1" disk to 21943040 KB, from that specified in the template, and also adding another disk with SCSI controller 0, persistent mode, and 41943040 KB size.
           text: >
             az csvmware vm create -n MyVm -g MyResourceGroup -p MyPrivateCloud -r MyResourcePool --template MyVmTemplate --disk name="Hard disk 1" size=21943040 --disk name=DiskNameWouldBeAssigned controller=1000 mode=persistent size=41943040
+
+        - name: Creating a VM from a blueprint compiled earlier. Only the create request is sent.
+          text: >
+            az csvmware vm create -n MyVm -g MyResourceGroup --blueprint MyBlueprint.json
+
+        - name: Creating a VM, and printing where the time went. The spans are also written to a trace file, which can be opened in chrome://tracing or Perfetto.
+          text: >
+            az csvmware vm create -n MyVm -g MyResourceGroup -p MyPrivateCloud -r MyResourcePool --template MyVmTemplate --profile --profile-trace MyTrace.json
+"""
+
+helps['csvmware vm blueprint'] = """
+    type: group
+    short-summary: Manage VMware virtual machine blueprints.
+    long-summary: A blueprint is a virtual machine request body, resolved from a vm template and customizations. Virtual machines created from a blueprint do not need any lookup.
+"""
+
+helps['csvmware vm blueprint compile'] = """
+    type: command
+    short-summary: Compile a vm template and customizations into a blueprint.
+    long-summary: |
+        The vm template is fetched and the customizations are applied, exactly as in 'az csvmware vm create'.
+        The resulting blueprint contains the request body and its content hash. Use it with 'az csvmware vm create --blueprint'.
+
+    parameters:
+        - name: --nic
+          short-summary: Add or modify NICs.
+          long-summary: |
+            Usage:   --nic name=MyNicName virtual-network=MyNetwork adapter=MyAdapter power-on-boot=True/False
+
+        - name: --disk
+          short-summary: Add or modify disks.
+          long-summary: |
+            Usage:   --disk name=MyDiskName controller=SCSIControllerID mode=IndependenceMode size=DiskSizeInKB
+
+    examples:
+        - name: Compile a blueprint with 2 cores from a vm template, and save it to a file.
+          text: >
+            az csvmware vm blueprint compile -p MyPrivateCloud -r MyResourcePool --template MyVmTemplate --location eastus --cores 2 --file MyBlueprint.json
+"""
+
+helps['csvmware vm create-batch'] = """
+    type: command
+    short-summary: Create many VMware virtual machines.
+    long-summary: |
+        The virtual machines are either described in a manifest file, or are created from the command line arguments using --count and --name-prefix.
+        Each vm-template is fetched once for the whole batch, the create requests are sent in parallel, and the outcome of every virtual machine is reported at the end.
+        Arguments given on the command line are used as defaults for the virtual machines in the manifest.
+
+    parameters:
+        - name: --manifest
+          short-summary: Path to a YAML or JSON file describing the virtual machines to create.
+          long-summary: |
+            The file contains a list of virtual machines, or a dictionary with a 'defaults' entry and a 'vms' list.
+            Allowed keys are name, resource-group, private-cloud, template, resource-pool, location, ram, cores, expose-to-guest-vm, nics and disks.
+            The nics and disks entries are lists, using the same keys as the --nic and --disk arguments of 'az csvmware vm create'.
+            Example:
+                defaults:
+                  resource-group: MyResourceGroup
+                  private-cloud: MyPrivateCloud
+                  resource-pool: MyResourcePool
+                  template: MyVmTemplate
+                vms:
+                  - name: MyVm1
+                  - name: MyVm2
+                    cores: 2
+                    disks:
+                      - name: "Hard disk 1"
+                        size: 21943040
+
+        - name: --nic
+          short-summary: Add or modify NICs of every virtual machine created from the command line arguments.
+          long-summary: |
+            Usage:   --nic name=MyNicName virtual-network=MyNetwork adapter=MyAdapter power-on-boot=True/False
+
+        - name: --disk
+          short-summary: Add or modify disks of every virtual machine created from the command line arguments.
+          long-summary: |
+            Usage:   --disk name=MyDiskName controller=SCSIControllerID mode=IndependenceMode size=DiskSizeInKB
+
+    examples:
+        - name: Create the virtual machines described in a manifest.
+          text: >
+            az csvmware vm create-batch --manifest vms.yaml
+
+        - name: Create 20 virtual machines named MyVm1 to MyVm20 from a vm template, with at most 5 requests in flight.
+          text: >
+            az csvmware vm create-batch --count 20 --name-prefix MyVm -g MyResourceGroup -p MyPrivateCloud -r MyResourcePool --template MyVmTemplate --max-parallel 5
 """
 
 helps['csvmware vm list'] = """
@@ -86,6 +173,30 @@ helps['csvmware vm list'] = """
           text: >
             az csvmware vm list -g MyResourceGroup
 
+        - name: List details of VMware VMs in two resource groups of two subscriptions, which are in East US.
+          text: >
+            az csvmware vm list -g MyResourceGroup1 MyResourceGroup2 --subscriptions MySubscription1 MySubscription2 --locations eastus
+
+        - name: List the VMware VMs of a large subscription as a table, keeping only the fields of the table in memory.
+          text: >
+            az csvmware vm list --compact -o table
+
+        - name: Write the VMware VMs of a large subscription as JSON lines, as the pages are received.
+          text: >
+            az csvmware vm list --stream jsonl
+
+        - name: List the name, status and private cloud of the VMware VMs in the current subscription.
+          text: >
+            az csvmware vm list --fields name status privateCloudId -o table
+
+        - name: List the VMware VMs of a resource group 500 at a time. The command prints the token to list the next 500.
+          text: >
+            az csvmware vm list -g MyResourceGroup --max-items 500 --next-token MyToken
+
+        - name: List the VMware VMs of a resource group from the local inventory if it was synced in the last 5 minutes, and from Azure otherwise.
+          text: >
+            az csvmware vm list -g MyResourceGroup --max-staleness 5m
+
 """
 
 helps['csvmware vm delete'] = """
@@ -104,20 +215,34 @@ helps['csvmware vm show'] = """
         - name: Get the details of a VMware VM.
           text: >
             az csvmware vm show -n MyVm -g MyResourceGroup
+
+        - name: Get the details of a VMware VM from the local inventory, without any call to Azure.
+          text: >
+            az csvmware vm show -n MyVm -g MyResourceGroup --offline
 """
 
 helps['csvmware vm start'] = """
     type: command
-    short-summary: Start a VMware virtual machine.
+    short-summary: Start VMware virtual machines.
+    long-summary: When several virtual machines are specified, they are started in parallel and a result is returned per virtual machine.
     examples:
         - name: Start a VMware VM.
           text: >
             az csvmware vm start -n MyVm -g MyResourceGroup
+
+        - name: Start three VMs of a resource group, at most two at a time.
+          text: >
+            az csvmware vm start -n MyVm1 MyVm2 MyVm3 -g MyResourceGroup --max-parallel 2 -o table
+
+        - name: Start all the VMs of a subscription without waiting for them to boot.
+          text: >
+            az csvmware vm start --ids $(az csvmware vm list --query "[].id" -o tsv) --no-wait
 """
 
 helps['csvmware vm stop'] = """
     type: command
-    short-summary: Stop/Reboot/Suspend a VMware virtual machine.
+    short-summary: Stop/Reboot/Suspend VMware virtual machines.
+    long-summary: When several virtual machines are specified, they are stopped in parallel and a result is returned per virtual machine.
     examples:
         - name: Power off a VMware VM.
           text: >
@@ -126,6 +251,10 @@ helps['csvmware vm stop'] = """
         - name: Restart a VMware VM.
           text: >
             az csvmware vm stop -n MyVm -g MyResourceGroup --mode reboot
+
+        - name: Shut down several VMs in different resource groups.
+          text: >
+            az csvmware vm stop --ids /subscriptions/{SubID}/resourceGroups/MyResourceGroup1/providers/Microsoft.VMwareCloudSimple/virtualMachines/MyVm1 /subscriptions/{SubID}/resourceGroups/MyResourceGroup2/providers/Microsoft.VMwareCloudSimple/virtualMachines/MyVm2 --mode shutdown
 """
 
 helps['csvmware vm update'] = """
@@ -149,6 +278,15 @@ helps['csvmware vm nic'] = """
 helps['csvmware vm nic add'] = """
     type: command
     short-summary: Add NIC to a VMware virtual machine.
+
+    parameters:
+        - name: --nic
+          short-summary: Add several NICs in a single update.
+          long-summary: |
+            Multiple nics can be specified by using more than one `--nic` argument.
+            Values which are not specified are taken from the --virtual-network, --adapter and --power-on-boot arguments.
+            Usage:   --nic virtual-network=MyNetwork adapter=MyAdapter power-on-boot=True/False
+
     examples:
         - name: Add a NIC with default parameters in a VM.
           text: >
@@ -157,6 +295,10 @@ helps['csvmware vm nic add'] = """
         - name: Add a NIC with E1000E adapter that powers on boot in a VM.
           text: >
             az csvmware vm nic add --vm-name MyVm -g MyResourceGroup --virtual-network MyVirtualNetwork --adapter E1000E --power-on-boot true
+
+        - name: Add two NICs to a VM in a single update. The second NIC uses an E1000E adapter.
+          text: >
+            az csvmware vm nic add --vm-name MyVm -g MyResourceGroup --virtual-network MyVirtualNetwork --nic adapter=VMXNET3 --nic adapter=E1000E
 """
 
 helps['csvmware vm nic list'] = """
@@ -194,6 +336,15 @@ helps['csvmware vm disk'] = """
 helps['csvmware vm disk add'] = """
     type: command
     short-summary: Add disk to a VMware virtual machine.
+
+    parameters:
+        - name: --disk
+          short-summary: Add several disks in a single update.
+          long-summary: |
+            Multiple disks can be specified by using more than one `--disk` argument.
+            Values which are not specified are taken from the --controller, --mode and --size arguments.
+            Usage:   --disk controller=SCSIControllerID mode=IndependenceMode size=DiskSizeInKB
+
     examples:
         - name: Add a disk with default parameters in a VM.
           text: >
@@ -202,6 +353,10 @@ helps['csvmware vm disk add'] = """
         - name: Add a disk with SATA controller 0 and 64 GB memory in a VM.
           text: >
             az csvmware vm disk add --vm-name MyVm -g MyResourceGroup --controller 15000 --size 67108864
+
+        - name: Add a 64 GB and a 128 GB disk to a VM in a single update.
+          text: >
+            az csvmware vm disk add --vm-name MyVm -g MyResourceGroup --disk size=67108864 --disk size=134217728
 """
 
 helps['csvmware vm disk list'] = """
@@ -322,3 +477,91 @@ helps['csvmware resource-pool show'] = """
           text: >
             az csvmware resource-pool show -n MyResourcePool -p MyPrivateCloud --location eastus
 """
+
+helps['csvmware operation'] = """
+    type: group
+    short-summary: Track long running operations of VMware CloudSimple.
+"""
+
+helps['csvmware operation show'] = """
+    type: command
+    short-summary: Get the status of long running operations.
+    examples:
+        - name: Get the status of an operation.
+          text: >
+            az csvmware operation show -n 00000000-0000-0000-0000-000000000000 --location eastus
+
+        - name: Get the status of several operations from their URLs.
+          text: >
+            az csvmware operation show --ids https://management.azure.com/subscriptions/{SubID}/providers/microsoft.vmwarecloudsimple/locations/eastus/operationresults/{OperationID1}?api-version=2019-04-01 /subscriptions/{SubID}/providers/Microsoft.VMwareCloudSimple/locations/eastus/operationResults/{OperationID2}
+"""
+
+helps['csvmware operation wait'] = """
+    type: command
+    short-summary: Wait for long running operations to complete.
+    long-summary: |
+        All the operations are tracked by a single polling loop, which waits for the delay requested by the service before polling an operation again.
+        The command fails if any of the operations does not succeed.
+    examples:
+        - name: Wait for an operation to complete.
+          text: >
+            az csvmware operation wait -n 00000000-0000-0000-0000-000000000000 --location eastus
+
+        - name: Wait at most 10 minutes for several operations to complete.
+          text: >
+            az csvmware operation wait --ids {OperationURL1} {OperationURL2} --timeout 600
+"""
+
+helps['csvmware inventory'] = """
+    type: group
+    short-summary: Manage the local inventory of the VMware resources of a subscription.
+"""
+
+helps['csvmware inventory sync'] = """
+    type: command
+    short-summary: Crawl the private clouds, resource pools, virtual networks, VM templates and VMs of the current subscription into the local inventory.
+    long-summary: |
+        The inventory is a SQLite file, indexed by resource ID, name, resource group, private cloud, status and virtual network.
+        The private clouds are crawled in the regions of the virtual machines and in the regions given by --locations, and the resources of each level are listed concurrently.
+        The previous snapshot of the subscription is replaced only once the whole subscription is crawled.
+        Every sync records the resources added, modified and removed since the previous snapshot.
+        With --incremental, the virtual machines, the private clouds and their resource pools are listed again, in the regions of the previous snapshot too, but the virtual networks and templates of the private clouds which did not change, nor did their resource pools, are kept from the previous snapshot, unless they were listed more than a day ago.
+        The kept virtual networks and templates keep the time they were last listed: --max-staleness checks the virtual networks and templates served from the inventory by that time.
+        A full sync lists them all again.
+    examples:
+        - name: Crawl the current subscription into the default inventory file.
+          text: >
+            az csvmware inventory sync
+
+        - name: Crawl the current subscription, including the private clouds in West US which have no VMs, into a given file.
+          text: >
+            az csvmware inventory sync --locations westus --file ./inventory.db
+
+        - name: Update the inventory of the current subscription, listing the virtual networks and templates only of the private clouds which changed.
+          text: >
+            az csvmware inventory sync --incremental
+"""
+
+helps['csvmware perf'] = """
+    type: group
+    short-summary: Report the latencies of the csvmware commands recorded on this machine.
+    long-summary: |
+        When perf_history is true in the [csvmware] section of the az configuration, or AZURE_CSVMWARE_PERF_HISTORY is true, every csvmware command records its duration, region, private cloud, number of requests to Azure, time spent in long running operations and outcome in a local history.
+        The history keeps the last 10000 commands.
+"""
+
+helps['csvmware perf report'] = """
+    type: command
+    short-summary: Compute the p50, p95 and p99 latencies of the recorded commands, per command, region and time window.
+    long-summary: |
+        The latencies are in seconds. The lro percentiles are computed over the time the commands spent waiting for their long running operations, from the request which started the operation to its last poll.
+        The time windows are aligned on multiples of their length, in UTC.
+    examples:
+        - name: Report the daily latencies of the commands of the last week.
+          text: >
+            az csvmware perf report
+
+        - name: Report the hourly latencies of VM creation in West US over the last day.
+          text: >
+            az csvmware perf report --operation "vm create" --location westus --window 1h --since 1d
+"""
@@ -0,0 +1,159 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the instrumentation of the SDK clients for _profiling.py: the pipeline policy recording
+every request as a span, and the wrappers recording the token acquisition and the deserialization.
+It is kept apart from _profiling.py, which is imported when the arguments are loaded, because it imports msrest.
+"""
+
+from msrest.pipeline import HTTPPolicy
+
+from ._profiling import span
+
+
+def operation_name(method, url):
+    """
+    Names a request by its method and the resource types of its path,
+    e.g. GET privateClouds/virtualMachineTemplates, or POST virtualMachines/start.
+    """
+    try:
+        from urllib.parse import urlparse
+    except ImportError:
+        from urlparse import urlparse  # pylint: disable=import-error
+
+    segments = [segment for segment in urlparse(url).path.split('/') if segment]
+    lower = [segment.lower() for segment in segments]
+    if 'providers' in lower:
+        segments = segments[lower.index('providers') + 2:]
+    elif 'subscriptions' in lower:
+        segments = segments[lower.index('subscriptions') + 2:]
+    types = [segment for segment in segments[::2] if segment.lower() != 'locations']
+    return method.upper() + ' ' + ('/'.join(types) or '/')
+
+
+def resource_id(url):
+    """
+    Returns the ID of the resource a request is about: the path of its URL, without the trailing
+    collection or action, e.g. the virtual machine of POST .../virtualMachines/MyVm/start.
+    """
+    try:
+        from urllib.parse import urlparse
+    except ImportError:
+        from urlparse import urlparse  # pylint: disable=import-error
+
+    segments = [segment for segment in urlparse(url).path.split('/') if segment]
+    lower = [segment.lower() for segment in segments]
+    start = lower.index('providers') + 2 if 'providers' in lower else 0
+    if (len(segments) - start) % 2:
+        segments = segments[:-1]
+    return '/' + '/'.join(segments)
+
+
+def _content_length(headers, content=None):
+    try:
+        return int(headers.get('Content-Length'))
+    except (TypeError, ValueError):
+        return len(content) if isinstance(content, (bytes, str)) else None
+
+
+def _http_attributes(http_response):
+    internal = http_response.internal_response
+    retries = getattr(getattr(internal, 'raw', None), 'retries', None)
+    # The headers of the client configuration, such as the x-ms-client-request-id set by az,
+    # are only added to the request when it is sent.
+    sent_headers = getattr(getattr(internal, 'request', None), 'headers', None) or {}
+    attributes = {
+        'http.status_code': http_response.status_code,
+        'http.response_content_length': _content_length(
+            http_response.headers, internal.content if getattr(internal, '_content_consumed', False) else None),
+        'az.service_request_id': http_response.headers.get('x-ms-request-id'),
+        'az.correlation_request_id': http_response.headers.get('x-ms-correlation-request-id'),
+    }
+    if sent_headers.get('x-ms-client-request-id'):
+        attributes['az.client_request_id'] = sent_headers['x-ms-client-request-id']
+    if retries is not None and retries.history:
+        attributes['http.retry_count'] = len(retries.history)
+    return attributes
+
+
+class ProfilingPolicy(HTTPPolicy):
+    """
+    Pipeline policy recording every request as a span, which includes the token acquisition and the throttling.
+    """
+
+    def send(self, request, **kwargs):
+        http_request = request.http_request
+        name = operation_name(http_request.method, http_request.url)
+        with span(name) as current:
+            if current is not None:
+                current.attributes.update({
+                    'csvmware.operation': name,
+                    'http.method': http_request.method.upper(),
+                    'http.url': http_request.url,
+                    'azure.resource_id': resource_id(http_request.url),
+                    'az.client_request_id': http_request.headers.get('x-ms-client-request-id'),
+                    'http.request_content_length': _content_length(http_request.headers, http_request.data)})
+            response = self.next.send(request, **kwargs)
+            if current is not None:
+                retries = current.attributes.get('http.retry_count', 0)
+                current.attributes.update(_http_attributes(response.http_response))
+                current.attributes['http.retry_count'] = retries + current.attributes.get('http.retry_count', 0)
+            return response
+
+
+class _ProfiledCredentials(object):  # pylint: disable=too-few-public-methods
+    """
+    Records the token acquisition of the credentials policy of a client.
+    """
+
+    def __init__(self, credentials):
+        self._credentials = credentials
+
+    def signed_session(self, *args, **kwargs):
+        with span('token'):
+            return self._credentials.signed_session(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._credentials, name)
+
+
+class _ProfiledDeserializer(object):  # pylint: disable=too-few-public-methods
+    """
+    Records the deserialization of the responses of an operation group.
+    """
+
+    def __init__(self, deserializer):
+        self._deserializer = deserializer
+
+    def __call__(self, target_obj, *args, **kwargs):
+        with span('deserialize ' + (target_obj if isinstance(target_obj, str) else type(target_obj).__name__)):
+            return self._deserializer(target_obj, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._deserializer, name)
+
+
+def instrument(client):
+    """
+    Adds the profiling policy at the start of the pipeline of a client, and records the token acquisition
+    and the deserialization of its operation groups. Nothing is recorded when no command is profiled.
+    A client without an msrest pipeline is returned unchanged.
+    """
+    # pylint: disable=protected-access
+    from msrest.serialization import Deserializer
+
+    pipeline = getattr(getattr(client, 'config', None), 'pipeline', None)
+    if pipeline is None:
+        return client
+    policy = ProfilingPolicy()
+    policy.next = pipeline._impl_policies[0] if pipeline._impl_policies else pipeline._sender
+    for existing in pipeline._impl_policies:
+        if hasattr(existing, '_creds'):
+            existing._creds = _ProfiledCredentials(existing._creds)
+    pipeline._impl_policies.insert(0, policy)
+    for operations in vars(client).values():
+        if isinstance(getattr(operations, '_deserialize', None), Deserializer):
+            operations._deserialize = _ProfiledDeserializer(operations._deserialize)
+    return client
@@ -0,0 +1,463 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the local inventory: a snapshot of the private clouds, resource pools, virtual networks,
+virtual machine templates and virtual machines of a subscription, in a SQLite file.
+The hierarchy is crawled a level at a time, the scopes of a level being listed concurrently,
+and the snapshot of the subscription is replaced in a single transaction, so that a reader sees
+either the previous snapshot or the new one.
+An incremental sync lists the virtual machines, the private clouds and their resource pools again, but reuses the
+stored virtual networks and templates of the private clouds which did not change, nor did their resource pools.
+Nothing tells when the virtual networks or templates of a resource pool change, so a kept subtree may be out of date:
+it is listed again once older than INVENTORY_SUBTREE_MAX_AGE, every private cloud records when its subtree was last
+listed, and the virtual networks and templates served from a snapshot are checked against --max-staleness by that
+time, not by the time of the snapshot. Every sync records the items added, modified and removed since the previous
+snapshot, as a change set.
+Every item is stored as returned by the service, next to the indexed columns it is looked up by,
+so that the commands served from a snapshot (--offline, --max-staleness) deserialize and output it
+exactly as they would a live response.
+Names are stored in lower case, as Azure resource names are case-insensitive.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from ._config import (INVENTORY_CHANGE_SETS, INVENTORY_FILE, INVENTORY_PAGE_SIZE, INVENTORY_SCHEMA_VERSION,
+                      INVENTORY_SUBTREE_MAX_AGE)
+
+logger = get_logger(__name__)
+
+_ITEM_TABLES = ['private_clouds', 'resource_pools', 'virtual_networks', 'vm_templates', 'virtual_machines']
+_SNAPSHOT_TABLES = ['snapshots', 'vm_networks'] + _ITEM_TABLES
+_TABLES = _SNAPSHOT_TABLES + ['changes']
+
+_SCHEMA = [
+    "CREATE TABLE snapshots (subscription TEXT PRIMARY KEY, synced_at REAL NOT NULL, duration REAL NOT NULL, "
+    "locations TEXT NOT NULL)",
+    # subtree_synced_at is the time the resource pools, virtual networks and templates of the private cloud
+    # were last listed, before the snapshot if an incremental sync kept them.
+    "CREATE TABLE private_clouds (id TEXT PRIMARY KEY, subscription TEXT NOT NULL, name TEXT NOT NULL, "
+    "location TEXT NOT NULL, subtree_synced_at REAL NOT NULL, data TEXT NOT NULL)",
+    "CREATE TABLE resource_pools (id TEXT PRIMARY KEY, subscription TEXT NOT NULL, name TEXT NOT NULL, "
+    "location TEXT NOT NULL, private_cloud TEXT NOT NULL, data TEXT NOT NULL)",
+    # A virtual network or a template is listed by every resource pool it is available in.
+    "CREATE TABLE virtual_networks (id TEXT NOT NULL, resource_pool TEXT NOT NULL, subscription TEXT NOT NULL, "
+    "name TEXT NOT NULL, location TEXT NOT NULL, private_cloud TEXT NOT NULL, data TEXT NOT NULL, "
+    "PRIMARY KEY (id, resource_pool))",
+    "CREATE TABLE vm_templates (id TEXT NOT NULL, resource_pool TEXT NOT NULL, subscription TEXT NOT NULL, "
+    "name TEXT NOT NULL, location TEXT NOT NULL, private_cloud TEXT NOT NULL, data TEXT NOT NULL, "
+    "PRIMARY KEY (id, resource_pool))",
+    "CREATE TABLE virtual_machines (id TEXT PRIMARY KEY, subscription TEXT NOT NULL, name TEXT NOT NULL, "
+    "resource_group TEXT NOT NULL, location TEXT NOT NULL, private_cloud TEXT NOT NULL, status TEXT NOT NULL, "
+    "data TEXT NOT NULL)",
+    # The virtual networks the NICs of a virtual machine are connected to.
+    "CREATE TABLE vm_networks (vm_id TEXT NOT NULL, network_id TEXT NOT NULL, subscription TEXT NOT NULL, "
+    "PRIMARY KEY (vm_id, network_id))",
+    # The change sets of the last syncs. kind is the table of the item, change is added, modified or removed.
+    "CREATE TABLE changes (subscription TEXT NOT NULL, synced_at REAL NOT NULL, kind TEXT NOT NULL, "
+    "id TEXT NOT NULL, change TEXT NOT NULL)",
+    "CREATE INDEX private_clouds_name ON private_clouds (subscription, name)",
+    "CREATE INDEX resource_pools_private_cloud ON resource_pools (subscription, private_cloud, name)",
+    "CREATE INDEX virtual_networks_private_cloud ON virtual_networks (subscription, private_cloud, resource_pool)",
+    "CREATE INDEX virtual_networks_name ON virtual_networks (subscription, name)",
+    "CREATE INDEX vm_templates_private_cloud ON vm_templates (subscription, private_cloud, resource_pool)",
+    "CREATE INDEX vm_templates_name ON vm_templates (subscription, name)",
+    "CREATE INDEX virtual_machines_name ON virtual_machines (subscription, resource_group, name)",
+    "CREATE INDEX virtual_machines_private_cloud ON virtual_machines (subscription, private_cloud)",
+    "CREATE INDEX virtual_machines_status ON virtual_machines (subscription, status)",
+    "CREATE INDEX vm_networks_network ON vm_networks (network_id)",
+    "CREATE INDEX changes_synced_at ON changes (subscription, synced_at)",
+]
+
+
+def inventory_path(cli_ctx, inventory_file=None):
+    """
+    Returns the path of the inventory file: inventory_file if set, else INVENTORY_FILE in the az configuration
+    directory.
+    """
+    if inventory_file:
+        return os.path.abspath(os.path.expanduser(inventory_file))
+    return os.path.join(cli_ctx.config.config_dir, INVENTORY_FILE)
+
+
+def connect(path):
+    """
+    Opens the inventory file, creating its tables if the file is new or of another schema version.
+    """
+    # The pages of a snapshot may be read by the prefetching thread, never at the same time as by the caller.
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    version = connection.execute('PRAGMA user_version').fetchone()[0]
+    if version != INVENTORY_SCHEMA_VERSION:
+        if version:
+            logger.warning("The inventory %s was created by another version of the extension. "
+                           "Its snapshots are discarded.", path)
+        with connection:
+            for table in _TABLES:
+                connection.execute('DROP TABLE IF EXISTS ' + table)
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            connection.execute('PRAGMA user_version = {}'.format(INVENTORY_SCHEMA_VERSION))
+    return connection
+
+
+def _name(resource_id):
+    return (resource_id or '').rsplit('/', 1)[-1].lower()
+
+
+def _dumps(item):
+    # The keys are sorted, so that the same item is always stored as the same text, and compares equal.
+    return json.dumps(item, separators=(',', ':'), sort_keys=True)
+
+
+def _raw(data, _):
+    return data
+
+
+def _list(paged):
+    """
+    Returns all the items of a Paged object, as returned by the service.
+    """
+    from ._fast_deserializer import fast_pages
+    from ._paging import prefetch_pages
+    from ._streaming import iter_pages
+
+    items = []
+    for page in iter_pages(fast_pages(prefetch_pages(paged), _raw)):
+        items.extend(page)
+    return items
+
+
+def _crawl_level(func, scopes, max_parallel, what):
+    """
+    Lists the scopes of a level concurrently. Returns a list of (scope, items) tuples.
+    The first scope that cannot be listed fails the crawl, so that an incomplete snapshot is never stored.
+    """
+    from ._bulk import run_in_parallel, error_message
+
+    crawled = []
+    for (scope, items, error) in run_in_parallel(func, scopes, max_parallel):
+        if error is not None:
+            raise CLIError('Unable to list the {} of {}: {}'.format(what, scope[-1], error_message(error)))
+        crawled.append((scope, items))
+    return crawled
+
+
+def _stored_subtrees(connection, subscription):
+    """
+    Returns the stored private clouds of a subscription, with the time their subtree was listed and the rows of
+    their resource pools, virtual networks and templates, by (location, private cloud name).
+    """
+    subtrees = {}
+    for (location, name, synced_at, data) in connection.execute(
+            'SELECT location, name, subtree_synced_at, data FROM private_clouds WHERE subscription = ?',
+            (subscription,)):
+        subtrees[(location, name)] = {'data': data, 'synced_at': synced_at,
+                                      'resource_pools': [], 'virtual_networks': [], 'vm_templates': []}
+    for (table, columns) in [('resource_pools', 'id, name, location, private_cloud, data'),
+                             ('virtual_networks', 'id, resource_pool, name, location, private_cloud, data'),
+                             ('vm_templates', 'id, resource_pool, name, location, private_cloud, data')]:
+        for row in connection.execute('SELECT {} FROM {} WHERE subscription = ?'.format(columns, table),
+                                      (subscription,)):
+            subtree = subtrees.get((row[-3], row[-2]))
+            if subtree is not None:
+                subtree[table].append(row)
+    return subtrees
+
+
+def crawl(client, locations=None, max_parallel=None, subtrees=None, synced_at=None):
+    """
+    Lists the virtual machines of the subscription, then the private clouds of their regions and of locations,
+    then the resource pools of these private clouds, and then the virtual networks and the templates
+    of these resource pools.
+    subtrees are stored private clouds, see _stored_subtrees. The virtual networks and templates of a private cloud
+    which is the same as stored, with the same resource pools, are not listed unless they were listed more than
+    INVENTORY_SUBTREE_MAX_AGE seconds ago: the stored ones are kept, with the time they were listed.
+    The subtrees listed by this crawl are stamped with synced_at, the current time by default.
+    Returns a dict of the rows of every table but snapshots, the regions crawled and the number of
+    private clouds whose stored subtree was kept.
+    """
+    from msrestazure.tools import parse_resource_id
+
+    synced_at = time.time() if synced_at is None else synced_at
+    virtual_machines = _list(client.virtual_machines.list_by_subscription())
+    regions = sorted(set([location.lower() for location in locations or []] +
+                         [(vm.get('location') or '').lower() for vm in virtual_machines]) - {''})
+
+    private_clouds = _crawl_level(lambda scope: _list(client.private_clouds.list(scope[0])),
+                                  [(region, 'region ' + region) for region in regions],
+                                  max_parallel, 'private clouds')
+    pc_scopes = [(region, pc['name'], pc, 'private cloud ' + pc['name'])
+                 for ((region, _), pcs) in private_clouds for pc in pcs]
+    resource_pools = _crawl_level(lambda scope: _list(client.resource_pools.list(scope[0], scope[1])),
+                                  pc_scopes, max_parallel, 'resource pools')
+
+    kept = []
+    subtree_synced_at = {}
+    pool_rows = []
+    pool_scopes = []
+    for ((region, pc_name, pc, _), pools) in resource_pools:
+        rows_of_pc = [(pool['id'].lower(), pool['name'].lower(), region, pc_name.lower(), _dumps(pool))
+                      for pool in pools]
+        pool_rows.extend(rows_of_pc)
+        subtree = (subtrees or {}).get((region, pc_name.lower()))
+        if subtree is not None and subtree['data'] == _dumps(pc) and \
+                sorted(subtree['resource_pools']) == sorted(rows_of_pc) and \
+                synced_at - subtree['synced_at'] <= INVENTORY_SUBTREE_MAX_AGE:
+            kept.append(subtree)
+            subtree_synced_at[pc['id'].lower()] = subtree['synced_at']
+        else:
+            pool_scopes.extend((kind, region, pc_name, pool['name'], 'resource pool ' + pool['name'])
+                               for pool in pools for kind in ['virtual_networks', 'vm_templates'])
+
+    def _list_pool(scope):
+        (kind, region, pc_name, pool_name, _) = scope
+        if kind == 'virtual_networks':
+            return _list(client.virtual_networks.list(region, pc_name, pool_name))
+        return _list(client.virtual_machine_templates.list(pc_name, region, pool_name))
+
+    pool_items = _crawl_level(_list_pool, pool_scopes, max_parallel, 'virtual networks and templates')
+
+    rows = {
+        'private_clouds': [(pc['id'].lower(), pc['name'].lower(), region,
+                            subtree_synced_at.get(pc['id'].lower(), synced_at), _dumps(pc))
+                           for ((region, _), pcs) in private_clouds for pc in pcs],
+        'resource_pools': pool_rows,
+        'virtual_networks': [],
+        'vm_templates': [],
+        'virtual_machines': [],
+        'vm_networks': [],
+    }
+    for subtree in kept:
+        for table in ['virtual_networks', 'vm_templates']:
+            rows[table].extend(subtree[table])
+    for ((kind, region, pc_name, pool_name, _), items) in pool_items:
+        rows[kind].extend((item['id'].lower(), pool_name.lower(), item['name'].lower(), region, pc_name.lower(),
+                           _dumps(item)) for item in items)
+    for vm in virtual_machines:
+        vm_id = vm['id'].lower()
+        properties = vm.get('properties') or {}
+        rows['virtual_machines'].append((vm_id, vm['name'].lower(),
+                                         parse_resource_id(vm_id).get('resource_group', ''),
+                                         (vm.get('location') or '').lower(), _name(properties.get('privateCloudId')),
+                                         (properties.get('status') or '').lower(), _dumps(vm)))
+        network_ids = set(((nic.get('network') or {}).get('id') or '').lower()
+                          for nic in properties.get('nics') or [])
+        rows['vm_networks'].extend((vm_id, network_id) for network_id in sorted(network_ids - {''}))
+    return rows, regions, len(kept)
+
+
+def _count(rows):
+    return len(set(row[0] for row in rows))
+
+
+def _change_set(connection, subscription, rows):
+    """
+    Compares crawled rows with the stored snapshot of a subscription.
+    Returns the (kind, id, change) tuples of the items added, modified and removed.
+    """
+    changes = []
+    for table in _ITEM_TABLES:
+        stored = dict(connection.execute('SELECT id, data FROM {} WHERE subscription = ?'.format(table),
+                                         (subscription,)))
+        crawled = dict((row[0], row[-1]) for row in rows[table])
+        for (item_id, data) in sorted(crawled.items()):
+            if item_id not in stored:
+                changes.append((table, item_id, 'added'))
+            elif stored[item_id] != data:
+                changes.append((table, item_id, 'modified'))
+        changes.extend((table, item_id, 'removed') for item_id in sorted(set(stored) - set(crawled)))
+    return changes
+
+
+def sync_inventory(cli_ctx, client, locations=None, inventory_file=None, max_parallel=None, incremental=False):
+    """
+    Crawls the current subscription and replaces its snapshot in the inventory file.
+    If incremental is True, the regions of the previous snapshot are crawled again, and the virtual networks
+    and templates of the private clouds which did not change, nor did their resource pools, are kept.
+    Returns a summary of the snapshot, and of the changes since the previous one.
+    """
+    from azure.cli.core.commands.client_factory import get_subscription_id
+
+    subscription = get_subscription_id(cli_ctx).lower()
+    path = inventory_path(cli_ctx, inventory_file)
+    subtrees = None
+    if incremental:
+        with closing(connect(path)) as connection:
+            row = connection.execute('SELECT locations FROM snapshots WHERE subscription = ?',
+                                     (subscription,)).fetchone()
+            if row is None:
+                logger.warning("There is no inventory of subscription %s to update, it is crawled in full.",
+                               subscription)
+            else:
+                locations = list(locations or []) + [location for location in row[0].split(',') if location]
+                subtrees = _stored_subtrees(connection, subscription)
+    start = time.time()
+    (rows, regions, kept) = crawl(client, locations, max_parallel, subtrees, start)
+    duration = time.time() - start
+
+    with closing(connect(path)) as connection:
+        with connection:
+            changes = _change_set(connection, subscription, rows)
+            for table in _SNAPSHOT_TABLES:
+                connection.execute('DELETE FROM ' + table + ' WHERE subscription = ?', (subscription,))
+            for (table, table_rows) in rows.items():
+                if not table_rows:
+                    continue
+                # The subscription is the third column of vm_networks, virtual_networks and vm_templates,
+                # and the second of the other tables.
+                position = 2 if table in ('vm_networks', 'virtual_networks', 'vm_templates') else 1
+                values = [row[:position] + (subscription,) + row[position:] for row in table_rows]
+                connection.executemany('INSERT OR REPLACE INTO {} VALUES ({})'.format(
+                    table, ', '.join('?' * len(values[0]))), values)
+            connection.execute('INSERT INTO snapshots VALUES (?, ?, ?, ?)',
+                               (subscription, start, duration, ','.join(regions)))
+            connection.executemany('INSERT INTO changes VALUES (?, ?, ?, ?, ?)',
+                                   [(subscription, start) + change for change in changes])
+            connection.execute('DELETE FROM changes WHERE subscription = ? AND synced_at NOT IN '
+                               '(SELECT DISTINCT synced_at FROM changes WHERE subscription = ? '
+                               'ORDER BY synced_at DESC LIMIT ?)',
+                               (subscription, subscription, INVENTORY_CHANGE_SETS))
+
+    logger.info("Inventory of subscription %s crawled in %.1f seconds.", subscription, duration)
+    return {
+        'file': path,
+        'subscription': subscription,
+        'syncedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start)),
+        'durationSeconds': round(duration, 1),
+        'incremental': subtrees is not None,
+        'locations': regions,
+        'privateClouds': _count(rows['private_clouds']),
+        'privateCloudsUnchanged': kept,
+        'resourcePools': _count(rows['resource_pools']),
+        'virtualNetworks': _count(rows['virtual_networks']),
+        'vmTemplates': _count(rows['vm_templates']),
+        'virtualMachines': _count(rows['virtual_machines']),
+        'changes': {change: len([c for c in changes if c[2] == change]) for change in ['added', 'modified', 'removed']},
+    }
+
+
+class Snapshot(object):
+    """
+    The snapshot of a subscription in the inventory, from which the read commands are served.
+    The items are returned as the live commands return them: a Paged object of the same type, or a model.
+    """
+
+    def __init__(self, connection, subscription, synced_at, offline=False, max_staleness=None):
+        self._connection = connection
+        self.subscription = subscription
+        self.synced_at = synced_at
+        self.offline = offline
+        self.max_staleness = max_staleness
+
+    def _paged(self, client, paged_type, table, conditions, params):
+        """
+        Returns a Paged object of the rows of table which match conditions, in the order they were listed in.
+        A page is built from the stored items as the service would have sent it, and decoded at once.
+        """
+        cursor = self._connection.execute(
+            'SELECT data FROM {} WHERE subscription = ?{} ORDER BY rowid'.format(
+                table, ''.join(' AND ' + condition for condition in conditions)),
+            [self.subscription] + list(params))
+
+        def _next(_):
+            rows = cursor.fetchmany(INVENTORY_PAGE_SIZE)
+            next_link = '"inventory"' if len(rows) == INVENTORY_PAGE_SIZE else 'null'
+            return json.loads('{"value":[' + ','.join(row[0] for row in rows) + '],"nextLink":' + next_link + '}')
+
+        return paged_type(_next, client._deserialize.dependencies)  # pylint: disable=protected-access
+
+    def list_vms(self, client, resource_groups=None, locations=None):
+        """
+        Returns the virtual machines of resource_groups, or of the subscription, in locations if set.
+        """
+        from .vendored_sdks.models import VirtualMachinePaged
+
+        conditions = []
+        params = []
+        for (column, values) in [('resource_group', resource_groups), ('location', locations)]:
+            if values:
+                conditions.append('{} IN ({})'.format(column, ', '.join('?' * len(values))))
+                params.extend(value.lower() for value in values)
+        return self._paged(client, VirtualMachinePaged, 'virtual_machines', conditions, params)
+
+    def get_vm(self, client, resource_group_name, vm_name):
+        """
+        Returns a virtual machine, or None if it is not in the snapshot.
+        """
+        from ._fast_deserializer import deserialize
+
+        row = self._connection.execute(
+            'SELECT data FROM virtual_machines WHERE subscription = ? AND resource_group = ? AND name = ?',
+            (self.subscription, resource_group_name.lower(), vm_name.lower())).fetchone()
+        if row is None:
+            return None
+        deserializer = client._deserialize  # pylint: disable=protected-access
+        return deserialize(deserializer, 'VirtualMachine', json.loads(row[0]))
+
+    def list_in_resource_pool(self, client, table, location, private_cloud, resource_pool):
+        """
+        Returns the virtual networks or the templates (table) of a resource pool, or None if the resource pool
+        is not in the snapshot, or if its private cloud's subtree was listed more than max_staleness seconds ago.
+        """
+        from .vendored_sdks.models import VirtualMachineTemplatePaged, VirtualNetworkPaged
+
+        params = (location.lower(), private_cloud.lower(), resource_pool.lower())
+        row = self._connection.execute(
+            'SELECT p.subtree_synced_at FROM resource_pools r JOIN private_clouds p ON p.subscription = r.subscription '
+            'AND p.location = r.location AND p.name = r.private_cloud WHERE r.subscription = ? AND r.location = ? '
+            'AND r.private_cloud = ? AND r.name = ?', (self.subscription,) + params).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        if self.max_staleness is not None and age > self.max_staleness:
+            # An incremental sync kept the subtree of the private cloud, without listing it again.
+            message = 'The resource pools of private cloud {} were listed {:.0f} seconds ago, more than ' \
+                      '--max-staleness.'.format(private_cloud, age)
+            if self.offline:
+                raise CLIError(message + " Run 'az csvmware inventory sync' without --incremental first.")
+            logger.info("%s The command is served live.", message)
+            return None
+        paged_type = VirtualNetworkPaged if table == 'virtual_networks' else VirtualMachineTemplatePaged
+        return self._paged(client, paged_type, table, ['location = ?', 'private_cloud = ?', 'resource_pool = ?'],
+                           params)
+
+
+def open_snapshot(cli_ctx, inventory_file=None, offline=False, max_staleness=None):
+    """
+    Returns the snapshot of the current subscription, if it was synced at most max_staleness seconds ago.
+    Returns None if there is no such snapshot, in which case the command is served live,
+    or raises an error if offline is True.
+    """
+    from azure.cli.core.commands.client_factory import get_subscription_id
+
+    subscription = get_subscription_id(cli_ctx).lower()
+    path = inventory_path(cli_ctx, inventory_file)
+    connection = connect(path) if os.path.exists(path) else None
+    row = None
+    if connection is not None:
+        row = connection.execute('SELECT synced_at FROM snapshots WHERE subscription = ?', (subscription,)).fetchone()
+
+    if row is None:
+        message = 'There is no inventory of subscription {} in {}.'.format(subscription, path)
+    elif max_staleness is not None and time.time() - row[0] > max_staleness:
+        message = 'The inventory of subscription {} was synced {:.0f} seconds ago, more than --max-staleness.'.format(
+            subscription, time.time() - row[0])
+    else:
+        logger.info("Served from the inventory of subscription %s, synced %.0f seconds ago.",
+                    subscription, time.time() - row[0])
+        return Snapshot(connection, subscription, row[0], offline, max_staleness)
+
+    if connection is not None:
+        connection.close()
+    if offline:
+        raise CLIError(message + " Run 'az csvmware inventory sync' first.")
+    logger.info("%s The command is served live.", message)
+    return None
@@ -0,0 +1,172 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the explicit paging of the list commands: reading a bounded slice of a list (--max-items),
+and the continuation token which resumes the list where the slice ended (--next-token).
+A continuation token is the $skipToken of the page in which the slice ended, and the number of items
+of that page which were already returned.
+It also contains the prefetching of pages (--prefetch-depth), which requests the next pages of a list
+on a background thread while the current one is deserialized and output.
+"""
+
+import base64
+import json
+import threading
+
+from knack.util import CLIError
+
+# Seconds the prefetching thread waits for room in its queue, and the caller for a page,
+# before checking whether the other side is done.
+_PREFETCH_WAIT = 0.5
+
+
+def encode_token(skip_token, offset):
+    token = json.dumps({'skipToken': skip_token, 'offset': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+
+def decode_token(token):
+    """
+    Returns the $skipToken and the offset encoded in a continuation token.
+    """
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        return decoded['skipToken'], int(decoded['offset'])
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise CLIError("Invalid continuation token '{}'. Use the token printed by a previous --max-items run."
+                       .format(token))
+
+
+def skip_token_of(next_link):
+    """
+    Returns the $skipToken query parameter of a nextLink, or None.
+    """
+    try:
+        from urllib.parse import urlparse, parse_qs
+    except ImportError:
+        from urlparse import urlparse, parse_qs  # pylint: disable=import-error
+    for (name, values) in parse_qs(urlparse(next_link).query).items():
+        if name.lower() == '$skiptoken':
+            return values[0]
+    return None
+
+
+def read_slice(paged, max_items=None, skip_token=None, offset=0):
+    """
+    Reads at most max_items items from a Paged object, skipping the first offset items of its first page.
+    skip_token is the $skipToken which the first page was requested with.
+    Returns the items, and the continuation token to read the next ones, or None if the list is over.
+    """
+    items = []
+    page_token = skip_token
+    resumable = True
+
+    def _token(token_offset):
+        if not resumable:
+            raise CLIError('The service did not return a $skipToken, the list can not be resumed. '
+                           'Remove --max-items to read the whole list.')
+        return encode_token(page_token, token_offset)
+
+    while True:
+        try:
+            page = paged.advance_page()
+        except StopIteration:
+            return items, None
+        page_offset, offset = offset, 0
+        page = page[page_offset:]
+        if max_items is not None and len(page) > max_items - len(items):
+            taken = max_items - len(items)
+            items.extend(page[:taken])
+            return items, _token(page_offset + taken)
+        items.extend(page)
+        if paged.next_link is None:
+            return items, None
+        page_token = skip_token_of(paged.next_link)
+        resumable = page_token is not None
+        if max_items is not None and len(items) == max_items:
+            return items, _token(0)
+
+
+def prefetch_pages(paged, depth=None, max_items=None):
+    """
+    Makes a Paged object request its pages on a background thread, up to depth pages ahead of the caller,
+    DEFAULT_PREFETCH_DEPTH by default. A depth of 0 leaves the Paged object unchanged.
+    The thread starts when the first page is requested, and follows the nextLinks of the raw responses,
+    so the requests do not wait for the pages to be deserialized. If max_items is set, the thread stops once
+    its pages hold max_items items, so that no page the caller does not need is requested; the caller fetches
+    any further page itself. The thread also stops when stop_prefetch is called. Returns the Paged object.
+    """
+    try:
+        from queue import Queue, Empty, Full
+    except ImportError:
+        from Queue import Queue, Empty, Full  # pylint: disable=import-error
+    from msrest.serialization import Deserializer
+    from ._config import DEFAULT_PREFETCH_DEPTH
+    from ._profiling import bind
+
+    depth = DEFAULT_PREFETCH_DEPTH if depth is None else int(depth)
+    if not depth:
+        return paged
+    get_next = paged._get_next  # pylint: disable=protected-access
+    next_link_key = paged._attribute_map['next_link']['key']  # pylint: disable=protected-access
+    pages = Queue(maxsize=depth)
+    stopped = threading.Event()
+    state = {'thread': None, 'done': False}
+
+    def _put(item):
+        # Waits for room in the queue, unless the caller is done with the pages.
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=_PREFETCH_WAIT)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _fetch(next_link):
+        fetched = 0
+        try:
+            while next_link is not None and not stopped.is_set():
+                data = Deserializer._unpack_content(get_next(next_link))  # pylint: disable=protected-access
+                if not _put((data, None)):
+                    return
+                next_link = data.get(next_link_key) if isinstance(data, dict) else None
+                fetched += len(data.get('value') or []) if isinstance(data, dict) else 0
+                if max_items is not None and fetched >= max_items:
+                    return
+        except Exception as ex:  # pylint: disable=broad-except
+            _put((None, ex))
+        finally:
+            state['done'] = True
+
+    def _get_next(next_link):
+        if state['thread'] is None:
+            state['thread'] = threading.Thread(target=bind(_fetch), args=(next_link,), name='csvmware-prefetch')
+            state['thread'].daemon = True
+            state['thread'].start()
+        while True:
+            try:
+                (data, error) = pages.get(timeout=_PREFETCH_WAIT)
+                break
+            except Empty:
+                # The thread puts its last page before it is done: past that, the caller fetches the pages.
+                if state['done'] and pages.empty():
+                    return get_next(next_link)
+        if error is not None:
+            raise error
+        return data
+
+    paged._get_next = _get_next  # pylint: disable=protected-access
+    paged._stop_prefetch = stopped.set  # pylint: disable=protected-access
+    return paged
+
+
+def stop_prefetch(paged):
+    """
+    Stops the prefetching of the pages of a Paged object, once the caller is done with them.
+    """
+    stop = getattr(paged, '_stop_prefetch', None)
+    if stop is not None:
+        stop()
@@ -13,9 +13,10 @@ from azure.cli.core.commands.parameters import (resource_group_name_type,
                                                 tags_type,
                                                 get_enum_type,
                                                 get_three_state_flag)
-from azext_csvmware.vendored_sdks.models import (StopMode,
-                                                  NICType,
-                                                  DiskIndependenceMode)
+from ._config import (STOP_MODES,
+                      NIC_TYPES,
+                      DISK_INDEPENDENCE_MODES,
+                      STREAM_FORMATS)
 from ._validators import (private_cloud_name_or_id_validator,
                           template_name_or_id_validator,
                           resource_pool_name_or_id_validator,
@@ -26,6 +27,10 @@ from ._validators import (private_cloud_name_or_id_validator,
                           template_only_name_validator,
                           vnet_only_name_validator,
                           vm_name_validator,
+                          max_parallel_validator,
+                          paging_validator,
+                          prefetch_depth_validator,
+                          max_staleness_validator,
                           location_validator)
 from ._actions import (AddNicAction, AddDiskAction)
 
@@ -49,7 +54,7 @@ def load_arguments(self, _):
         c.argument('amount_of_ram', options_list=['--ram'],
                    validator=ram_validator,
                    help="The amount of memory in MB. The default is taken from the vSphere VM template specified.")
-        c.argument('stop_mode', options_list=['--mode'], arg_type=get_enum_type(StopMode),
+        c.argument('stop_mode', options_list=['--mode'], arg_type=get_enum_type(STOP_MODES),
                    help="Stop mode.")
         c.argument('number_of_cores', options_list=['--cores'],
                    validator=cores_validator,
@@ -74,6 +79,98 @@ def load_arguments(self, _):
 
         c.argument('disks', options_list=['--disk'], action=AddDiskAction, arg_group='Storage', nargs='+')
 
+    with self.argument_context('csvmware vm list') as c:
+        c.argument('resource_group_name', arg_type=resource_group_name_type, nargs='+',
+                   help="Names of resource groups. Space-separated. If not specified, the virtual machines of the whole subscription are listed.")
+        c.argument('subscriptions', options_list=['--subscriptions'], nargs='+',
+                   help="Names or IDs of subscriptions to list the virtual machines from, concurrently. Space-separated. The default is the current subscription.")
+        c.argument('locations', options_list=['--locations'], nargs='+',
+                   help="Only list the virtual machines in these regions. Space-separated.")
+        c.argument('max_parallel', options_list=['--max-parallel'],
+                   validator=max_parallel_validator,
+                   help="Maximum number of scopes listed at a time, when several resource groups or subscriptions are specified. Default: set by the client-side throttling of the subscription.")
+        c.argument('filter_expression', options_list=['--filter'],
+                   help="OData filter applied by the service, e.g. \"location eq 'eastus'\".")
+        c.argument('top', options_list=['--top'], validator=paging_validator,
+                   help="Maximum number of virtual machines per page returned by the service.")
+        c.argument('skip_token', options_list=['--skip-token'],
+                   help="$skipToken of the page to start the list from, as returned by the service in a nextLink.")
+        c.argument('max_items', options_list=['--max-items'],
+                   help="Maximum number of virtual machines to list. If there are more, a token to list them with --next-token is printed.")
+        c.argument('next_token', options_list=['--next-token'],
+                   help="Token printed by a previous run with --max-items, to list the virtual machines from where it stopped.")
+        c.argument('compact', options_list=['--compact'], action='store_true',
+                   help="Only keep the fields shown by the table output, in compact records. Reduces the memory used by large listings. Ignored if --fields is specified.")
+
+    for scope in ['csvmware vm list', 'csvmware private-cloud list', 'csvmware resource-pool list',
+                  'csvmware virtual-network list', 'csvmware vm-template list']:
+        with self.argument_context(scope) as c:
+            c.argument('stream', options_list=['--stream'], arg_type=get_enum_type(STREAM_FORMATS),
+                       help="Write the items as each page is received, as JSON lines or as table rows, instead of once the whole list is received. --output and --query do not apply.")
+            c.argument('fields', options_list=['--fields'], nargs='+',
+                       help="Only read and output these fields of the items. Space-separated. Nested fields are separated by dots, e.g. nics.ipAddresses. The other fields, and the nested objects not listed, are skipped.")
+            c.argument('prefetch_depth', options_list=['--prefetch-depth'], validator=prefetch_depth_validator,
+                       help="Number of pages requested ahead of the one being output, on a background thread. 0 requests a page only once the previous one is output. Default: 2.")
+
+    for scope in ['csvmware vm list', 'csvmware vm show', 'csvmware vm nic list', 'csvmware vm disk list',
+                  'csvmware vm-template list', 'csvmware virtual-network list']:
+        with self.argument_context(scope) as c:
+            c.argument('offline', options_list=['--offline'], action='store_true', arg_group='Inventory',
+                       help="Read from the local inventory, created by 'az csvmware inventory sync', instead of Azure. Fails if the inventory has no snapshot of the subscription.")
+            c.argument('max_staleness', options_list=['--max-staleness'], validator=max_staleness_validator,
+                       arg_group='Inventory',
+                       help="Read from the local inventory if it was synced at most this long ago, e.g. 90s, 5m or 2h, and from Azure otherwise. With --offline, fails if the inventory is older.")
+            c.argument('inventory_file', options_list=['--inventory-file'], arg_group='Inventory',
+                       help="Path of the inventory file. Default: csvmware_inventory.db in the az configuration directory.")
+
+    with self.argument_context('csvmware inventory sync') as c:
+        c.argument('locations', options_list=['--locations'], nargs='+',
+                   help="Regions to crawl the private clouds of, in addition to the regions of the virtual machines. Space-separated.")
+        c.argument('inventory_file', options_list=['--file'],
+                   help="Path of the inventory file. Default: csvmware_inventory.db in the az configuration directory.")
+        c.argument('max_parallel', options_list=['--max-parallel'],
+                   validator=max_parallel_validator,
+                   help="Maximum number of list requests in flight at a time. Default: set by the client-side throttling of the subscription.")
+        c.argument('incremental', options_list=['--incremental'], action='store_true',
+                   help="Update the previous snapshot: the virtual networks and templates of the private clouds which did not change, nor did their resource pools, are not listed again.")
+
+    with self.argument_context('csvmware vm create') as c:
+        c.argument('blueprint', options_list=['--blueprint'],
+                   help="Path to a blueprint file created by 'az csvmware vm blueprint compile'. The virtual machine is created from the blueprint without any lookup.")
+
+    for scope in ['csvmware vm create', 'csvmware vm blueprint compile']:
+        with self.argument_context(scope) as c:
+            c.extra('_refresh', options_list=['--refresh'], action='store_true',
+                    help="Read the location of the resource group from Azure instead of the local cache.")
+
+    with self.argument_context('csvmware vm blueprint compile') as c:
+        c.argument('blueprint_file', options_list=['--file', '-f'],
+                   help="Path of the file to write the blueprint to.")
+
+    with self.argument_context('csvmware vm create-batch') as c:
+        c.argument('manifest', options_list=['--manifest'],
+                   help="Path to a YAML or JSON file describing the virtual machines to create.")
+        c.argument('count', options_list=['--count'],
+                   help="Number of virtual machines to create from the command line arguments. Requires --name-prefix.")
+        c.argument('name_prefix', options_list=['--name-prefix'],
+                   help="Prefix of the virtual machine names when --count is used. The names are suffixed with 1 to N.")
+        c.argument('max_parallel', options_list=['--max-parallel'],
+                   help="Maximum number of create requests in flight at a time. Default: set by the client-side throttling of the subscription.")
+        c.argument('refresh', options_list=['--refresh'], action='store_true',
+                   help="Read the locations of the resource groups from Azure instead of the local cache.")
+
+    for scope in ['csvmware vm start', 'csvmware vm stop']:
+        with self.argument_context(scope) as c:
+            c.argument('vm_name', options_list=['--name', '-n'], nargs='+', validator=None,
+                       help="Names of the virtual machines. Space-separated.")
+            c.argument('ids', options_list=['--ids'], nargs='+',
+                       help="One or more resource IDs of virtual machines, possibly in different resource groups. Space-separated. If provided, no other 'Resource Id' arguments should be specified.")
+            c.argument('max_parallel', options_list=['--max-parallel'],
+                       help="Maximum number of requests in flight at a time, when several virtual machines are specified. Default: set by the client-side throttling of the subscription.")
+
+    with self.argument_context('csvmware vm stop') as c:
+        c.argument('stop_mode', required=True)
+
     with self.argument_context('csvmware vm nic') as c:
         c.argument('vm_name', options_list=['--vm-name'],
                    help="Name of the virtual machine.",
@@ -82,7 +179,7 @@ def load_arguments(self, _):
         c.argument('virtual_network', options_list=['--virtual-network'], arg_group='Network',
                    help="ID of the virtual network. You can also pass the basename of the ID.")
         c.argument('adapter', options_list=['--adapter'], arg_group='Network',
-                   arg_type=get_enum_type(NICType),
+                   arg_type=get_enum_type(NIC_TYPES),
                    help="The adapter for the NIC.")
         c.argument('power_on_boot', options_list=['--power-on-boot'], arg_group='Network',
                    arg_type=get_three_state_flag(),
@@ -100,7 +197,7 @@ def load_arguments(self, _):
         c.argument('controller', options_list=['--controller'], arg_group='Storage',
                    help="Id of the controller. Input 1000 for SCSI controller 0, and 15000 for SATA controller 0.")
         c.argument('independence_mode', options_list=['--mode'], arg_group='Storage',
-                   arg_type=get_enum_type(DiskIndependenceMode),
+                   arg_type=get_enum_type(DISK_INDEPENDENCE_MODES),
                    help="The disk independence mode.")
         c.argument('size', options_list=['--size'], arg_group='Storage',
                    validator=disk_size_validator,
@@ -160,3 +257,36 @@ def load_arguments(self, _):
                    help="Name or ID of the CloudSimple private cloud.")
         c.argument('location', get_location_type(self.cli_ctx),
                    help="Region in which the private cloud is present.")
+
+    with self.argument_context('csvmware operation') as c:
+        c.argument('ids', options_list=['--ids'], nargs='+',
+                   help="One or more operation URLs, as returned in the Azure-AsyncOperation header, or operation resource IDs. Space-separated.")
+        c.argument('region', options_list=['--location', '-l'],
+                   help="Region of the operation.")
+        c.argument('operation_id', options_list=['--name', '-n'],
+                   help="Name of the operation.")
+
+    with self.argument_context('csvmware operation wait') as c:
+        c.argument('timeout', options_list=['--timeout'],
+                   help="Maximum time to wait, in seconds. By default there is no limit.")
+
+    with self.argument_context('csvmware perf report') as c:
+        c.argument('operation', options_list=['--operation'],
+                   help="Only report this command, e.g. 'vm create'.")
+        c.argument('region', options_list=['--location', '-l'],
+                   help="Only report the commands in this region.")
+        c.argument('window', options_list=['--window'],
+                   help="Length of the time windows the percentiles are computed over, e.g. 30m, 1h or 1d. Default: 1d.")
+        c.argument('since', options_list=['--since'],
+                   help="Only report the commands run in this period, e.g. 2h or 7d. Default: 7d.")
+        c.argument('history_file', options_list=['--file'],
+                   help="Path of the latency history file. Default: csvmware_perf_history.db in the az configuration directory.")
+
+    for scope in [name for name in self.command_table if name.startswith('csvmware ')]:
+        with self.argument_context(scope) as c:
+            c.extra('_profile', options_list=['--profile'], action='store_true', arg_group='Profiling',
+                    help="Print to stderr where the time of the command went: validators, token acquisition, requests to Azure, client-side throttling, polling of long running operations, deserialization and output.")
+            c.extra('_profile_stats', options_list=['--profile-stats'], arg_group='Profiling',
+                    help="Path of a file to write the cProfile statistics of the main thread to, readable with pstats. Implies --profile.")
+            c.extra('_profile_trace', options_list=['--profile-trace'], arg_group='Profiling',
+                    help="Path of a JSON file to write the spans of the command to, in the Trace Event Format read by chrome://tracing and Perfetto. Implies --profile.")
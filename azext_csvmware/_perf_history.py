@@ -0,0 +1,186 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the local latency history of the commands, and its report (csvmware perf report).
+When the perf_history option of the csvmware section of the az configuration is true, every command appends
+a record to a SQLite file, built from the spans recorded by _profiling.py: the command, its region and private
+cloud, its duration, the number of requests it sent to Azure, the time spent waiting for its long running
+operations, and its outcome. The file is a ring buffer of the last PERF_HISTORY_MAX_RECORDS records.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from ._config import CONFIG_SECTION, PERF_HISTORY_FILE, PERF_HISTORY_MAX_RECORDS, PERF_HISTORY_SCHEMA_VERSION
+
+logger = get_logger(__name__)
+
+_LOCATION_PATTERN = re.compile(r'/locations/([^/]+)', re.IGNORECASE)
+_PRIVATE_CLOUD_PATTERN = re.compile(r'/privateclouds/([^/?]+)', re.IGNORECASE)
+
+_SCHEMA = [
+    # lro_duration is the time from the first request which started a long running operation
+    # to the last poll, NULL if the command started none.
+    "CREATE TABLE records (recorded_at REAL NOT NULL, operation TEXT NOT NULL, location TEXT, "
+    "private_cloud TEXT, duration REAL NOT NULL, http_count INTEGER NOT NULL, lro_duration REAL, "
+    "outcome TEXT NOT NULL)",
+    "CREATE INDEX records_recorded_at ON records (recorded_at)",
+]
+
+
+def history_path(cli_ctx, history_file=None):
+    """
+    Returns the path of the history file: history_file if set, else the perf_history_file option of the
+    az configuration, else PERF_HISTORY_FILE in the az configuration directory.
+    """
+    history_file = history_file or cli_ctx.config.get(CONFIG_SECTION, 'perf_history_file', None)
+    if history_file:
+        return os.path.abspath(os.path.expanduser(history_file))
+    return os.path.join(cli_ctx.config.config_dir, PERF_HISTORY_FILE)
+
+
+def recording_path(cli_ctx):
+    """
+    Returns the path of the history file if the commands are recorded, else None.
+    """
+    if not cli_ctx.config.getboolean(CONFIG_SECTION, 'perf_history', False):
+        return None
+    return history_path(cli_ctx)
+
+
+def connect(path):
+    """
+    Opens the history file, creating its table if the file is new or of another schema version.
+    """
+    connection = sqlite3.connect(path, timeout=30)
+    version = connection.execute('PRAGMA user_version').fetchone()[0]
+    if version != PERF_HISTORY_SCHEMA_VERSION:
+        with connection:
+            connection.execute('DROP TABLE IF EXISTS records')
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            connection.execute('PRAGMA user_version = {}'.format(PERF_HISTORY_SCHEMA_VERSION))
+    return connection
+
+
+def _operation(command):
+    command = ' '.join((command or '').split())
+    return command[len('csvmware '):] if command.startswith('csvmware ') else command
+
+
+def _spans(span):
+    yield span
+    for child in span.children:
+        for descendant in _spans(child):
+            yield descendant
+
+
+def _first_match(pattern, urls):
+    for url in urls:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def record_of(root, namespace=None):
+    """
+    Returns the record of the command whose spans are under root. The region and private cloud are read
+    from the arguments of the command, else from the URLs of its requests.
+    """
+    spans = list(_spans(root))
+    requests = [span for span in spans if 'http.method' in span.attributes]
+    urls = [span.attributes.get('http.url') or '' for span in requests]
+    location = getattr(namespace, 'location', None) or _first_match(_LOCATION_PATTERN, urls)
+    private_cloud = getattr(namespace, 'private_cloud', None)
+    private_cloud = private_cloud.rsplit('/', 1)[-1] if private_cloud else _first_match(_PRIVATE_CLOUD_PATTERN, urls)
+
+    started = [span.end for span in requests
+               if span.attributes['http.method'] != 'GET' and span.attributes.get('http.status_code') in (201, 202)]
+    polled = [span.end for span in spans
+              if span.name == 'LRO polling' or 'operationresults' in span.name.lower()]
+    lro_duration = max(max(polled) - min(started), 0) if started and polled else None
+    return (root.start, _operation(root.name), location and location.lower(), private_cloud and private_cloud.lower(),
+            root.end - root.start, len(requests), lro_duration, root.attributes.get('csvmware.outcome', 'failed'))
+
+
+def append(path, record):
+    """
+    Appends a record to the history, dropping the oldest records beyond PERF_HISTORY_MAX_RECORDS.
+    A history which can not be written does not fail the command.
+    """
+    try:
+        with closing(connect(path)) as connection:
+            with connection:
+                connection.execute('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)', record)
+                connection.execute('DELETE FROM records WHERE rowid <= (SELECT MAX(rowid) FROM records) - ?',
+                                   (PERF_HISTORY_MAX_RECORDS,))
+    except sqlite3.Error as ex:
+        logger.warning("Could not record the latency of the command in %s: %s", path, ex)
+
+
+def _percentile(values, percent):
+    # Nearest-rank percentile of sorted values.
+    if not values:
+        return None
+    rank = max(int(-(-len(values) * percent // 100)) - 1, 0)
+    return round(values[rank], 3)
+
+
+def report(cli_ctx, operation=None, region=None, window=86400, since=7 * 86400, history_file=None):
+    """
+    Returns the percentiles of the duration of the recorded commands per operation, region and time window,
+    over the last since seconds. The windows are aligned on multiples of their length, in UTC.
+    """
+    from datetime import datetime
+
+    path = history_path(cli_ctx, history_file)
+    if not os.path.exists(path):
+        raise CLIError("There is no latency history in {}. To record it, set perf_history = true in the [{}] section "
+                       "of the az configuration, or AZURE_CSVMWARE_PERF_HISTORY=true.".format(path, CONFIG_SECTION))
+    query = 'SELECT recorded_at, operation, location, duration, lro_duration, outcome FROM records ' \
+            'WHERE recorded_at >= ?'
+    parameters = [time.time() - since]
+    if operation:
+        query += ' AND operation = ?'
+        parameters.append(_operation(operation))
+    if region:
+        query += ' AND location = ?'
+        parameters.append(region.lower())
+    with closing(connect(path)) as connection:
+        rows = connection.execute(query + ' ORDER BY recorded_at', parameters).fetchall()
+
+    groups = {}
+    for (recorded_at, row_operation, location, duration, lro_duration, outcome) in rows:
+        key = (row_operation, location or '', int(recorded_at // window))
+        groups.setdefault(key, []).append((duration, lro_duration, outcome))
+
+    results = []
+    for key in sorted(groups):
+        (row_operation, location, index) = key
+        records = groups[key]
+        durations = sorted(duration for (duration, _, _) in records)
+        lro_durations = sorted(lro for (_, lro, _) in records if lro is not None)
+        results.append(OrderedDict([
+            ('operation', row_operation),
+            ('location', location or None),
+            ('windowStart', datetime.utcfromtimestamp(index * window).strftime('%Y-%m-%dT%H:%M:%SZ')),
+            ('count', len(records)),
+            ('failed', len([outcome for (_, _, outcome) in records if outcome != 'succeeded'])),
+            ('p50', _percentile(durations, 50)),
+            ('p95', _percentile(durations, 95)),
+            ('p99', _percentile(durations, 99)),
+            ('lroP50', _percentile(lro_durations, 50)),
+            ('lroP95', _percentile(lro_durations, 95)),
+            ('lroP99', _percentile(lro_durations, 99)),
+        ]))
+    return results
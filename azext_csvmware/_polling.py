@@ -0,0 +1,142 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains a polling engine which tracks many long running operations from a single loop.
+Operations are identified by their region and operation id, which are read from the
+Azure-AsyncOperation header returned when they are started.
+"""
+
+import re
+
+from knack.util import CLIError
+
+from ._config import (OPERATION_POLL_INTERVAL,
+                      OPERATION_POLL_MAX_ERRORS,
+                      OPERATION_POLL_MAX_PARALLEL,
+                      OPERATION_POLL_RATE,
+                      OPERATION_POLL_RETRY_BACKOFF)
+
+_OPERATION_PATTERN = re.compile(r'/locations/([^/]+)/operationresults/([^/?]+)', re.IGNORECASE)
+
+TERMINAL_STATUSES = ['succeeded', 'failed', 'canceled']
+
+
+def parse_operation_id(operation):
+    """
+    Returns the (region, operation id) tuple of an operation URL or resource id.
+    Returns None if the value does not identify an operation.
+    """
+    match = _OPERATION_PATTERN.search(operation or '')
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+def operation_from_response(raw_result):
+    """
+    Returns the (region, operation id) tuple of the operation started by a request sent with raw=True.
+    Returns None if the request completed synchronously.
+    """
+    headers = raw_result.response.headers
+    return parse_operation_id(headers.get('Azure-AsyncOperation') or headers.get('Location'))
+
+
+def _retry_after(raw_result):
+    try:
+        return max(int(raw_result.response.headers.get('Retry-After')), 0)
+    except (TypeError, ValueError):
+        return OPERATION_POLL_INTERVAL
+
+
+def is_transient(error):
+    """
+    Returns True if a poll which failed with this error may succeed if sent again:
+    the request got no response, or the response is HTTP 408, 429 or 5xx.
+    """
+    from msrest.exceptions import ClientRequestError
+
+    response = getattr(error, 'response', None)
+    status_code = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status_code is None:
+        return isinstance(error, ClientRequestError)
+    return status_code in (408, 429) or status_code >= 500
+
+
+def wait_for_operations(client, operations, timeout=None):
+    """
+    Polls many long running operations until they all complete.
+    operations is a list of (region, operation id) tuples.
+    Every operation is polled again after the delay requested by the service in its Retry-After header.
+    A poll which fails with a transient error is sent again with an exponential backoff; the operation fails
+    only if the error is not transient, or after OPERATION_POLL_MAX_ERRORS errors in a row.
+    At most OPERATION_POLL_MAX_PARALLEL polls are in flight, and at most OPERATION_POLL_RATE are sent per second.
+    Returns a list of (OperationResource, error) tuples, in the same order as operations.
+    """
+    import heapq
+    import time
+    from ._bulk import run_in_parallel
+    from ._profiling import span
+
+    results = [(None, None)] * len(operations)
+    errors = [0] * len(operations)
+    start = time.time()
+    due = [(start, index) for index in range(len(operations))]
+    heapq.heapify(due)
+
+    def _poll(index):
+        (region, operation_id) = operations[index]
+        return client.operations.get(region, operation_id, raw=True)
+
+    while due:
+        now = time.time()
+        if timeout is not None and now - start > float(timeout):
+            for (_, index) in due:
+                results[index] = (results[index][0], CLIError('Timed out waiting for the operation to complete.'))
+            break
+        if due[0][0] > now:
+            delay = due[0][0] - now
+            if timeout is not None:
+                delay = min(delay, start + float(timeout) - now + 0.1)
+            time.sleep(delay)
+            continue
+
+        batch = []
+        while due and due[0][0] <= now and len(batch) < OPERATION_POLL_RATE:
+            batch.append(heapq.heappop(due)[1])
+
+        with span('poll', operations=len(batch)):
+            polled = run_in_parallel(_poll, batch, OPERATION_POLL_MAX_PARALLEL)
+        for (index, raw_result, error) in polled:
+            if error is not None:
+                errors[index] += 1
+                if errors[index] >= OPERATION_POLL_MAX_ERRORS or not is_transient(error):
+                    results[index] = (None, error)
+                else:
+                    backoff = OPERATION_POLL_RETRY_BACKOFF * 2 ** (errors[index] - 1)
+                    heapq.heappush(due, (time.time() + backoff, index))
+                continue
+            errors[index] = 0
+            operation = raw_result.output
+            results[index] = (operation, None)
+            if operation is None or (operation.status or '').lower() not in TERMINAL_STATUSES:
+                heapq.heappush(due, (time.time() + _retry_after(raw_result), index))
+
+        # Polls are spread so that no more than OPERATION_POLL_RATE are sent per second.
+        elapsed = time.time() - now
+        if due and elapsed < 1:
+            time.sleep(1 - elapsed)
+
+    return results
+
+
+def operation_error(operation):
+    """
+    Returns the error message of a completed operation, or None if it succeeded.
+    """
+    if operation is None or (operation.status or '').lower() == 'succeeded':
+        return None
+    if operation.error is not None and operation.error.message:
+        return operation.error.message
+    return 'Operation ' + (operation.name or '') + ' ' + (operation.status or 'did not complete').lower() + '.'
@@ -0,0 +1,320 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the profiling of a command run with --profile, or traced (see _tracing.py).
+The time spent by the command is recorded as a tree of spans: the validators, the requests sent to Azure
+with the token acquisition and the client-side throttling they include, the deserialization of the responses,
+the polling of long running operations, and the output. When the command ends, the tree is printed to stderr,
+and is written as a JSON trace (--profile-trace) next to the cProfile statistics (--profile-stats) if asked.
+The spans of the requests, token acquisitions and deserializations are recorded by the clients, which are
+instrumented when they are created (see _instrumentation.py). This file does not import msrest, as it is
+imported to register the --profile hooks whenever the arguments are loaded.
+The spans of a traced command are given to its exporters, and the commands recorded in the latency history
+(see _perf_history.py) are summarized from them.
+"""
+
+import atexit
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from weakref import WeakSet
+
+# The threads whose spans are not bound to a parent span, grouped under a span named after them.
+_THREAD_NAMES = [('LROPoller', 'LRO polling'), ('AzureOperationPoller', 'LRO polling')]
+
+_profiler = None
+_contexts = WeakSet()
+_finish_at_exit = False
+
+
+class _Span(object):  # pylint: disable=too-few-public-methods
+    __slots__ = ('name', 'start', 'end', 'attributes', 'children', 'thread')
+
+    def __init__(self, name, start=None, attributes=None):
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end = None
+        self.attributes = attributes or {}
+        self.children = []
+        self.thread = threading.current_thread().name
+
+
+class Profiler(object):
+    """
+    The spans recorded for a command, and the cProfile statistics of its main thread.
+    """
+
+    def __init__(self, command, stats_file=None, trace_file=None, report=True, exporters=None, history_file=None):
+        self.root = _Span(command)
+        self.stats_file = stats_file
+        self.trace_file = trace_file
+        self.report_tree = report
+        self.exporters = exporters or []
+        self.history_file = history_file
+        self.namespace = None
+        self.stats = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._local.stack = [self.root]
+        if stats_file:
+            import cProfile
+            self.stats = cProfile.Profile()
+            self.stats.enable()
+
+    def stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if not stack:
+            name = threading.current_thread().name
+            name = next((span_name for (prefix, span_name) in _THREAD_NAMES if name.startswith(prefix)), name)
+            stack = self._local.stack = [self.add(self.root, _Span(name))]
+        return stack
+
+    def add(self, parent, span):
+        with self._lock:
+            parent.children.append(span)
+        return span
+
+    def finish(self, succeeded):
+        """
+        Ends the spans still open, the spans of the other threads ending with their last child.
+        """
+        def _end(span, now):
+            for child in span.children:
+                _end(child, now)
+            if span.end is None:
+                span.end = max([child.end for child in span.children] or [now])
+
+        now = time.time()
+        if self.stats is not None:
+            self.stats.disable()
+        for span in self._local.stack:
+            span.end = span.end or now
+        _end(self.root, now)
+        self.root.attributes['csvmware.outcome'] = 'succeeded' if succeeded else 'failed'
+
+    def report(self):
+        """
+        Returns the timing tree. The sibling spans of the same name are merged, and their number is shown.
+        """
+        lines = ['Profile of {} ({:.1f} ms):'.format(self.root.name, _ms(self.root)),
+                 '{:>10} {:>10} {:>6}  {}'.format('total ms', 'self ms', 'calls', 'span')]
+
+        def _merge(spans, depth):
+            groups = []
+            for span in spans:
+                group = next((group for group in groups if group[0].name == span.name), None)
+                if group is None:
+                    groups.append([span])
+                else:
+                    group.append(span)
+            for group in groups:
+                total = sum(_ms(span) for span in group)
+                children = [child for span in group for child in span.children]
+                own = max(total - sum(_ms(child) for child in children), 0)
+                lines.append('{:>10.1f} {:>10.1f} {:>6}  {}{}'.format(total, own, len(group), '  ' * depth,
+                                                                    group[0].name))
+                _merge(children, depth + 1)
+
+        _merge([self.root], 0)
+        return '\n'.join(lines) + '\n'
+
+    def trace(self):
+        """
+        Returns the spans in the Trace Event Format, read by chrome://tracing and Perfetto.
+        """
+        import os
+
+        events = []
+
+        def _events(span):
+            events.append({'name': span.name, 'ph': 'X', 'pid': os.getpid(), 'tid': span.thread,
+                           'ts': round((span.start - self.root.start) * 1e6, 1),
+                           'dur': round((span.end - span.start) * 1e6, 1), 'args': span.attributes})
+            for child in span.children:
+                _events(child)
+
+        _events(self.root)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def _ms(span):
+    return (span.end - span.start) * 1000
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Records the code run in the with block as a span, child of the current span of the thread.
+    Yields the span, or None when no command is profiled.
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield None
+        return
+    stack = profiler.stack()
+    current = profiler.add(stack[-1], _Span(name, attributes=attributes))
+    stack.append(current)
+    try:
+        yield current
+    except Exception as ex:
+        current.attributes['exception.type'] = type(ex).__name__
+        current.attributes['exception.message'] = str(ex)
+        raise
+    finally:
+        current.end = time.time()
+        stack.pop()
+
+
+def annotate(**attributes):
+    """
+    Sets attributes of the current span of the thread.
+    """
+    profiler = _profiler
+    if profiler is not None:
+        profiler.stack()[-1].attributes.update(attributes)
+
+
+def record(name, start, end, **attributes):
+    """
+    Records a span which already ended.
+    """
+    profiler = _profiler
+    if profiler is not None:
+        recorded = profiler.add(profiler.stack()[-1], _Span(name, start, attributes))
+        recorded.end = end
+
+
+def bind(func):
+    """
+    Makes func, run on another thread, record its spans under the current span of the calling thread.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return func
+    parent = profiler.stack()[-1]
+
+    def _bound(*args, **kwargs):
+        stack = getattr(profiler._local, 'stack', None)  # pylint: disable=protected-access
+        profiler._local.stack = [parent]  # pylint: disable=protected-access
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler._local.stack = stack  # pylint: disable=protected-access
+    return _bound
+
+
+def _profiled_validator(validator):
+    from azure.cli.core.util import get_arg_list
+
+    arg_list = get_arg_list(validator)
+
+    def _validator(cmd, namespace):
+        kwargs = dict((name, value) for (name, value) in [('cmd', cmd), ('namespace', namespace), ('ns', namespace)]
+                      if name in arg_list)
+        with span(getattr(validator, '__name__', 'validator')):
+            validator(**kwargs)
+    return _validator
+
+
+def start(command, stats_file=None, trace_file=None, report=True, exporters=None, history_file=None):
+    """
+    Starts profiling a command, on the calling thread.
+    The commands which fail are finished at exit, as they do not raise the post-execute event.
+    """
+    global _profiler, _finish_at_exit  # pylint: disable=global-statement
+
+    finish(succeeded=False)
+    if not _finish_at_exit:
+        atexit.register(finish)
+        _finish_at_exit = True
+    _profiler = Profiler(command, stats_file, trace_file, report, exporters, history_file)
+    return _profiler
+
+
+def finish(succeeded=False):
+    """
+    Stops profiling, prints the timing tree, writes the trace and statistics files, exports the spans,
+    and appends the command to the latency history.
+    Does nothing if no command is profiled. This is also called at exit, for the commands which failed.
+    """
+    import json
+    global _profiler  # pylint: disable=global-statement
+
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return
+    profiler.finish(succeeded)
+    if profiler.stats is not None:
+        profiler.stats.dump_stats(profiler.stats_file)
+    if profiler.trace_file:
+        with open(profiler.trace_file, 'w') as trace:
+            json.dump(profiler.trace(), trace)
+    if profiler.report_tree:
+        sys.stderr.write(profiler.report())
+    if profiler.exporters:
+        from ._tracing import export
+        export(profiler.root, profiler.exporters)
+    if profiler.history_file:
+        from ._perf_history import append, record_of
+        append(profiler.history_file, record_of(profiler.root, profiler.namespace))
+
+
+def _on_parsed(cli_ctx, **kwargs):
+    import os
+    from ._perf_history import recording_path
+    from ._tracing import get_exporters
+
+    args = kwargs.get('args')
+    command = kwargs.get('command', '')
+    stats_file = getattr(args, '_profile_stats', None)
+    trace_file = getattr(args, '_profile_trace', None)
+    report = bool(getattr(args, '_profile', False) or stats_file or trace_file)
+    exporters = get_exporters(cli_ctx) if command.startswith('csvmware') else []
+    # The history is recorded only when perf_history is set, and the reports of the history are not recorded in it.
+    history_file = recording_path(cli_ctx) \
+        if command.startswith('csvmware') and not command.startswith('csvmware perf') else None
+    if not (report or exporters or history_file):
+        return
+    profiler = start(command, stats_file and os.path.expanduser(stats_file),
+                     trace_file and os.path.expanduser(trace_file), report, exporters, history_file)
+    profiler.namespace = args
+    profiler.root.attributes.update({
+        'az.command': kwargs.get('command'),
+        'az.client_request_id': cli_ctx.data.get('headers', {}).get('x-ms-client-request-id')})
+    # The history needs only the requests: the validators are wrapped when their spans are reported or exported,
+    # for this invocation only, as the namespace is.
+    if not (report or exporters):
+        return
+    if getattr(args, '_command_validator', None):
+        args._command_validator = _profiled_validator(args._command_validator)  # pylint: disable=protected-access
+    args._argument_validators = [_profiled_validator(validator)  # pylint: disable=protected-access
+                                 for validator in getattr(args, '_argument_validators', None) or []]
+
+
+def _on_result(_, **__):
+    profiler = _profiler
+    if profiler is not None:
+        stack = profiler.stack()
+        stack.append(profiler.add(stack[-1], _Span('output')))
+
+
+def _on_executed(_, **__):
+    finish(succeeded=True)
+
+
+def register(cli_ctx):
+    """
+    Registers the handlers which profile a command run with --profile, traced or recorded in the latency history,
+    once per CLI context.
+    """
+    from knack.events import EVENT_INVOKER_POST_PARSE_ARGS, EVENT_INVOKER_FILTER_RESULT, EVENT_CLI_POST_EXECUTE
+
+    if cli_ctx in _contexts:
+        return
+    _contexts.add(cli_ctx)
+    cli_ctx.register_event(EVENT_INVOKER_POST_PARSE_ARGS, _on_parsed)
+    cli_ctx.register_event(EVENT_INVOKER_FILTER_RESULT, _on_result)
+    cli_ctx.register_event(EVENT_CLI_POST_EXECUTE, _on_executed)
@@ -0,0 +1,141 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the streaming output of the list commands (--stream).
+The items are written as each page is deserialized, instead of once the whole list is built and transformed,
+so that the time to the first row and the memory used do not depend on the length of the list.
+"""
+
+import json
+
+# The keys that the az table output leaves out.
+_SKIPPED_COLUMNS = ('id', 'type', 'etag')
+
+
+def iter_pages(items):
+    """
+    Yields the pages of a Paged object, as lists of models, as they are received.
+    Any other iterable is a single page.
+    """
+    from msrest.paging import Paged
+
+    if not isinstance(items, Paged):
+        yield list(items)
+        return
+    while True:
+        try:
+            page = items.advance_page()
+        except StopIteration:
+            return
+        yield page
+
+
+def _add_resource_group(result):
+    """
+    Adds a resourceGroup, parsed from the id, to the objects of result that have none, as az does.
+    """
+    if isinstance(result, list):
+        for item in result:
+            _add_resource_group(item)
+    elif isinstance(result, dict):
+        try:
+            parts = result['id'].split('/')
+        except (KeyError, AttributeError):
+            parts = []
+        if len(parts) > 4 and parts[3].lower() == 'resourcegroups' and \
+                'resourcegroup' not in [key.lower() for key in result]:
+            result['resourceGroup'] = parts[4]
+        for value in list(result.values()):
+            _add_resource_group(value)
+
+
+def to_output(items):
+    """
+    What the az invoker does to a result before the output formatter sees it.
+    """
+    from knack.util import todict
+
+    result = todict(items)
+    _add_resource_group(result)
+    return result
+
+
+def _table_row(item, sort_keys):
+    """
+    The cells of an item in the az table output: its scalar values, under their capitalized keys.
+    """
+    from collections import OrderedDict
+
+    row = OrderedDict()
+    if isinstance(item, list):
+        for (index, value) in enumerate(item):
+            row['Column' + str(index + 1)] = value
+    elif not isinstance(item, dict):
+        row['Result'] = item
+    else:
+        for key in sorted(item) if sort_keys else item:
+            value = item[key]
+            if key not in _SKIPPED_COLUMNS and value is not None and not isinstance(value, (list, dict, set)):
+                row[key[:1].upper() + key[1:]] = value
+    return row
+
+
+class _TableWriter(object):  # pylint: disable=too-few-public-methods
+    """
+    Writes table rows a page at a time, in the layout of the az table output.
+    The widths of the columns are set by the first page; a wider value is written in full.
+    A page with columns that the previous ones did not have starts a new table, with its own header.
+    """
+
+    def __init__(self, out_file, table_transformer):
+        self._out_file = out_file
+        self._table_transformer = table_transformer
+        self._sort_keys = not table_transformer
+        self._columns = None
+        self._widths = None
+
+    def _write_line(self, cells):
+        line = '  '.join(cell.ljust(width) for (cell, width) in zip(cells, self._widths))
+        self._out_file.write(line.rstrip() + '\n')
+
+    def write(self, page):
+        rows = self._table_transformer(page) if self._table_transformer else page
+        rows = [_table_row(row, self._sort_keys) for row in rows]
+        if not rows:
+            return
+
+        columns = list(self._columns or [])
+        for row in rows:
+            columns.extend(key for key in row if key not in columns)
+        cells = [['' if row.get(column) is None else str(row[column]) for column in columns] for row in rows]
+
+        if columns != self._columns:
+            if self._columns is not None:
+                self._out_file.write('\n')
+            self._columns = columns
+            self._widths = [max([len(column) + 2] + [len(row[i]) for row in cells]) for (i, column) in
+                            enumerate(columns)]
+            self._write_line(columns)
+            self._write_line(['-' * width for width in self._widths])
+        for row in cells:
+            self._write_line(row)
+
+
+def stream_output(cli_ctx, items, stream, table_transformer=None):
+    """
+    Writes items, a page at a time: one JSON object per line (jsonl), or the rows of a table (table).
+    table_transformer is the one of the command, if any.
+    Returns None, so that there is nothing left for az to output.
+    """
+    out_file = cli_ctx.out_file
+    writer = _TableWriter(out_file, table_transformer) if stream == 'table' else None
+    for page in iter_pages(items):
+        page = to_output(page)
+        if writer is not None:
+            writer.write(page)
+        else:
+            for item in page:
+                out_file.write(json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(',', ':')) + '\n')
+        out_file.flush()
@@ -0,0 +1,240 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the client-side throttling of the requests sent to ARM.
+Every request of the extension goes through the controller of its subscription, shared by all the clients
+and threads of the process. The controller
+- keeps a token bucket per kind of request (reads, writes and deletes), which never holds more tokens than
+  the x-ms-ratelimit-remaining-subscription-* headers of the last response say remain,
+- pauses the subscription for the Retry-After delay of a throttled (HTTP 429) response, and sends the request again,
+- bounds the number of requests in flight with an AIMD limit: the limit grows by one for every limit
+  requests which complete, and is halved when a request is throttled or is much slower than usual.
+"""
+
+import threading
+import time
+
+from knack.log import get_logger
+from msrest.pipeline import HTTPPolicy
+
+from ._config import (DEFAULT_MAX_PARALLEL,
+                      THROTTLE_BUCKETS,
+                      THROTTLE_MAX_CONCURRENCY,
+                      THROTTLE_MAX_RETRIES,
+                      THROTTLE_RETRY_AFTER,
+                      THROTTLE_LATENCY_FACTOR,
+                      THROTTLE_LATENCY_FLOOR)
+from ._profiling import annotate, record
+
+logger = get_logger(__name__)
+
+_REMAINING_HEADER = 'x-ms-ratelimit-remaining-subscription-'
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def request_kind(method):
+    """
+    Returns the kind of request ARM counts a request with this HTTP method as.
+    """
+    method = (method or '').upper()
+    if method in ('GET', 'HEAD', 'OPTIONS'):
+        return 'reads'
+    if method == 'DELETE':
+        return 'deletes'
+    return 'writes'
+
+
+def retry_after(headers, default=THROTTLE_RETRY_AFTER):
+    """
+    Returns the delay in seconds of a Retry-After header, given in seconds or as an HTTP date.
+    """
+    from email.utils import parsedate_tz, mktime_tz
+
+    value = headers.get('Retry-After')
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return default
+    return max(mktime_tz(parsed) - time.time(), 0)
+
+
+class _TokenBucket(object):
+    """
+    A bucket of capacity tokens, refilled with rate tokens per second.
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = self.capacity
+        self.stamp = time.time()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def take(self, now):
+        """
+        Takes a token. Returns 0, or the delay in seconds until a token is available, none being taken.
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def limit(self, now, remaining):
+        """
+        Drops the tokens in excess of the number of requests ARM still accepts.
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class ThrottleController(object):
+    """
+    The client-side throttling of the requests to a subscription.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._buckets = dict((kind, _TokenBucket(*bucket)) for (kind, bucket) in THROTTLE_BUCKETS.items())
+        self._latency = {}
+        self._decreased_at = 0
+        self.limit = float(DEFAULT_MAX_PARALLEL)
+        self.in_flight = 0
+        self.paused_until = 0
+        self.throttled = 0
+
+    def acquire(self, kind):
+        """
+        Waits until a request of this kind can be sent. Returns the time at which it is sent.
+        """
+        with self._condition:
+            while True:
+                now = time.time()
+                if now < self.paused_until:
+                    self._condition.wait(self.paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    delay = self._buckets[kind].take(now)
+                    if not delay:
+                        self.in_flight += 1
+                        return now
+                    self._condition.wait(delay)
+
+    def release(self, kind, sent_at, response=None):
+        """
+        Records the outcome of a request sent at sent_at. response is None if no response was received.
+        Returns True if the request was throttled.
+        """
+        now = time.time()
+        throttled = False
+        with self._condition:
+            self.in_flight -= 1
+            if response is not None:
+                remaining = _remaining(response.headers, kind)
+                if remaining is not None:
+                    self._buckets[kind].limit(now, remaining)
+                if response.status_code == 429:
+                    throttled = True
+                    self.throttled += 1
+                    self.paused_until = max(self.paused_until, now + retry_after(response.headers))
+                    self._decrease(sent_at)
+                else:
+                    self._observe_latency(kind, sent_at, now - sent_at)
+            self._condition.notify_all()
+        return throttled
+
+    def _observe_latency(self, kind, sent_at, elapsed):
+        average = self._latency.get(kind)
+        if average is not None and elapsed > max(average * THROTTLE_LATENCY_FACTOR, THROTTLE_LATENCY_FLOOR):
+            self._decrease(sent_at)
+        else:
+            self.limit = min(self.limit + 1 / self.limit, float(THROTTLE_MAX_CONCURRENCY))
+        self._latency[kind] = elapsed if average is None else average + (elapsed - average) / 5
+
+    def _decrease(self, sent_at):
+        # The requests sent before the last decrease saw the same congestion, and do not halve the limit again.
+        if sent_at >= self._decreased_at:
+            self.limit = max(self.limit / 2, 1.0)
+            self._decreased_at = time.time()
+
+
+def _remaining(headers, kind):
+    try:
+        return int(headers.get(_REMAINING_HEADER + kind))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_controller(subscription_id):
+    """
+    Returns the controller of a subscription, shared by all the clients of the process.
+    """
+    key = (subscription_id or '').lower()
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = ThrottleController()
+        return controller
+
+
+class ThrottlingPolicy(HTTPPolicy):
+    """
+    Pipeline policy sending the requests of a client through the controller of its subscription.
+    A throttled request is sent again, at most THROTTLE_MAX_RETRIES times, after the Retry-After delay.
+    """
+
+    def __init__(self, controller):
+        super(ThrottlingPolicy, self).__init__()
+        self.controller = controller
+
+    def send(self, request, **kwargs):
+        kind = request_kind(request.http_request.method)
+        attempt = 0
+        while True:
+            queued_at = time.time()
+            sent_at = self.controller.acquire(kind)
+            if sent_at - queued_at > 0.001:
+                record('throttle wait', queued_at, sent_at)
+            try:
+                response = self.next.send(request, **kwargs)
+            except Exception:
+                self.controller.release(kind, sent_at)
+                raise
+            if not self.controller.release(kind, sent_at, response.http_response) or \
+                    attempt >= THROTTLE_MAX_RETRIES:
+                if attempt:
+                    annotate(**{'http.retry_count': attempt})
+                return response
+            attempt += 1
+            logger.info("Request throttled by Azure Resource Manager, sending it again after %.0f seconds.",
+                        retry_after(response.http_response.headers))
+
+
+def throttle(client):
+    """
+    Adds the throttling policy of the client's subscription at the end of its pipeline, just before the request is sent.
+    A client without an msrest pipeline, such as the track 2 clients of recent az versions, is returned unchanged.
+    """
+    # pylint: disable=protected-access
+    pipeline = getattr(getattr(client, 'config', None), 'pipeline', None)
+    if pipeline is None:
+        return client
+    policy = ThrottlingPolicy(get_controller(getattr(client.config, 'subscription_id', None)))
+    policy.next = pipeline._sender
+    if pipeline._impl_policies:
+        pipeline._impl_policies[-1].next = policy
+    pipeline._impl_policies.append(policy)
+    return client
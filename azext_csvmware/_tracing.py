@@ -0,0 +1,147 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+This file contains the export of the spans of a command as OpenTelemetry spans, in the OTLP JSON encoding.
+A command is traced when the csvmware section of the az configuration has one of these options:
+- trace_file: path of a file to which the spans of every command are appended, as one ExportTraceServiceRequest
+  per line, the format read by the otlpjsonfile receiver of the OpenTelemetry Collector.
+- trace_exporter: module:function, called with the ExportTraceServiceRequest of every command, as a dict.
+The spans are recorded by _profiling.py: the command, every request sent to Azure, and the polls of the
+long running operations. When the TRACEPARENT environment variable holds a W3C trace context,
+the span of the command is a child of its span, so that the command joins the trace of its caller.
+"""
+
+import binascii
+import os
+import re
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+def _random_id(size):
+    return binascii.hexlify(os.urandom(size)).decode('ascii')
+
+
+def file_exporter(path):
+    """
+    Returns an exporter appending the requests to a file, one JSON line per command.
+    """
+    import json
+
+    def _export(request):
+        with open(path, 'a') as trace_file:
+            trace_file.write(json.dumps(request, separators=(',', ':')) + '\n')
+    return _export
+
+
+def load_exporter(spec):
+    """
+    Returns the function named by module:function, or module.function.
+    """
+    import importlib
+    from knack.util import CLIError
+
+    (module_name, _, function_name) = spec.rpartition(':') if ':' in spec else spec.rpartition('.')
+    try:
+        return getattr(importlib.import_module(module_name), function_name)
+    except (ImportError, AttributeError, ValueError) as ex:
+        raise CLIError("Invalid trace exporter '{}': {}".format(spec, ex))
+
+
+def get_exporters(cli_ctx):
+    """
+    Returns the exporters configured in the az configuration. The command is not traced if there are none.
+    """
+    from ._config import CONFIG_SECTION
+
+    exporters = []
+    trace_file = cli_ctx.config.get(CONFIG_SECTION, 'trace_file', None)
+    if trace_file:
+        exporters.append(file_exporter(os.path.expanduser(trace_file)))
+    trace_exporter = cli_ctx.config.get(CONFIG_SECTION, 'trace_exporter', None)
+    if trace_exporter:
+        exporters.append(load_exporter(trace_exporter))
+    return exporters
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _attributes(attributes):
+    return [{'key': key, 'value': _value(value)} for (key, value) in sorted(attributes.items())
+            if value is not None]
+
+
+def _status(span):
+    attributes = span.attributes
+    if 'exception.type' in attributes:
+        return {'code': STATUS_CODE_ERROR, 'message': attributes.get('exception.message', '')}
+    if attributes.get('csvmware.outcome') == 'failed':
+        return {'code': STATUS_CODE_ERROR}
+    if attributes.get('http.status_code', 0) >= 400:
+        return {'code': STATUS_CODE_ERROR, 'message': 'HTTP {}'.format(attributes['http.status_code'])}
+    return {'code': STATUS_CODE_OK} if span.end is not None else {}
+
+
+def to_otlp(root):
+    """
+    Returns the ExportTraceServiceRequest of the spans under root, in the OTLP JSON encoding.
+    """
+    from ._config import TRACE_SERVICE_NAME
+
+    match = _TRACEPARENT.match(os.environ.get('TRACEPARENT', '').strip().lower())
+    (trace_id, parent_id) = match.groups() if match else (_random_id(16), None)
+    spans = []
+
+    def _spans(span, parent_span_id):
+        span_id = _random_id(8)
+        otlp_span = {
+            'traceId': trace_id,
+            'spanId': span_id,
+            'name': span.name,
+            'kind': SPAN_KIND_CLIENT if 'http.method' in span.attributes else SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(int(span.start * 1e9)),
+            'endTimeUnixNano': str(int(span.end * 1e9)),
+            'attributes': _attributes(dict(span.attributes, **{'thread.name': span.thread})),
+            'status': _status(span),
+        }
+        if parent_span_id:
+            otlp_span['parentSpanId'] = parent_span_id
+        spans.append(otlp_span)
+        for child in span.children:
+            _spans(child, span_id)
+
+    _spans(root, parent_id)
+    resource = {'service.name': TRACE_SERVICE_NAME, 'process.pid': os.getpid()}
+    return {'resourceSpans': [{'resource': {'attributes': _attributes(resource)},
+                               'scopeSpans': [{'scope': {'name': 'azext_csvmware'}, 'spans': spans}]}]}
+
+
+def export(root, exporters):
+    """
+    Gives the spans under root to the exporters. An exporter which fails does not fail the command.
+    """
+    request = to_otlp(root)
+    for exporter in exporters:
+        try:
+            exporter(request)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning("Could not export the trace of the command: %s", ex)
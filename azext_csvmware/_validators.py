@@ -19,7 +19,7 @@ def _check_postive_integer(parameter, value):
     """
     try:
         val = int(value)
-    except ValueError:
+    except (TypeError, ValueError):
         raise CLIError(parameter + ' should be a postive integer value.')
     if val <= 0:
         raise CLIError(parameter + ' should be a postive integer value.')
@@ -68,16 +68,81 @@ def disk_size_validator(namespace):
         _check_postive_integer('Size', namespace.size)
 
 
+def max_parallel_validator(namespace):
+    """
+    Checks whether the max parallel input is a integer or not
+    """
+    if namespace.max_parallel is not None:
+        _check_postive_integer('Max parallel', namespace.max_parallel)
+
+
+def prefetch_depth_validator(namespace):
+    """
+    Checks whether the prefetch depth input is a integer, 0 or more.
+    """
+    if namespace.prefetch_depth is not None:
+        try:
+            val = int(namespace.prefetch_depth)
+        except (TypeError, ValueError):
+            val = -1
+        if val < 0:
+            raise CLIError('Prefetch depth should be 0 or a postive integer value.')
+
+
+def _duration(value, name):
+    """
+    Converts a duration, e.g. 90, 90s, 5m, 2h or 1d, to seconds.
+    """
+    import re
+
+    match = re.match(r'^(\d+)([smhd]?)$', str(value).strip().lower())
+    if not match:
+        raise CLIError('{} should be a duration, e.g. 90s, 5m, 2h or 1d.'.format(name))
+    return int(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+
+
+def max_staleness_validator(namespace):
+    """
+    Converts the max staleness input, e.g. 90, 90s, 5m, 2h or 1d, to seconds.
+    """
+    if namespace.max_staleness is not None:
+        namespace.max_staleness = _duration(namespace.max_staleness, 'Max staleness')
+
+
+def perf_report_validator(namespace):
+    """
+    Converts the window and since inputs of the latency report to seconds.
+    """
+    namespace.window = _duration(namespace.window, 'Window')
+    namespace.since = _duration(namespace.since, 'Since')
+    if namespace.window <= 0 or namespace.since <= 0:
+        raise CLIError('Window and since should be longer than 0 seconds.')
+
+
+def paging_validator(namespace):
+    """
+    Checks the paging arguments of a list command.
+    """
+    if namespace.top is not None:
+        _check_postive_integer('Top', namespace.top)
+    if namespace.max_items is not None:
+        _check_postive_integer('Max items', namespace.max_items)
+    if namespace.skip_token is not None and namespace.next_token is not None:
+        raise CLIError('usage error: --skip-token | --next-token')
+
+
 def location_validator(cmd, namespace):
     """
     If the passed location is none, then it is defaulted to the resource group's location.
+    The resource group's location is cached, unless --refresh is passed.
     """
-    from ._client_factory import cf_resource_groups
+    from ._cache import get_resource_group_location
+    from ._profiling import span
 
     if not namespace.location:
-        client = cf_resource_groups(cmd.cli_ctx)
-        rg = client.get(namespace.resource_group_name)
-        namespace.location = rg.location
+        with span('location_validator'):
+            namespace.location = get_resource_group_location(cmd.cli_ctx, namespace.resource_group_name,
+                                                             refresh=getattr(namespace, '_refresh', False))
 
 
 def private_cloud_only_name_validator(namespace):
@@ -122,8 +187,11 @@ def private_cloud_name_or_id_validator(cmd, namespace):
     If not, then assuming that the passed value is a resource name, a resource id is constructed.
     If the constructed resource id is also invalid, an error is raised.
     """
+    from ._profiling import span
+
     if namespace.private_cloud:
-        namespace.private_cloud = vmware_cs_name_or_id_validator(cmd, namespace, 'private cloud')
+        with span('private_cloud_name_or_id_validator'):
+            namespace.private_cloud = vmware_cs_name_or_id_validator(cmd, namespace, 'private cloud')
 
 
 def template_name_or_id_validator(cmd, namespace):
@@ -132,11 +200,14 @@ def template_name_or_id_validator(cmd, namespace):
     If not, then assuming that the passed value is a resource name, a resource id is constructed.
     If the constructed resource id is also invalid, an error is raised.
     """
+    from ._profiling import span
+
     if namespace.template:
-        namespace.template = vmware_cs_name_or_id_validator(cmd, namespace,
-                                                            'template',
-                                                            'virtualmachinetemplates',
-                                                            namespace.template)
+        with span('template_name_or_id_validator'):
+            namespace.template = vmware_cs_name_or_id_validator(cmd, namespace,
+                                                                'template',
+                                                                'virtualmachinetemplates',
+                                                                namespace.template)
 
 
 def resource_pool_name_or_id_validator(cmd, namespace):
@@ -145,11 +216,14 @@ def resource_pool_name_or_id_validator(cmd, namespace):
     If not, then assuming that the passed value is a resource name, a resource id is constructed.
     If the constructed resource id is also invalid, an error is raised.
     """
+    from ._profiling import span
+
     if namespace.resource_pool:
-        namespace.resource_pool = vmware_cs_name_or_id_validator(cmd, namespace,
-                                                                 'resource pool',
-                                                                 'resourcepools',
-                                                                 namespace.resource_pool)
+        with span('resource_pool_name_or_id_validator'):
+            namespace.resource_pool = vmware_cs_name_or_id_validator(cmd, namespace,
+                                                                     'resource pool',
+                                                                     'resourcepools',
+                                                                     namespace.resource_pool)
 
 
 def virtual_network_name_or_id_validator(cmd, client, virtual_network, resource_group_name,
@@ -162,11 +236,13 @@ def virtual_network_name_or_id_validator(cmd, client, virtual_network, resource_
     from azure.cli.core.commands.client_factory import get_subscription_id
     from msrestazure.tools import is_valid_resource_id
     from ._config import PATH_CHAR
+    from ._profiling import span
 
     location = region
     private_cloud = pc
     if ((pc is None) and (region is None)):
-        virtual_machine = client.get(resource_group_name, vm_name)
+        with span('virtual_network_name_or_id_validator'):
+            virtual_machine = client.get(resource_group_name, vm_name)
         location = virtual_machine.location
         private_cloud = virtual_machine.private_cloud_id
 
@@ -186,6 +262,78 @@ def virtual_network_name_or_id_validator(cmd, client, virtual_network, resource_
     return virtual_network
 
 
+_NIC_KEYS = ['name', 'virtual-network', 'adapter', 'power-on-boot']
+_DISK_KEYS = ['name', 'controller', 'mode', 'size']
+
+
+def _check_entries(parameter, entries, allowed_keys):
+    """
+    Checks that entries is a list of dictionaries, each with a name, and only allowed_keys.
+    """
+    if not isinstance(entries, list):
+        raise CLIError(parameter + ' should be a list of KEY=VALUE entries.')
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise CLIError(parameter + ' should be a list of KEY=VALUE entries.')
+        for key in entry:
+            if key not in allowed_keys:
+                raise CLIError('Unknown key ' + str(key) + ' in ' + parameter + '. Allowed keys are: ' +
+                               ', '.join(allowed_keys) + '.')
+        if not entry.get('name'):
+            raise CLIError('name parameter not specified in ' + parameter + '.')
+
+
+def _scalar(value):
+    # Numbers in a manifest, such as a controller id, are passed on as strings, like on the command line.
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def _check_boolean(parameter, value):
+    """
+    Returns the boolean of a true/false value, given as a string or a boolean.
+    """
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() not in ('true', 'false'):
+        raise CLIError(parameter + ' should be true or false.')
+    return str(value).lower() == 'true'
+
+
+def parse_nics(nics, parameter='--nic'):
+    """
+    Checks the keys of the nics given with --nic or in a manifest, and converts power-on-boot to a boolean.
+    """
+    if nics is None:
+        return None
+    _check_entries(parameter, nics, _NIC_KEYS)
+    parsed = []
+    for nic in nics:
+        nic = dict((key, _scalar(value)) for (key, value) in nic.items())
+        if 'power-on-boot' in nic:
+            nic['power-on-boot'] = _check_boolean('power-on-boot', nic['power-on-boot'])
+        parsed.append(nic)
+    return parsed
+
+
+def parse_disks(disks, parameter='--disk'):
+    """
+    Checks the keys of the disks given with --disk or in a manifest, and converts size to an integer.
+    """
+    if disks is None:
+        return None
+    _check_entries(parameter, disks, _DISK_KEYS)
+    parsed = []
+    for disk in disks:
+        disk = dict((key, _scalar(value)) for (key, value) in disk.items())
+        if 'size' in disk:
+            _check_postive_integer('Size', disk['size'])
+            disk['size'] = int(disk['size'])
+        parsed.append(disk)
+    return parsed
+
+
 def vm_create_namespace_validator(cmd, namespace):
     """
     Command validator for the create vm command.
@@ -195,11 +343,100 @@ def vm_create_namespace_validator(cmd, namespace):
     because some of the other argument validators requires location to be present in the namespace,
     and location validator is responsible for extracting location from resource group,
     if it is not present in namespace.
+    If a blueprint is used, it already contains the resolved resource ids.
     """
     vm_name_validator(namespace)
+    if getattr(namespace, 'blueprint', None):
+        if namespace.private_cloud or namespace.template or namespace.resource_pool or \
+                namespace.nics or namespace.disks or namespace.amount_of_ram or \
+                namespace.number_of_cores or namespace.expose_to_guest_vm is not None:
+            raise CLIError('usage error: --blueprint cannot be used with the template arguments.')
+        return
+    if not namespace.private_cloud or not namespace.template or not namespace.resource_pool:
+        raise CLIError('usage error: --private-cloud --template --resource-pool | --blueprint FILE')
     location_validator(cmd, namespace)
     private_cloud_name_or_id_validator(cmd, namespace)
     resource_pool_name_or_id_validator(cmd, namespace)
     template_name_or_id_validator(cmd, namespace)
     cores_validator(namespace)
     ram_validator(namespace)
+    namespace.nics = parse_nics(namespace.nics)
+    namespace.disks = parse_disks(namespace.disks)
+
+
+def vm_create_batch_namespace_validator(namespace):
+    """
+    Command validator for the create-batch vm command.
+    The virtual machines are either described in a manifest, or are generated from a count and a name prefix.
+    The other arguments are validated for every virtual machine, when the batch is prepared.
+    """
+    if namespace.manifest:
+        if namespace.count or namespace.name_prefix:
+            raise CLIError('usage error: --manifest FILE | --count N --name-prefix PREFIX')
+    else:
+        if not namespace.count or not namespace.name_prefix:
+            raise CLIError('usage error: --manifest FILE | --count N --name-prefix PREFIX')
+        _check_postive_integer('Count', namespace.count)
+    max_parallel_validator(namespace)
+    cores_validator(namespace)
+    ram_validator(namespace)
+    namespace.nics = parse_nics(namespace.nics)
+    namespace.disks = parse_disks(namespace.disks)
+
+
+def vm_power_namespace_validator(namespace):
+    """
+    Command validator for the start and stop vm commands.
+    The virtual machines are either given by name, in a single resource group, or by resource id.
+    """
+    from msrestazure.tools import is_valid_resource_id, parse_resource_id
+
+    if namespace.ids:
+        if namespace.vm_name or namespace.resource_group_name:
+            raise CLIError('usage error: --ids ID [ID ...] | --resource-group NAME --name NAME [NAME ...]')
+        for resource_id in namespace.ids:
+            if not is_valid_resource_id(resource_id) or \
+                    parse_resource_id(resource_id).get('type', '').lower() != 'virtualmachines':
+                raise CLIError('Invalid virtual machine id ' + resource_id + '.')
+    else:
+        if not namespace.vm_name or not namespace.resource_group_name:
+            raise CLIError('usage error: --ids ID [ID ...] | --resource-group NAME --name NAME [NAME ...]')
+        for vm_name in namespace.vm_name:
+            _check_regex('Virtual machine name', vm_name)
+    max_parallel_validator(namespace)
+
+
+def vm_blueprint_namespace_validator(cmd, namespace):
+    """
+    Command validator for the blueprint compile command.
+    Same as the create vm command validator, except that there is no virtual machine name.
+    """
+    if not namespace.location and not namespace.resource_group_name:
+        raise CLIError('usage error: --location LOCATION | --resource-group NAME')
+    location_validator(cmd, namespace)
+    private_cloud_name_or_id_validator(cmd, namespace)
+    resource_pool_name_or_id_validator(cmd, namespace)
+    template_name_or_id_validator(cmd, namespace)
+    cores_validator(namespace)
+    ram_validator(namespace)
+    namespace.nics = parse_nics(namespace.nics)
+    namespace.disks = parse_disks(namespace.disks)
+
+
+def operation_namespace_validator(namespace):
+    """
+    Command validator for the operation commands.
+    An operation is either given by its location and name, or by its URL or resource id.
+    """
+    from ._polling import parse_operation_id
+
+    if namespace.ids:
+        if namespace.region or namespace.operation_id:
+            raise CLIError('usage error: --ids ID [ID ...] | --location LOCATION --name NAME')
+        for operation in namespace.ids:
+            if parse_operation_id(operation) is None:
+                raise CLIError('Invalid operation id ' + operation + '.')
+    elif not namespace.region or not namespace.operation_id:
+        raise CLIError('usage error: --ids ID [ID ...] | --location LOCATION --name NAME')
+    if getattr(namespace, 'timeout', None) is not None:
+        _check_postive_integer('Timeout', namespace.timeout)
@@ -14,9 +14,15 @@ from azext_csvmware._client_factory import (cf_vmware_cs,
                                              cf_private_cloud,
                                              cf_resource_pool,
                                              cf_virtual_machine_template,
-                                             cf_virtual_network)
-from ._format import (transform_vm_table_output, transform_vm_table_list)
-from ._validators import (vm_create_namespace_validator)
+                                             cf_virtual_network,
+                                             cf_operations)
+from ._format import (transform_vm_table_output, transform_vm_table_list, transform_perf_report_table)
+from ._validators import (vm_create_namespace_validator,
+                          vm_create_batch_namespace_validator,
+                          vm_blueprint_namespace_validator,
+                          vm_power_namespace_validator,
+                          operation_namespace_validator,
+                          perf_report_validator)
 
 
 def load_command_table(self, _):
@@ -29,15 +35,19 @@ def load_command_table(self, _):
 
     with self.command_group('csvmware vm', client_factory=cf_vmware_cs) as g:
         g.custom_command('create', 'create_vm', table_transformer=transform_vm_table_output, validator=vm_create_namespace_validator)
+        g.custom_command('create-batch', 'create_vm_batch', validator=vm_create_batch_namespace_validator, supports_no_wait=True)
+        g.custom_command('start', 'start_vm', validator=vm_power_namespace_validator, supports_no_wait=True)
+        g.custom_command('stop', 'stop_vm', validator=vm_power_namespace_validator, supports_no_wait=True)
+
+    with self.command_group('csvmware vm blueprint', client_factory=cf_vmware_cs) as g:
+        g.custom_command('compile', 'compile_vm_blueprint', validator=vm_blueprint_namespace_validator)
 
     with self.command_group('csvmware vm', client_factory=cf_virtual_machine) as g:
         g.custom_command('list', 'list_vm', table_transformer=transform_vm_table_list)
-        g.custom_command('show', 'get_vm', table_transformer=transform_vm_table_output)
+        g.custom_command('show', 'show_vm', table_transformer=transform_vm_table_output)
         g.generic_update_command('update', getter_name='get_vm', setter_name='update_vm',
                                  command_type=custom_type, supports_no_wait=True)
         g.custom_command('delete', 'delete_vm')
-        g.custom_command('start', 'start_vm')
-        g.custom_command('stop', 'stop_vm')
 
     with self.command_group('csvmware vm disk', client_factory=cf_virtual_machine) as g:
         g.custom_command('add', 'add_vdisk')
@@ -67,5 +77,17 @@ def load_command_table(self, _):
         g.custom_command('list', 'list_private_cloud')
         g.custom_command('show', 'show_private_cloud')
 
+    with self.command_group('csvmware operation', client_factory=cf_operations) as g:
+        g.custom_command('show', 'show_operation', validator=operation_namespace_validator)
+
+    with self.command_group('csvmware operation', client_factory=cf_vmware_cs) as g:
+        g.custom_command('wait', 'wait_operation', validator=operation_namespace_validator)
+
+    with self.command_group('csvmware inventory', client_factory=cf_vmware_cs) as g:
+        g.custom_command('sync', 'sync_inventory')
+
+    with self.command_group('csvmware perf') as g:
+        g.custom_command('report', 'perf_report', table_transformer=transform_perf_report_table, validator=perf_report_validator)
+
     with self.command_group('csvmware', is_preview=True):
         pass
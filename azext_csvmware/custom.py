@@ -8,14 +8,65 @@ The custom methods are linked to the commands at the time of command registerati
 """
 
 
+from knack.log import get_logger
 from knack.util import CLIError
 
+logger = get_logger(__name__)
 
-def list_private_cloud(client, location):
+
+def _list_output(cmd, result, stream, table_transformer=None, fields=None, prefetch_depth=None):
+    """
+    Returns the result of a list command, or streams it if stream, the format, is set.
+    If fields are set, the items are compact records with only these fields.
+    The next pages of a list are requested while the current one is output, up to prefetch_depth pages ahead.
+    """
+    from msrest.paging import Paged
+
+    if isinstance(result, Paged):
+        from ._paging import prefetch_pages
+        result = prefetch_pages(result, prefetch_depth)
+    if fields:
+        from ._compact import compact_pages
+        result = compact_pages(result, fields)
+    if not stream:
+        return result
+    from ._streaming import stream_output
+    return stream_output(cmd.cli_ctx, result, stream, table_transformer)
+
+
+def _inventory_snapshot(cmd, offline, max_staleness, inventory_file):
+    """
+    Returns the inventory snapshot to serve a read command from, or None to serve it live.
+    """
+    if not offline and max_staleness is None:
+        return None
+    from ._inventory import open_snapshot
+    return open_snapshot(cmd.cli_ctx, inventory_file, offline, max_staleness)
+
+
+def _list_from_inventory(cmd, client, table, location, private_cloud, resource_pool,
+                         offline, max_staleness, inventory_file):
+    """
+    Returns the virtual networks or the templates (table) of a resource pool from the inventory,
+    or None to list them live.
+    """
+    snapshot = _inventory_snapshot(cmd, offline, max_staleness, inventory_file)
+    if snapshot is None:
+        return None
+    result = snapshot.list_in_resource_pool(client, table, location, private_cloud, resource_pool)
+    if result is None and offline:
+        raise CLIError("The resource pool '{}' of private cloud '{}' is not in the inventory."
+                       .format(resource_pool, private_cloud))
+    return result
+
+
+def list_private_cloud(cmd, client, location, stream=None, fields=None,
+                       prefetch_depth=None):
     """
     Returns a list of private clouds in a region.
     """
-    return client.list(location)
+    return _list_output(cmd, client.list(location), stream, fields=fields,
+                        prefetch_depth=prefetch_depth)
 
 
 def show_private_cloud(client, private_cloud, location):
@@ -25,11 +76,13 @@ def show_private_cloud(client, private_cloud, location):
     return client.get(private_cloud, location)
 
 
-def list_resource_pool(client, private_cloud, location):
+def list_resource_pool(cmd, client, private_cloud, location, stream=None, fields=None,
+                       prefetch_depth=None):
     """
     Returns the list of resource pool in the specified private cloud.
     """
-    return client.list(location, private_cloud)
+    return _list_output(cmd, client.list(location, private_cloud), stream, fields=fields,
+                        prefetch_depth=prefetch_depth)
 
 
 def show_resource_pool(client, private_cloud, resource_pool, location):
@@ -39,11 +92,17 @@ def show_resource_pool(client, private_cloud, resource_pool, location):
     return client.get(location, private_cloud, resource_pool)
 
 
-def list_virtual_networks(client, private_cloud, resource_pool, location):
+def list_virtual_networks(cmd, client, private_cloud, resource_pool, location, stream=None, fields=None,
+                          prefetch_depth=None, offline=False, max_staleness=None, inventory_file=None):
     """
     Returns the list of available virtual networks in a resource pool, in a private cloud.
+    If offline or max_staleness is set, the list is read from the inventory.
     """
-    return client.list(location, private_cloud, resource_pool)
+    result = _list_from_inventory(cmd, client, 'virtual_networks', location, private_cloud, resource_pool,
+                                  offline, max_staleness, inventory_file)
+    if result is None:
+        result = client.list(location, private_cloud, resource_pool)
+    return _list_output(cmd, result, stream, fields=fields, prefetch_depth=prefetch_depth)
 
 
 def show_virtual_network(client, private_cloud, virtual_network, location):
@@ -53,11 +112,17 @@ def show_virtual_network(client, private_cloud, virtual_network, location):
     return client.get(location, private_cloud, virtual_network)
 
 
-def list_vm_template(client, private_cloud, resource_pool, location):
+def list_vm_template(cmd, client, private_cloud, resource_pool, location, stream=None, fields=None,
+                     prefetch_depth=None, offline=False, max_staleness=None, inventory_file=None):
     """
     Returns the list of VMware virtual machines templates in a resource pool, in a private cloud.
+    If offline or max_staleness is set, the list is read from the inventory.
     """
-    return client.list(private_cloud, location, resource_pool)
+    result = _list_from_inventory(cmd, client, 'vm_templates', location, private_cloud, resource_pool,
+                                  offline, max_staleness, inventory_file)
+    if result is None:
+        result = client.list(private_cloud, location, resource_pool)
+    return _list_output(cmd, result, stream, fields=fields, prefetch_depth=prefetch_depth)
 
 
 def show_vm_template(client, private_cloud, template, location):
@@ -176,26 +241,19 @@ def _modify_template_nics_according_to_input(template_nics, input_nics, cmd, cli
     return template_nics
 
 
-def create_vm(cmd, client, resource_group_name, vm_name,
-              private_cloud, template, resource_pool,
-              amount_of_ram=None, number_of_cores=None,
-              location=None, expose_to_guest_vm=None,
-              nics=None, disks=None):
+def _build_virtual_machine(cmd, client, vm_template, resource_group_name, vm_name,
+                           private_cloud, template, resource_pool,
+                           amount_of_ram=None, number_of_cores=None,
+                           location=None, expose_to_guest_vm=None,
+                           nics=None, disks=None):
     """
-    Create or update a VMware virtual machine.
-    The vm-template specified is used as a template for creation.
+    Builds the virtual machine request body from a vm-template and the input given by the user.
     """
     from .vendored_sdks.models import VirtualMachine
     from .vendored_sdks.models import ResourcePool
-    from ._config import PATH_CHAR
 
     resource_pool = ResourcePool(id=resource_pool)
 
-    # Extracting template and private cloud name from the resource id
-    template_name = template.rsplit(PATH_CHAR, 1)[-1]
-    private_cloud_name = private_cloud.rsplit(PATH_CHAR, 1)[-1]
-    vm_template = client.virtual_machine_templates.get(location, private_cloud_name, template_name)
-
     cores = number_of_cores or vm_template.number_of_cores
     ram = amount_of_ram or vm_template.amount_of_ram
 
@@ -213,28 +271,458 @@ def create_vm(cmd, client, resource_group_name, vm_name,
                                                               resource_group_name, vm_name,
                                                               location, private_cloud)
 
-    virtual_machine = VirtualMachine(location=location,
-                                     amount_of_ram=ram,
-                                     disks=final_disks,
-                                     expose_to_guest_vm=expose,
-                                     nics=final_nics,
-                                     number_of_cores=cores,
-                                     private_cloud_id=private_cloud,
-                                     resource_pool=resource_pool,
-                                     template_id=template)
+    return VirtualMachine(location=location,
+                          amount_of_ram=ram,
+                          disks=final_disks,
+                          expose_to_guest_vm=expose,
+                          nics=final_nics,
+                          number_of_cores=cores,
+                          private_cloud_id=private_cloud,
+                          resource_pool=resource_pool,
+                          template_id=template)
+
+
+def create_vm(cmd, client, resource_group_name, vm_name,
+              private_cloud=None, template=None, resource_pool=None,
+              amount_of_ram=None, number_of_cores=None,
+              location=None, expose_to_guest_vm=None,
+              nics=None, disks=None, blueprint=None):
+    """
+    Create or update a VMware virtual machine.
+    The vm-template specified is used as a template for creation.
+    If a blueprint is specified, its precompiled request body is sent as it is.
+    """
+    import copy
+    import re
+    from msrest.exceptions import HttpOperationError
+    from msrestazure.azure_exceptions import CloudError
+    from ._cache import is_location_error, refresh_stale_location
+    from ._config import PATH_CHAR
+    from ._profiling import span
+
+    if blueprint is not None:
+        with span('read blueprint'):
+            virtual_machine = _read_vm_blueprint(blueprint)
+        return client.virtual_machines.create_or_update(resource_group_name, vm_name, virtual_machine)
+
+    def _create(location, private_cloud, template, resource_pool):
+        # Extracting template and private cloud name from the resource id
+        template_name = template.rsplit(PATH_CHAR, 1)[-1]
+        private_cloud_name = private_cloud.rsplit(PATH_CHAR, 1)[-1]
+        vm_template = client.virtual_machine_templates.get(location, private_cloud_name, template_name)
+
+        with span('build virtual machine'):
+            virtual_machine = _build_virtual_machine(cmd, client, vm_template, resource_group_name, vm_name,
+                                                     private_cloud, template, resource_pool,
+                                                     amount_of_ram, number_of_cores,
+                                                     location, expose_to_guest_vm,
+                                                     copy.deepcopy(nics), copy.deepcopy(disks))
+
+        return client.virtual_machines.create_or_update(resource_group_name, vm_name, virtual_machine)
+
+    try:
+        return _create(location, private_cloud, template, resource_pool)
+    except (CloudError, HttpOperationError) as ex:
+        # The location of the resource group may have been read from a stale cache entry.
+        fresh = refresh_stale_location(cmd.cli_ctx, resource_group_name, location) if is_location_error(ex) else None
+        if fresh is None:
+            raise
+        logger.warning("Resource group %s is now in %s, not %s. Creating the virtual machine again.",
+                       resource_group_name, fresh, location)
+        pattern = re.compile('/locations/' + re.escape(location) + '/', re.IGNORECASE)
+
+        def _moved(resource_id):
+            return pattern.sub('/locations/' + fresh + '/', resource_id)
+        return _create(fresh, _moved(private_cloud), _moved(template), _moved(resource_pool))
+
+
+# --------------------------------------------------------------------------------------------
+# VM blueprint APIs
+# --------------------------------------------------------------------------------------------
+
+BLUEPRINT_VERSION = 1
+
+
+def _blueprint_hash(body):
+    """
+    Returns the content hash of a blueprint's request body.
+    """
+    import hashlib
+    import json
+
+    content = json.dumps(body, sort_keys=True, separators=(',', ':'))
+    return 'sha256:' + hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _read_vm_blueprint(blueprint):
+    """
+    Reads a blueprint file and returns the virtual machine request body it contains.
+    The content hash is checked, so that a modified blueprint is not sent by mistake.
+    """
+    import json
+    from .vendored_sdks.models import VirtualMachine
+
+    try:
+        with open(blueprint, 'r') as f:
+            content = json.load(f)
+    except (IOError, OSError, ValueError) as ex:
+        raise CLIError('Unable to read blueprint ' + blueprint + ': ' + str(ex))
+
+    if not isinstance(content, dict) or content.get('version') != BLUEPRINT_VERSION or \
+            not isinstance(content.get('virtualMachine'), dict):
+        raise CLIError(blueprint + ' is not a valid blueprint. Use "az csvmware vm blueprint compile" to create one.')
+    if content.get('hash') != _blueprint_hash(content['virtualMachine']):
+        raise CLIError('The content hash of blueprint ' + blueprint + ' does not match its content. '
+                       'Compile the blueprint again.')
+
+    return VirtualMachine.deserialize(content['virtualMachine'])
+
+
+def compile_vm_blueprint(cmd, client, private_cloud, template, resource_pool,
+                         resource_group_name=None, amount_of_ram=None, number_of_cores=None,
+                         location=None, expose_to_guest_vm=None,
+                         nics=None, disks=None, blueprint_file=None):
+    """
+    Resolves a vm-template and the input given by the user into a virtual machine request body.
+    The blueprint can be used to create virtual machines without any lookup.
+    """
+    import json
+    from collections import OrderedDict
+    from ._config import PATH_CHAR
+
+    template_name = template.rsplit(PATH_CHAR, 1)[-1]
+    private_cloud_name = private_cloud.rsplit(PATH_CHAR, 1)[-1]
+    vm_template = client.virtual_machine_templates.get(location, private_cloud_name, template_name)
+
+    virtual_machine = _build_virtual_machine(cmd, client, vm_template, resource_group_name, None,
+                                             private_cloud, template, resource_pool,
+                                             amount_of_ram, number_of_cores,
+                                             location, expose_to_guest_vm,
+                                             nics, disks)
+
+    body = virtual_machine.serialize()
+    result = OrderedDict([('version', BLUEPRINT_VERSION),
+                          ('hash', _blueprint_hash(body)),
+                          ('virtualMachine', body)])
+
+    if blueprint_file is not None:
+        try:
+            with open(blueprint_file, 'w') as f:
+                json.dump(result, f, indent=2)
+        except (IOError, OSError) as ex:
+            raise CLIError('Unable to write blueprint ' + blueprint_file + ': ' + str(ex))
+    return result
+
+
+# Keys accepted for a virtual machine entry in a create-batch manifest,
+# mapped to the corresponding parameter of create_vm.
+_MANIFEST_KEYS = {
+    'name': 'vm_name',
+    'resource-group': 'resource_group_name',
+    'private-cloud': 'private_cloud',
+    'template': 'template',
+    'resource-pool': 'resource_pool',
+    'location': 'location',
+    'ram': 'amount_of_ram',
+    'cores': 'number_of_cores',
+    'expose-to-guest-vm': 'expose_to_guest_vm',
+    'nics': 'nics',
+    'disks': 'disks'
+}
+
+
+def _read_vm_manifest(manifest):
+    """
+    Reads a create-batch manifest (YAML or JSON).
+    The manifest is either a list of virtual machine entries,
+    or a dictionary with an optional 'defaults' entry and a 'vms' list.
+    Returns the list of entries, with the defaults applied, keyed by create_vm parameter names.
+    The nics and disks entries are checked and converted like the --nic and --disk arguments.
+    """
+    import yaml
+    from ._validators import parse_nics, parse_disks
+
+    try:
+        with open(manifest, 'r') as f:
+            content = yaml.safe_load(f)
+    except (IOError, OSError, yaml.YAMLError) as ex:
+        raise CLIError('Unable to read manifest ' + manifest + ': ' + str(ex))
+
+    defaults = {}
+    if isinstance(content, dict):
+        defaults = content.get('defaults') or {}
+        content = content.get('vms')
+    if not isinstance(content, list) or not isinstance(defaults, dict):
+        raise CLIError('Manifest should contain a list of virtual machines.')
+
+    entries = []
+    for vm in content:
+        if not isinstance(vm, dict) or not vm.get('name'):
+            raise CLIError('Every virtual machine in the manifest should have a name.')
+        entry = {}
+        for (key, value) in list(defaults.items()) + list(vm.items()):
+            if key not in _MANIFEST_KEYS:
+                raise CLIError('Unknown key ' + key + ' in manifest. Allowed keys are: ' +
+                               ', '.join(sorted(_MANIFEST_KEYS)) + '.')
+            entry[_MANIFEST_KEYS[key]] = value
+        where = ' of virtual machine ' + str(vm['name']) + ' in manifest'
+        if 'nics' in entry:
+            entry['nics'] = parse_nics(entry['nics'], 'nics' + where)
+        if 'disks' in entry:
+            entry['disks'] = parse_disks(entry['disks'], 'disks' + where)
+        entries.append(entry)
+    return entries
+
+
+def create_vm_batch(cmd, client, resource_group_name=None,
+                    private_cloud=None, template=None, resource_pool=None,
+                    manifest=None, count=None, name_prefix=None,
+                    amount_of_ram=None, number_of_cores=None,
+                    location=None, expose_to_guest_vm=None,
+                    nics=None, disks=None, max_parallel=None, refresh=False, no_wait=False):
+    """
+    Create many VMware virtual machines.
+    The virtual machines are either read from a manifest, or are count copies named after a prefix.
+    Each vm-template is fetched once, the PUT requests are sent through a bounded pool of workers,
+    and the creations are awaited together. Returns the outcome of every virtual machine.
+    """
+    import argparse
+    import copy
+    from collections import OrderedDict
+    from ._bulk import run_in_parallel, wait_for_results, check_accepted, error_message
+    from ._cache import forget_resource_group_location, is_location_error
+    from ._config import PATH_CHAR
+    from ._validators import vm_create_namespace_validator
+
+    command_line = {
+        'resource_group_name': resource_group_name,
+        'private_cloud': private_cloud,
+        'template': template,
+        'resource_pool': resource_pool,
+        'location': location,
+        'amount_of_ram': amount_of_ram,
+        'number_of_cores': number_of_cores,
+        'expose_to_guest_vm': expose_to_guest_vm,
+        'nics': nics,
+        'disks': disks
+    }
+    if manifest:
+        specs = []
+        for entry in _read_vm_manifest(manifest):
+            spec = dict(command_line)
+            spec.update(entry)
+            specs.append(spec)
+    else:
+        specs = []
+        for i in range(1, int(count) + 1):
+            spec = dict(command_line)
+            spec['vm_name'] = name_prefix + str(i)
+            specs.append(spec)
+
+    rg_locations = {}
+    templates = {}
+
+    def _prepare(spec):
+        for param in ['resource_group_name', 'private_cloud', 'template', 'resource_pool']:
+            if not spec.get(param):
+                raise CLIError(param.replace('_name', '').replace('_', '-') +
+                               ' not specified for virtual machine ' + spec['vm_name'] + '.')
+        namespace = argparse.Namespace(_refresh=refresh, **spec)
+        if not namespace.location:
+            namespace.location = rg_locations.get(namespace.resource_group_name)
+        vm_create_namespace_validator(cmd, namespace)
+        rg_locations[namespace.resource_group_name] = namespace.location
+
+        # Every vm-template is fetched only once for the whole batch.
+        template_key = (namespace.location, namespace.private_cloud, namespace.template)
+        if template_key not in templates:
+            templates[template_key] = client.virtual_machine_templates.get(
+                namespace.location,
+                namespace.private_cloud.rsplit(PATH_CHAR, 1)[-1],
+                namespace.template.rsplit(PATH_CHAR, 1)[-1])
+        vm_template = copy.deepcopy(templates[template_key])
+
+        return _build_virtual_machine(cmd, client, vm_template,
+                                      namespace.resource_group_name, namespace.vm_name,
+                                      namespace.private_cloud, namespace.template,
+                                      namespace.resource_pool,
+                                      namespace.amount_of_ram, namespace.number_of_cores,
+                                      namespace.location, namespace.expose_to_guest_vm,
+                                      copy.deepcopy(namespace.nics), copy.deepcopy(namespace.disks))
+
+    # Preparing the requests is sequential, so that lookups shared by
+    # many virtual machines (resource group location, vm-template) are done once.
+    requests = []
+    results = []
+    for spec in specs:
+        result = OrderedDict([('name', spec['vm_name']),
+                              ('resourceGroup', spec.get('resource_group_name')),
+                              ('status', None),
+                              ('id', None),
+                              ('error', None)])
+        results.append(result)
+        try:
+            requests.append((result, spec, _prepare(spec)))
+        except Exception as ex:  # pylint: disable=broad-except
+            result['status'] = 'Failed'
+            result['error'] = error_message(ex)
+
+    def _send(request):
+        (_, spec, virtual_machine) = request
+        return client.virtual_machines.create_or_update(spec['resource_group_name'],
+                                                        spec['vm_name'], virtual_machine,
+                                                        raw=True, polling=False).result()
+
+    started = []
+    for (request, raw_result, error) in run_in_parallel(_send, requests, max_parallel):
+        result = request[0]
+        if error is not None:
+            result['status'] = 'Failed'
+            result['error'] = error_message(error)
+            if is_location_error(error):
+                forget_resource_group_location(cmd.cli_ctx, request[1]['resource_group_name'])
+            continue
+        if raw_result.output is not None:
+            result['id'] = raw_result.output.id
+        if no_wait:
+            result['status'] = 'Accepted'
+        else:
+            started.append((result, raw_result))
+
+    if no_wait:
+        check_accepted(results)
+        return results
 
-    return client.virtual_machines.create_or_update(resource_group_name, vm_name, virtual_machine)
+    wait_for_results(client, started)
+    return results
 
 
-def list_vm(client, resource_group_name=None):
+def list_vm(cmd, client, resource_group_name=None, subscriptions=None, locations=None, max_parallel=None,
+            compact=False, stream=None, fields=None, filter_expression=None, top=None,
+            skip_token=None, max_items=None, next_token=None, prefetch_depth=None, offline=False,
+            max_staleness=None, inventory_file=None):
     """
     Returns a list of VMware virtual machines in the current subscription.
     If resource group is specified, only the virtual machines
     in that resource group would be listed.
+    Several resource groups and subscriptions can be specified, in which case they are listed
+    concurrently, and the results are merged and de-duplicated by resource id.
+    If locations are specified, only the virtual machines in those regions would be listed.
+    If compact is True, the virtual machines are compact records with only the fields of the table output.
+    If fields are set, they are compact records with only these fields.
+    If stream is set, the virtual machines are written as each page is received.
+    filter_expression and top are passed to the service, for every scope listed.
+    A single scope can be listed from a skip_token, or in slices of max_items virtual machines, in which case
+    the token to list the next slice with next_token is printed.
+    The next pages of every scope are requested while the current one is processed, up to prefetch_depth ahead.
+    If offline or max_staleness is set, the virtual machines are read from the inventory, unless the listing
+    depends on the service (subscriptions, filter_expression or any of the paging arguments).
     """
-    if resource_group_name is None:
-        return client.list_by_subscription()
-    return client.list_by_resource_group(resource_group_name)
+    from ._bulk import run_in_parallel, error_message
+    from ._client_factory import cf_vmware_cs
+    from ._fast_deserializer import fast_pages
+    from ._format import transform_vm_table_list, VM_TABLE_FIELDS
+    from ._paging import prefetch_pages
+
+    projection = list(fields) if fields else (VM_TABLE_FIELDS if compact else None)
+
+    def _pages(paged):
+        if projection is not None:
+            from ._compact import compact_pages
+            return compact_pages(paged, projection)
+        return fast_pages(paged)
+
+    if resource_group_name and not isinstance(resource_group_name, (list, tuple)):
+        resource_group_name = [resource_group_name]
+    resource_groups = resource_group_name or [None]
+
+    list_args = {'filter': filter_expression, 'top': int(top) if top else None}
+    single_scope = not subscriptions and not locations and len(resource_groups) == 1
+    if not single_scope and (skip_token or max_items or next_token):
+        raise CLIError('usage error: --skip-token, --max-items and --next-token can only be used to list '
+                       'a single resource group or subscription, without --locations.')
+    if not single_scope and projection is not None:
+        # The de-duplication and the filter on locations read these fields.
+        projection = projection + ['id', 'location']
+
+    live_only = subscriptions or filter_expression or top or skip_token or max_items or next_token
+    if offline and live_only:
+        raise CLIError('usage error: --offline cannot be used with --subscriptions, --filter, --top, --skip-token, '
+                       '--max-items or --next-token.')
+    snapshot = None if live_only else _inventory_snapshot(cmd, offline, max_staleness, inventory_file)
+    if snapshot is not None:
+        result = _pages(snapshot.list_vms(client, resource_group_name, locations))
+        return _list_output(cmd, result, stream, transform_vm_table_list, prefetch_depth=prefetch_depth)
+
+    if single_scope:
+        offset = 0
+        if next_token:
+            from ._paging import decode_token
+            (skip_token, offset) = decode_token(next_token)
+        list_args['skip_token'] = skip_token
+        if resource_groups[0] is None:
+            result = _pages(client.list_by_subscription(**list_args))
+        else:
+            result = _pages(client.list_by_resource_group(resource_groups[0], **list_args))
+        if not max_items and not next_token:
+            return _list_output(cmd, result, stream, transform_vm_table_list, prefetch_depth=prefetch_depth)
+
+        from ._paging import read_slice, stop_prefetch
+        max_items = int(max_items) if max_items else None
+        # The prefetching stops at the pages which hold the slice.
+        paged = prefetch_pages(result, prefetch_depth, max_items + offset if max_items else None)
+        try:
+            (result, token) = read_slice(paged, max_items, skip_token, offset)
+        finally:
+            stop_prefetch(paged)
+        output = _list_output(cmd, result, stream, transform_vm_table_list)
+        if token is not None:
+            logger.warning("There are more virtual machines. To list them, run the command again with "
+                           "--next-token %s", token)
+        return output
+
+    subscription_ids = [None]
+    if subscriptions:
+        from azure.cli.core._profile import Profile
+        profile = Profile(cli_ctx=cmd.cli_ctx)
+        subscription_ids = [profile.get_subscription(subscription)['id'] for subscription in subscriptions]
+
+    def _list_scope(scope):
+        (subscription_id, resource_group) = scope
+        scope_client = client
+        if subscription_id is not None:
+            scope_client = cf_vmware_cs(cmd.cli_ctx, subscription_id=subscription_id).virtual_machines
+        if resource_group is None:
+            paged = scope_client.list_by_subscription(**list_args)
+        else:
+            paged = scope_client.list_by_resource_group(resource_group, **list_args)
+        return list(_pages(prefetch_pages(paged, prefetch_depth)))
+
+    scopes = [(subscription_id, resource_group)
+              for subscription_id in subscription_ids
+              for resource_group in resource_groups]
+
+    wanted_locations = None
+    if locations:
+        wanted_locations = set(location.lower() for location in locations)
+
+    virtual_machines = []
+    seen_ids = set()
+    for ((subscription_id, resource_group), result, error) in run_in_parallel(_list_scope, scopes, max_parallel):
+        if error is not None:
+            scope = 'subscription ' + (subscription_id or 'current')
+            if resource_group is not None:
+                scope = 'resource group ' + resource_group + ' in ' + scope
+            raise CLIError('Unable to list virtual machines in ' + scope + ': ' + error_message(error))
+        for virtual_machine in result:
+            if wanted_locations is not None and (virtual_machine.location or '').lower() not in wanted_locations:
+                continue
+            vm_id = (virtual_machine.id or '').lower()
+            if vm_id in seen_ids:
+                continue
+            seen_ids.add(vm_id)
+            virtual_machines.append(virtual_machine)
+    return _list_output(cmd, virtual_machines, stream, transform_vm_table_list)
 
 
 def delete_vm(client, resource_group_name, vm_name):
@@ -251,18 +739,104 @@ def get_vm(client, resource_group_name, vm_name):
     return client.get(resource_group_name, vm_name)
 
 
-def start_vm(client, resource_group_name, vm_name):
+def _get_vm(cmd, client, resource_group_name, vm_name, offline, max_staleness, inventory_file):
+    """
+    Returns a VMware virtual machine, from the inventory if offline or max_staleness is set.
+    A virtual machine missing from the inventory is read live, unless offline is True.
+    """
+    snapshot = _inventory_snapshot(cmd, offline, max_staleness, inventory_file)
+    if snapshot is not None:
+        virtual_machine = snapshot.get_vm(client, resource_group_name, vm_name)
+        if virtual_machine is not None:
+            return virtual_machine
+        if offline:
+            raise CLIError("The virtual machine '{}' of resource group '{}' is not in the inventory."
+                           .format(vm_name, resource_group_name))
+    return client.get(resource_group_name, vm_name)
+
+
+def show_vm(cmd, client, resource_group_name, vm_name, offline=False, max_staleness=None, inventory_file=None):
+    """
+    Returns a VMware virtual machine.
+    If offline or max_staleness is set, it is read from the inventory.
+    """
+    return _get_vm(cmd, client, resource_group_name, vm_name, offline, max_staleness, inventory_file)
+
+
+def _vm_power_targets(resource_group_name, vm_names, ids):
+    """
+    Returns the (resource group, vm name) pairs targeted by a power command.
+    """
+    from msrestazure.tools import parse_resource_id
+
+    if ids:
+        targets = []
+        for resource_id in ids:
+            parts = parse_resource_id(resource_id)
+            targets.append((parts['resource_group'], parts['name']))
+        return targets
+    return [(resource_group_name, vm_name) for vm_name in vm_names]
+
+
+def _vm_power_operation(client, targets, operation, max_parallel, no_wait):
     """
-    Start a VMware virtual machine.
+    Runs a power operation on several virtual machines in parallel.
+    Returns one result per virtual machine, in the order of the targets.
     """
-    return client.start(resource_group_name, vm_name)
+    from collections import OrderedDict
+    from azure.cli.core.util import sdk_no_wait
+    from ._bulk import run_in_parallel, wait_for_results, check_accepted, error_message
+
+    if len(targets) == 1:
+        (resource_group_name, vm_name) = targets[0]
+        return sdk_no_wait(no_wait, operation, resource_group_name, vm_name)
+
+    def _send(target):
+        (resource_group_name, vm_name) = target
+        return operation(resource_group_name, vm_name, raw=True, polling=False).result()
+
+    results = []
+    started = []
+    for ((resource_group_name, vm_name), raw_result, error) in run_in_parallel(_send, targets, max_parallel):
+        result = OrderedDict([('name', vm_name),
+                              ('resourceGroup', resource_group_name),
+                              ('status', None),
+                              ('error', None)])
+        results.append(result)
+        if error is not None:
+            result['status'] = 'Failed'
+            result['error'] = error_message(error)
+        elif no_wait:
+            result['status'] = 'Accepted'
+        else:
+            started.append((result, raw_result))
+
+    if no_wait:
+        check_accepted(results)
+        return results
 
+    wait_for_results(client, started)
+    return results
 
-def stop_vm(client, resource_group_name, vm_name, stop_mode):
+
+def start_vm(client, resource_group_name=None, vm_name=None, ids=None, max_parallel=None, no_wait=False):
     """
-    Stop a VMware virtual machine.
+    Start VMware virtual machines.
     """
-    return client.stop(resource_group_name, vm_name, stop_mode)
+    targets = _vm_power_targets(resource_group_name, vm_name, ids)
+    return _vm_power_operation(client, targets, client.virtual_machines.start, max_parallel, no_wait)
+
+
+def stop_vm(client, resource_group_name=None, vm_name=None, stop_mode=None, ids=None,
+            max_parallel=None, no_wait=False):
+    """
+    Stop VMware virtual machines.
+    """
+    def _stop(resource_group_name, vm_name, **kwargs):
+        return client.virtual_machines.stop(resource_group_name, vm_name, stop_mode, **kwargs)
+
+    targets = _vm_power_targets(resource_group_name, vm_name, ids)
+    return _vm_power_operation(client, targets, _stop, max_parallel, no_wait)
 
 
 def update_vm(client, resource_group_name, vm_name, **kwargs):
@@ -272,36 +846,105 @@ def update_vm(client, resource_group_name, vm_name, **kwargs):
     return client.update(resource_group_name, vm_name, kwargs['parameters'].tags)
 
 
+def _update_vm_with_retry(client, resource_group_name, vm_name, apply_delta):
+    """
+    Read a VM, let apply_delta modify it in place and write it back.
+    The write is conditional on the ETag of the read when the service returns one.
+    The service does not return ETags for virtual machines today: the VM is then read again
+    right before the write, and compared with the first read.
+    If another writer got in first (HTTP 412, or a VM that changed between the two reads),
+    the VM is read again and the delta re-applied.
+    Without ETags, an edit landing between the second read and the write is still overwritten.
+    Returns the poller of the write and whatever apply_delta returned.
+    """
+    import random
+    import time
+    from .vendored_sdks.models import CSRPErrorException
+    from ._config import VM_UPDATE_MAX_RETRIES, VM_UPDATE_RETRY_BACKOFF
+
+    attempt = 0
+    while True:
+        raw_result = client.get(resource_group_name, vm_name, raw=True)
+        virtual_machine = raw_result.output
+        etag = raw_result.response.headers.get('ETag')
+        read_body = None if etag else virtual_machine.serialize()
+        delta_result = apply_delta(virtual_machine)
+
+        if etag:
+            try:
+                poller = client.create_or_update(resource_group_name, vm_name, virtual_machine,
+                                                 custom_headers={'If-Match': etag})
+                return poller, delta_result
+            except CSRPErrorException as ex:
+                if ex.response is None or ex.response.status_code != 412:
+                    raise
+        else:
+            logger.debug("No ETag returned for virtual machine %s, comparing it before the update.", vm_name)
+            if client.get(resource_group_name, vm_name).serialize() == read_body:
+                poller = client.create_or_update(resource_group_name, vm_name, virtual_machine)
+                return poller, delta_result
+
+        if attempt >= VM_UPDATE_MAX_RETRIES:
+            raise CLIError('Virtual machine ' + vm_name + ' is being modified concurrently. '
+                           'Gave up after ' + str(attempt + 1) + ' attempts.')
+        attempt += 1
+        logger.info("Virtual machine %s changed since it was read, retrying the update (attempt %d).",
+                    vm_name, attempt + 1)
+        time.sleep(random.uniform(0, VM_UPDATE_RETRY_BACKOFF * 2 ** (attempt - 1)))
+
+
 # --------------------------------------------------------------------------------------------
 # VM nics APIs
 # --------------------------------------------------------------------------------------------
 
 def add_vnic(cmd, client, resource_group_name, vm_name,
-             virtual_network, adapter="VMXNET3", power_on_boot=False):
+             virtual_network=None, adapter="VMXNET3", power_on_boot=False, nics=None):
     """
-    Add virtual network interface to a VMware virtual machine.
+    Add virtual network interfaces to a VMware virtual machine.
+    Either a single nic is described by the arguments, or several nics are specified with --nic,
+    in which case the arguments are used as defaults. All the nics are added in a single update.
     """
     from .vendored_sdks.models import VirtualNic
     from .vendored_sdks.models import VirtualNetwork
     from ._validators import virtual_network_name_or_id_validator
 
-    virtual_machine = client.get(resource_group_name, vm_name)
-    virtual_network = virtual_network_name_or_id_validator(cmd, client, virtual_network, resource_group_name, vm_name)
+    if virtual_network is None and not nics:
+        raise CLIError('usage error: --virtual-network NAME | --nic virtual-network=NAME [adapter=ADAPTER] [power-on-boot=BOOL]')
+
+    allowed_keys = ['virtual-network', 'adapter', 'power-on-boot']
+    specs = nics or [{}]
+    for spec in specs:
+        for key in spec:
+            if key not in allowed_keys:
+                raise CLIError('Unknown key ' + key + ' in --nic. Allowed keys are: ' + ', '.join(allowed_keys) + '.')
+        if spec.get('virtual-network', virtual_network) is None:
+            raise CLIError('virtual-network parameter not specified for nic.')
+
+    def _add_nics(virtual_machine):
+        for spec in specs:
+            vnet = virtual_network_name_or_id_validator(cmd, client, spec.get('virtual-network', virtual_network),
+                                                        resource_group_name, vm_name,
+                                                        virtual_machine.location, virtual_machine.private_cloud_id)
+            boot = power_on_boot
+            if 'power-on-boot' in spec:
+                boot = str(spec['power-on-boot']).lower() == 'true'
 
-    network = VirtualNetwork(id=virtual_network)
-    nic = VirtualNic(network=network,
-                     nic_type=adapter,
-                     power_on_boot=power_on_boot)
+            network = VirtualNetwork(id=vnet)
+            nic = VirtualNic(network=network,
+                             nic_type=spec.get('adapter', adapter),
+                             power_on_boot=boot)
+            virtual_machine.nics.append(nic)
 
-    virtual_machine.nics.append(nic)
-    return client.create_or_update(resource_group_name, vm_name, virtual_machine)
+    poller, _ = _update_vm_with_retry(client, resource_group_name, vm_name, _add_nics)
+    return poller
 
 
-def list_vnics(client, resource_group_name, vm_name):
+def list_vnics(cmd, client, resource_group_name, vm_name, offline=False, max_staleness=None, inventory_file=None):
     """
     List details of a VMware virtual machine's nics.
+    If offline or max_staleness is set, the virtual machine is read from the inventory.
     """
-    virtual_machine = client.get(resource_group_name, vm_name)
+    virtual_machine = _get_vm(cmd, client, resource_group_name, vm_name, offline, max_staleness, inventory_file)
     return virtual_machine.nics
 
 
@@ -321,23 +964,25 @@ def delete_vnics(client, resource_group_name, vm_name, nic_names):
     Delete NICs from a VM.
     """
     import copy
-    virtual_machine = client.get(resource_group_name, vm_name)
 
-    # Dictionary to maintain the nics to delete
-    to_delete_nics = {}
-    for nic_name in nic_names:
-        to_delete_nics[nic_name] = True
+    def _delete_nics(virtual_machine):
+        # Dictionary to maintain the nics to delete
+        to_delete_nics = {}
+        for nic_name in nic_names:
+            to_delete_nics[nic_name] = True
 
-    # We'll be iterating over virtual_machine.nics.
-    # Hence we need a copy of that which we can modify within the loop.
-    final_nics = copy.deepcopy(virtual_machine.nics)
-    for nic in virtual_machine.nics:
-        if nic.virtual_nic_name in to_delete_nics.keys():
-            final_nics.remove(nic)
-            to_delete_nics[nic.virtual_nic_name] = False
+        # We'll be iterating over virtual_machine.nics.
+        # Hence we need a copy of that which we can modify within the loop.
+        final_nics = copy.deepcopy(virtual_machine.nics)
+        for nic in virtual_machine.nics:
+            if nic.virtual_nic_name in to_delete_nics.keys():
+                final_nics.remove(nic)
+                to_delete_nics[nic.virtual_nic_name] = False
+
+        virtual_machine.nics = final_nics
+        return to_delete_nics
 
-    virtual_machine.nics = final_nics
-    client.create_or_update(resource_group_name, vm_name, virtual_machine)
+    _, to_delete_nics = _update_vm_with_retry(client, resource_group_name, vm_name, _delete_nics)
 
     not_deleted_nics = ""
     for nic_name in to_delete_nics:
@@ -353,26 +998,40 @@ def delete_vnics(client, resource_group_name, vm_name, nic_names):
 # --------------------------------------------------------------------------------------------
 
 def add_vdisk(client, resource_group_name, vm_name, controller="1000",
-              independence_mode="persistent", size=16777216):
+              independence_mode="persistent", size=16777216, disks=None):
     """
-    Add disk to a VMware virtual machine
+    Add disks to a VMware virtual machine.
+    Either a single disk is described by the arguments, or several disks are specified with --disk,
+    in which case the arguments are used as defaults. All the disks are added in a single update.
     """
     from .vendored_sdks.models import VirtualDisk
+    from ._validators import _check_postive_integer
 
-    virtual_machine = client.get(resource_group_name, vm_name)
-    disk = VirtualDisk(controller_id=controller,
-                       independence_mode=independence_mode,
-                       total_size=size)
+    allowed_keys = ['controller', 'mode', 'size']
+    specs = disks or [{}]
+    for spec in specs:
+        for key in spec:
+            if key not in allowed_keys:
+                raise CLIError('Unknown key ' + key + ' in --disk. Allowed keys are: ' + ', '.join(allowed_keys) + '.')
+        _check_postive_integer('Size', spec.get('size', size))
+
+    def _add_disks(virtual_machine):
+        for spec in specs:
+            disk = VirtualDisk(controller_id=spec.get('controller', controller),
+                               independence_mode=spec.get('mode', independence_mode),
+                               total_size=spec.get('size', size))
+            virtual_machine.disks.append(disk)
 
-    virtual_machine.disks.append(disk)
-    return client.create_or_update(resource_group_name, vm_name, virtual_machine)
+    poller, _ = _update_vm_with_retry(client, resource_group_name, vm_name, _add_disks)
+    return poller
 
 
-def list_vdisks(client, resource_group_name, vm_name):
+def list_vdisks(cmd, client, resource_group_name, vm_name, offline=False, max_staleness=None, inventory_file=None):
     """
     List details of disks available on a VMware virtual machine.
+    If offline or max_staleness is set, the virtual machine is read from the inventory.
     """
-    virtual_machine = client.get(resource_group_name, vm_name)
+    virtual_machine = _get_vm(cmd, client, resource_group_name, vm_name, offline, max_staleness, inventory_file)
     return virtual_machine.disks
 
 
@@ -392,23 +1051,25 @@ def delete_vdisks(client, resource_group_name, vm_name, disk_names):
     Delete disks from a VM.
     """
     import copy
-    virtual_machine = client.get(resource_group_name, vm_name)
 
-    # Dictionary to maintain the disks to delete
-    to_delete_disks = {}
-    for disk_name in disk_names:
-        to_delete_disks[disk_name] = True
+    def _delete_disks(virtual_machine):
+        # Dictionary to maintain the disks to delete
+        to_delete_disks = {}
+        for disk_name in disk_names:
+            to_delete_disks[disk_name] = True
 
-    # We'll be iterating over virtual_machine.disks.
-    # Hence we need a copy of that which we can modify within the loop.
-    final_disks = copy.deepcopy(virtual_machine.disks)
-    for disk in virtual_machine.disks:
-        if disk.virtual_disk_name in to_delete_disks.keys():
-            final_disks.remove(disk)
-            to_delete_disks[disk.virtual_disk_name] = False
+        # We'll be iterating over virtual_machine.disks.
+        # Hence we need a copy of that which we can modify within the loop.
+        final_disks = copy.deepcopy(virtual_machine.disks)
+        for disk in virtual_machine.disks:
+            if disk.virtual_disk_name in to_delete_disks.keys():
+                final_disks.remove(disk)
+                to_delete_disks[disk.virtual_disk_name] = False
+
+        virtual_machine.disks = final_disks
+        return to_delete_disks
 
-    virtual_machine.disks = final_disks
-    client.create_or_update(resource_group_name, vm_name, virtual_machine)
+    _, to_delete_disks = _update_vm_with_retry(client, resource_group_name, vm_name, _delete_disks)
 
     not_deleted_disks = ""
     for disk_name in to_delete_disks:
@@ -417,3 +1078,74 @@ def delete_vdisks(client, resource_group_name, vm_name, disk_names):
     not_deleted_disks = not_deleted_disks[:-2]
     if not_deleted_disks != "":
         raise CLIError(not_deleted_disks + ' not present in the given virtual machine. Other disks (if mentioned) were deleted.')
+
+
+# --------------------------------------------------------------------------------------------
+# Operation APIs
+# --------------------------------------------------------------------------------------------
+
+def _operation_targets(ids, region, operation_id):
+    """
+    Returns the (region, operation id) tuples of the operations passed to an operation command.
+    """
+    from ._polling import parse_operation_id
+
+    if ids:
+        return [parse_operation_id(operation) for operation in ids]
+    return [(region, operation_id)]
+
+
+def show_operation(client, ids=None, region=None, operation_id=None):
+    """
+    Get the status of long running operations.
+    """
+    from ._bulk import run_in_parallel
+
+    targets = _operation_targets(ids, region, operation_id)
+    operations = []
+    for (_, operation, error) in run_in_parallel(lambda target: client.get(*target), targets):
+        if error is not None:
+            raise error
+        operations.append(operation)
+    return operations[0] if len(operations) == 1 else operations
+
+
+def wait_operation(client, ids=None, region=None, operation_id=None, timeout=None):
+    """
+    Wait for long running operations to complete.
+    All the operations are tracked by a single polling loop, which honours the Retry-After delays of the service.
+    """
+    from ._bulk import error_message
+    from ._polling import operation_error, wait_for_operations
+
+    targets = _operation_targets(ids, region, operation_id)
+    operations = []
+    failures = []
+    for ((_, name), (operation, error)) in zip(targets, wait_for_operations(client, targets, timeout)):
+        message = error_message(error) if error is not None else operation_error(operation)
+        if message:
+            failures.append(name + ': ' + message)
+        operations.append(operation)
+    if failures:
+        raise CLIError('; '.join(failures))
+    return operations[0] if len(operations) == 1 else operations
+
+
+def sync_inventory(cmd, client, locations=None, inventory_file=None, max_parallel=None, incremental=False):
+    """
+    Crawls the private clouds, resource pools, virtual networks, templates and virtual machines
+    of the current subscription, and stores them in the local inventory.
+    If incremental is True, only the virtual networks and templates of the private clouds which changed
+    are crawled again.
+    """
+    from ._inventory import sync_inventory as sync
+    return sync(cmd.cli_ctx, client, locations, inventory_file, max_parallel, incremental)
+
+
+def perf_report(cmd, operation=None, region=None, window='1d', since='7d', history_file=None):
+    """
+    Returns the p50, p95 and p99 latencies of the commands recorded in the local latency history,
+    per command, region and time window.
+    """
+    from ._perf_history import report
+    return report(cmd.cli_ctx, operation, region, window, since, history_file)
@@ -0,0 +1,125 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+from msrest.authentication import BasicTokenAuthentication
+
+from azext_csvmware._client_factory import cf_resource_groups, cf_vmware_cs
+from azext_csvmware._instrumentation import ProfilingPolicy, instrument
+from azext_csvmware._throttling import ThrottlingPolicy, throttle
+from azext_csvmware.vendored_sdks import VMwareCloudSimpleClient
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class _Track2Client(object):  # pylint: disable=too-few-public-methods
+    """
+    A client of the azure-core based SDKs, which has no msrest config nor pipeline.
+    """
+
+    def __init__(self):
+        self.resource_groups = object()
+
+
+_SUBSCRIPTIONS = {
+    None: {'id': '00000000-0000-0000-0000-000000000000', 'tenantId': 't', 'user': {'name': 'a', 'type': 'user'}},
+    'other': {'id': '11111111-1111-1111-1111-111111111111', 'tenantId': 't', 'user': {'name': 'b', 'type': 'user'}},
+}
+
+
+def _client(subscription_id='00000000-0000-0000-0000-000000000000'):
+    return VMwareCloudSimpleClient(BasicTokenAuthentication({'access_token': 'token'}),
+                                   subscription_id, 'https://azure.microsoft.com')
+
+
+class _Profile(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, cli_ctx=None):
+        self.cli_ctx = cli_ctx
+
+    @staticmethod
+    def get_subscription(subscription_id=None):
+        return _SUBSCRIPTIONS[subscription_id]
+
+
+class _CliContext(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, command='csvmware vm show'):
+        self.cloud = mock.Mock()
+        self.cloud.name = 'AzureCloud'
+        self.data = {'headers': {}, 'completer_active': False, 'command': command, 'safe_params': None}
+
+
+def _policies(client):
+    return [type(policy) for policy in client.config.pipeline._impl_policies]  # pylint: disable=protected-access
+
+
+class ClientWrappingTest(unittest.TestCase):
+
+    def test_msrest_client_is_throttled_and_instrumented(self):
+        client = instrument(throttle(_client()))
+        policies = _policies(client)
+        self.assertEqual(policies[0], ProfilingPolicy)
+        self.assertEqual(policies[-1], ThrottlingPolicy)
+
+    def test_client_without_config_is_unchanged(self):
+        client = _Track2Client()
+        self.assertIs(throttle(client), client)
+        self.assertIs(instrument(client), client)
+
+    def test_resource_groups_of_track2_client(self):
+        client = _Track2Client()
+        with mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', lambda *_, **__: client):
+            self.assertIs(cf_resource_groups(mock.Mock()), client.resource_groups)
+
+
+@mock.patch('azure.cli.core._profile.Profile', _Profile)
+class SharedClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+        patcher = mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', self._factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _factory(self, cli_ctx, client_type, subscription_id=None, **_):  # pylint: disable=unused-argument
+        self.created.append(subscription_id)
+        return _client(_SUBSCRIPTIONS[subscription_id]['id'])
+
+    def test_client_is_shared_by_context_and_account(self):
+        cli_ctx = _CliContext()
+        client = cf_vmware_cs(cli_ctx)
+        self.assertIs(cf_vmware_cs(cli_ctx), client)
+        self.assertIs(cf_vmware_cs(cli_ctx).virtual_machines, client.virtual_machines)
+        self.assertEqual(self.created, [None])
+        self.assertTrue(client.config.keep_alive)
+
+    def test_other_account_or_context_gets_another_client(self):
+        cli_ctx = _CliContext()
+        client = cf_vmware_cs(cli_ctx)
+        other_account = cf_vmware_cs(cli_ctx, subscription_id='other')
+        other_context = cf_vmware_cs(_CliContext())
+        self.assertIsNot(other_account, client)
+        self.assertIsNot(other_context, client)
+        self.assertEqual(other_account.config.subscription_id, _SUBSCRIPTIONS['other']['id'])
+        self.assertEqual(self.created, [None, 'other', None])
+
+    def test_headers_of_shared_client_are_refreshed(self):
+        cli_ctx = _CliContext()
+        cli_ctx.data['safe_params'] = ['--name']
+        client = cf_vmware_cs(cli_ctx)
+        cli_ctx.data.update(command='csvmware vm list', safe_params=None,
+                            headers={'x-ms-client-request-id': 'request'})
+        self.assertIs(cf_vmware_cs(cli_ctx), client)
+        self.assertEqual(client.config.headers['CommandName'], 'csvmware vm list')
+        self.assertEqual(client.config.headers['x-ms-client-request-id'], 'request')
+        self.assertNotIn('ParameterSetName', client.config.headers)
+        self.assertFalse(client.config.generate_client_request_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
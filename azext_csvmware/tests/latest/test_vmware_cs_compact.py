@@ -0,0 +1,80 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import unittest
+
+from knack.output import format_json, format_table
+from knack.util import CLIError, CommandResultItem
+
+from azext_csvmware._compact import _field_tree, compact_pages
+from azext_csvmware._format import VM_TABLE_FIELDS, transform_vm_table_list
+from azext_csvmware._streaming import to_output
+from azext_csvmware.tests.latest.test_vmware_cs_fast_deserializer import _DEPENDENCIES, _recorded_bodies
+from azext_csvmware.vendored_sdks.models import VirtualMachinePaged
+
+
+def _recorded_vms():
+    vms = []
+    for (model_type, body) in _recorded_bodies():
+        if model_type == 'VirtualMachine':
+            vms.extend(body['value'] if 'value' in body else [body])
+    return vms
+
+
+def _paged(vms):
+    page = {'value': vms, 'nextLink': None}
+    return VirtualMachinePaged(lambda _: json.loads(json.dumps(page)), _DEPENDENCIES)
+
+
+def _project(value, tree):
+    """
+    Keeps only the fields of tree in the JSON output of a full model.
+    """
+    if tree is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    return dict((key, _project(value.get(key), subtree)) for (key, subtree) in tree.items())
+
+
+class CompactRecordsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.vms = _recorded_vms()
+
+    def test_json_output_is_the_projection_of_the_full_models(self):
+        self.assertTrue(self.vms)
+        full = json.loads(format_json(CommandResultItem(to_output(list(_paged(self.vms))))))
+        compact = json.loads(format_json(CommandResultItem(to_output(list(compact_pages(_paged(self.vms),
+                                                                                        VM_TABLE_FIELDS))))))
+        # The resource group is added to the output of both, from the id.
+        tree = _field_tree(VM_TABLE_FIELDS + ['resourceGroup'])
+        self.assertEqual(compact, [_project(vm, tree) for vm in full])
+
+    def test_table_output_is_the_one_of_the_full_models(self):
+        full = to_output(list(_paged(self.vms)))
+        compact = to_output(list(compact_pages(_paged(self.vms), VM_TABLE_FIELDS)))
+        self.assertEqual(format_table(CommandResultItem(compact, table_transformer=transform_vm_table_list)),
+                         format_table(CommandResultItem(full, table_transformer=transform_vm_table_list)))
+
+    def test_fields_are_named_after_attributes_or_keys(self):
+        [record] = list(compact_pages(_paged(self.vms[:1]), ['guest_os', 'guestOS', 'number_of_cores',
+                                                             'resource_pool.full_name']))
+        self.assertEqual(sorted(record._fields), ['guestOs', 'numberOfCores', 'resourcePool'])
+        self.assertEqual(sorted(record.resourcePool._fields), ['fullName'])
+
+    def test_unknown_fields(self):
+        with self.assertRaises(CLIError) as context:
+            compact_pages(_paged(self.vms), ['name', 'colour'])
+        self.assertIn("'colour' is not a field of VirtualMachine", str(context.exception))
+        with self.assertRaises(CLIError) as context:
+            compact_pages(_paged(self.vms), ['name.first'])
+        self.assertIn("'name' of VirtualMachine has no fields", str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
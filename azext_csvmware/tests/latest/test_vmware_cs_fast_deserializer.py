@@ -0,0 +1,83 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import glob
+import json
+import os
+import re
+import unittest
+
+import yaml
+from msrest import Deserializer
+
+from azext_csvmware._fast_deserializer import deserialize, fast_pages
+from azext_csvmware.vendored_sdks import models
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'recordings')
+
+_COLLECTION_PATTERN = re.compile(r'/providers/Microsoft\.VMwareCloudSimple/(?:.*/)?(\w+?)s(?:/[^/]+)?$',
+                                 re.IGNORECASE)
+
+_DEPENDENCIES = dict((name, model) for (name, model) in vars(models).items() if isinstance(model, type))
+
+
+def _recorded_bodies():
+    """
+    Yields the model type, as named in the SDK, and the decoded body of the recorded responses of the
+    VMwareCloudSimple resources.
+    """
+    for path in sorted(glob.glob(os.path.join(RECORDINGS_DIR, '*.yaml'))):
+        with open(path) as recording:
+            interactions = yaml.safe_load(recording)['interactions']
+        for interaction in interactions:
+            if interaction['request']['method'] != 'GET' or interaction['response']['status']['code'] != 200:
+                continue
+            match = _COLLECTION_PATTERN.search(interaction['request']['uri'].split('?')[0])
+            if not match or 'operation' in match.group(1).lower():
+                continue
+            model_type = match.group(1)[0].upper() + match.group(1)[1:]
+            if model_type in _DEPENDENCIES:
+                yield model_type, json.loads(interaction['response']['body']['string'])
+
+
+class FastDeserializerTest(unittest.TestCase):
+
+    def test_models_match_msrest(self):
+        deserializer = Deserializer(_DEPENDENCIES)
+        compared = set()
+        for (model_type, body) in _recorded_bodies():
+            if 'value' in body:
+                continue
+            self.assertEqual(deserialize(deserializer, model_type, body),
+                             deserializer.deserialize_data(body, model_type))
+            compared.add(model_type)
+        self.assertTrue({'VirtualMachine', 'PrivateCloud', 'ResourcePool', 'VirtualMachineTemplate',
+                         'VirtualNetwork'} <= compared)
+
+    def test_pages_match_msrest(self):
+        items = {}
+        for (model_type, body) in _recorded_bodies():
+            items.setdefault(model_type, []).extend(body['value'] if 'value' in body else [body])
+        for (model_type, values) in items.items():
+            paged_type = getattr(models, model_type + 'Paged')
+            pages = [{'value': values[:2], 'nextLink': 'https://management.azure.com/next?$skipToken=2'},
+                     {'value': values[2:], 'nextLink': None}]
+            for page in pages:
+                expected = Deserializer(_DEPENDENCIES)(paged_type(None, _DEPENDENCIES), page)
+                paged = fast_pages(paged_type(None, _DEPENDENCIES))
+                actual = paged._derserializer(paged, page)  # pylint: disable=protected-access
+                self.assertEqual(actual.current_page, expected.current_page)
+                self.assertEqual(actual.next_link, expected.next_link)
+
+    def test_missing_and_null_values(self):
+        deserializer = Deserializer(_DEPENDENCIES)
+        self.assertIsNone(deserialize(deserializer, 'VirtualMachine', None))
+        body = {'location': 'eastus', 'properties': {'amountOfRam': 1024, 'nics': None}}
+        self.assertEqual(deserialize(deserializer, 'VirtualMachine', body),
+                         deserializer.deserialize_data(body, 'VirtualMachine'))
+
+
+if __name__ == '__main__':
+    unittest.main()
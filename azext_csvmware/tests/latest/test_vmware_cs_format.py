@@ -0,0 +1,83 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import unittest
+
+from knack.output import format_table
+from knack.util import CommandResultItem
+
+from azext_csvmware._format import VM_TABLE_FIELDS, transform_vm_table_list
+from azext_csvmware._streaming import to_output
+from azext_csvmware.custom import list_vm
+from azext_csvmware.vendored_sdks import models
+from azext_csvmware.vendored_sdks.models import VirtualMachinePaged
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_DEPENDENCIES = dict((name, model) for (name, model) in vars(models).items() if isinstance(model, type))
+_SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+
+
+def _vm(name, status='running'):
+    return {'id': '/subscriptions/{}/resourceGroups/rg/providers/Microsoft.VMwareCloudSimple/virtualMachines/{}'
+                  .format(_SUBSCRIPTION, name),
+            'name': name, 'location': 'eastus', 'type': 'Microsoft.VMwareCloudSimple/virtualMachines',
+            'properties': {
+                'privateCloudId': 'pc', 'amountOfRam': 2048, 'numberOfCores': 2, 'status': status,
+                'guestOS': 'Ubuntu Linux (64-bit)', 'publicIP': '10.0.0.1', 'dnsname': name + '.example.com',
+                'folder': 'vms', 'vmwaretools': '10346', 'templateId': 'template', 'username': 'admin',
+                'resourcePool': {'id': 'pool', 'properties': {'fullName': 'cluster/pool'}},
+                'disks': [{'controllerId': '1000', 'independenceMode': 'persistent', 'totalSize': 16777216,
+                           'virtualDiskName': 'Hard disk 1'}],
+                'nics': [{'nicType': 'VMXNET3', 'ipAddresses': ['10.0.0.4', '10.0.0.5'], 'virtualNicName': 'nic1',
+                          'network': {'id': 'vnet1', 'name': 'VM Network'}},
+                         {'nicType': 'E1000', 'ipAddresses': None, 'virtualNicName': 'nic2',
+                          'network': {'id': 'vnet2', 'name': None}}]}}
+
+
+class _VirtualMachines(object):  # pylint: disable=too-few-public-methods
+    def list_by_subscription(self, **_):
+        page = {'value': [_vm('vm1'), _vm('vm2', 'deallocated')], 'nextLink': None}
+        return VirtualMachinePaged(lambda _: json.loads(json.dumps(page)), _DEPENDENCIES)
+
+
+def _table(rows):
+    return format_table(CommandResultItem(rows, table_transformer=transform_vm_table_list))
+
+
+class VmTableTest(unittest.TestCase):
+
+    def _list(self, **kwargs):
+        return to_output(list(list_vm(mock.Mock(), _VirtualMachines(), prefetch_depth=0, **kwargs)))
+
+    def test_compact_records_hold_the_fields_of_the_table(self):
+        full = self._list()
+        compact = self._list(compact=True)
+        self.assertEqual(sorted(compact[0]), sorted(set(field.split('.')[0] for field in VM_TABLE_FIELDS) |
+                                                    {'resourceGroup'}))
+        self.assertEqual(transform_vm_table_list(compact), transform_vm_table_list(full))
+        [row, _] = transform_vm_table_list(compact)
+        self.assertEqual(row['Size'], '2 cores, 2048 MB memory')
+        self.assertEqual((row['IP Addresses'], row['vSphere Networks']), ('10.0.0.4, 10.0.0.5', 'VM Network'))
+
+    def test_other_fields_are_shown_as_they_are(self):
+        rows = self._list(fields=['name', 'status', 'nics.ipAddresses'])
+        self.assertIs(transform_vm_table_list(rows), rows)
+        self.assertEqual(_table(rows).splitlines()[0].split(), ['Name', 'Status'])
+
+    def test_table_fields_with_more_fields_are_transformed(self):
+        rows = self._list(fields=VM_TABLE_FIELDS + ['templateId'])
+        self.assertEqual(_table(rows), _table(self._list()))
+
+    def test_empty_list(self):
+        self.assertEqual(transform_vm_table_list([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
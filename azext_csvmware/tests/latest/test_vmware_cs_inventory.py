@@ -0,0 +1,315 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+
+from knack.util import CLIError
+from msrest import Deserializer
+
+from azext_csvmware import _inventory
+from azext_csvmware._config import INVENTORY_SCHEMA_VERSION
+from azext_csvmware._inventory import connect, open_snapshot, sync_inventory
+from azext_csvmware.custom import list_virtual_networks, list_vm, show_vm
+from azext_csvmware.vendored_sdks import models
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+_DEPENDENCIES = dict((name, model) for (name, model) in vars(models).items() if isinstance(model, type))
+_PROVIDER = '/subscriptions/{}/providers/Microsoft.VMwareCloudSimple'.format(_SUBSCRIPTION)
+
+
+def _pc_id(region, pc):
+    return '{}/locations/{}/privateClouds/{}'.format(_PROVIDER, region, pc)
+
+
+def _private_cloud(region, pc, **properties):
+    return {'id': _pc_id(region, pc), 'name': pc, 'location': region, 'properties': properties}
+
+
+def _child(region, pc, kind, name, **properties):
+    return {'id': '{}/{}/{}'.format(_pc_id(region, pc), kind, name), 'name': name, 'location': region,
+            'properties': properties}
+
+
+def _vm(resource_group, name, region='eastus', pc='pc1', status='running', network=None):
+    nics = [{'network': {'id': '{}/virtualNetworks/{}'.format(_pc_id(region, pc), network)}}] if network else []
+    return {'id': '/subscriptions/{}/resourceGroups/{}/providers/Microsoft.VMwareCloudSimple/virtualMachines/{}'
+                  .format(_SUBSCRIPTION, resource_group, name),
+            'name': name, 'location': region,
+            'properties': {'privateCloudId': _pc_id(region, pc), 'status': status, 'nics': nics}}
+
+
+class _Operations(object):  # pylint: disable=too-few-public-methods
+    """
+    An operation group listing the items of cloud.resources[kind][scope] in a single page, and recording its lists.
+    """
+
+    def __init__(self, cloud, kind, paged_type):
+        self._cloud = cloud
+        self._kind = kind
+        self._paged_type = paged_type
+        self._deserialize = Deserializer(_DEPENDENCIES)
+
+    def _paged(self, *scope):
+        self._cloud.lists.append((self._kind,) + scope)
+        page = {'value': list(self._cloud.resources[self._kind].get(scope, [])), 'nextLink': None}
+        return self._paged_type(lambda _: page, _DEPENDENCIES)
+
+
+class _VirtualMachines(_Operations):  # pylint: disable=too-few-public-methods
+    def list_by_subscription(self):
+        return self._paged()
+
+
+class _PrivateClouds(_Operations):  # pylint: disable=too-few-public-methods
+    def list(self, region):
+        return self._paged(region)
+
+
+class _ResourcePools(_Operations):  # pylint: disable=too-few-public-methods
+    def list(self, region, pc_name):
+        return self._paged(region, pc_name)
+
+
+class _VirtualNetworks(_Operations):  # pylint: disable=too-few-public-methods
+    def list(self, region, pc_name, resource_pool_name):
+        return self._paged(region, pc_name, resource_pool_name)
+
+
+class _VirtualMachineTemplates(_Operations):  # pylint: disable=too-few-public-methods
+    def list(self, pc_name, region, resource_pool_name):
+        return self._paged(region, pc_name, resource_pool_name)
+
+
+class _Cloud(object):  # pylint: disable=too-few-public-methods
+    """
+    A fake VMwareCloudSimpleClient over a subscription with a private cloud pc1 in eastus, holding a resource
+    pool pool1, with a virtual network vnet1 and a template tpl1.
+    """
+
+    def __init__(self):
+        self.lists = []
+        self.resources = {
+            'virtual_machines': {(): [_vm('rg1', 'vm1', network='vnet1'), _vm('rg2', 'vm2', status='deallocated')]},
+            'private_clouds': {('eastus',): [_private_cloud('eastus', 'pc1', totalCpuCores=8)]},
+            'resource_pools': {('eastus', 'pc1'): [_child('eastus', 'pc1', 'resourcePools', 'pool1')]},
+            'virtual_networks': {('eastus', 'pc1', 'pool1'): [_child('eastus', 'pc1', 'virtualNetworks', 'vnet1')]},
+            'vm_templates': {('eastus', 'pc1', 'pool1'): [_child('eastus', 'pc1', 'virtualMachineTemplates', 'tpl1')]},
+        }
+        self._deserialize = Deserializer(_DEPENDENCIES)
+        self.virtual_machines = _VirtualMachines(self, 'virtual_machines', models.VirtualMachinePaged)
+        self.private_clouds = _PrivateClouds(self, 'private_clouds', models.PrivateCloudPaged)
+        self.resource_pools = _ResourcePools(self, 'resource_pools', models.ResourcePoolPaged)
+        self.virtual_networks = _VirtualNetworks(self, 'virtual_networks', models.VirtualNetworkPaged)
+        self.virtual_machine_templates = _VirtualMachineTemplates(self, 'vm_templates',
+                                                                  models.VirtualMachineTemplatePaged)
+
+    def listed(self, kind):
+        return [scope[1:] for scope in self.lists if scope[0] == kind]
+
+
+@mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda _: _SUBSCRIPTION)
+class InventorySyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'inventory.db')
+        self.cli_ctx = mock.Mock()
+        self.cloud = _Cloud()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _sync(self, incremental=False, locations=None):
+        del self.cloud.lists[:]
+        return sync_inventory(self.cli_ctx, self.cloud, locations, self.path, incremental=incremental)
+
+    def _query(self, sql):
+        with closing(sqlite3.connect(self.path)) as connection:
+            return connection.execute(sql).fetchall()
+
+    def test_sync_creates_the_schema(self):
+        summary = self._sync()
+        self.assertEqual(self._query('PRAGMA user_version'), [(INVENTORY_SCHEMA_VERSION,)])
+        self.assertEqual((summary['privateClouds'], summary['resourcePools'], summary['virtualNetworks'],
+                          summary['vmTemplates'], summary['virtualMachines']), (1, 1, 1, 1, 2))
+        self.assertEqual(summary['locations'], ['eastus'])
+        self.assertEqual(self._query('SELECT name, resource_group, location, private_cloud, status '
+                                     'FROM virtual_machines ORDER BY name'),
+                         [('vm1', 'rg1', 'eastus', 'pc1', 'running'), ('vm2', 'rg2', 'eastus', 'pc1', 'deallocated')])
+        self.assertEqual(self._query('SELECT network_id FROM vm_networks'),
+                         [('{}/virtualnetworks/vnet1'.format(_pc_id('eastus', 'pc1')).lower(),)])
+
+    def test_schema_of_another_version_is_dropped(self):
+        with closing(sqlite3.connect(self.path)) as connection:
+            connection.execute('CREATE TABLE snapshots (subscription TEXT, synced_at REAL)')
+            connection.execute("INSERT INTO snapshots VALUES ('{}', 0)".format(_SUBSCRIPTION))
+            connection.execute('PRAGMA user_version = {}'.format(INVENTORY_SCHEMA_VERSION - 1))
+            connection.commit()
+        with mock.patch.object(_inventory, 'logger') as logger:
+            connect(self.path).close()
+            self.assertIn('another version', logger.warning.call_args[0][0])
+        self.assertEqual(self._query('PRAGMA user_version'), [(INVENTORY_SCHEMA_VERSION,)])
+        self.assertEqual(self._query('SELECT * FROM snapshots'), [])
+        # A new or current file is kept as it is, without a warning.
+        self._sync()
+        with mock.patch.object(_inventory, 'logger') as logger:
+            connect(self.path).close()
+            self.assertFalse(logger.warning.called)
+        self.assertEqual(len(self._query('SELECT * FROM snapshots')), 1)
+
+    def test_change_set(self):
+        summary = self._sync()
+        self.assertEqual(summary['changes'], {'added': 6, 'modified': 0, 'removed': 0})
+        self.cloud.resources['virtual_machines'][()] = [_vm('rg1', 'vm1', status='deallocated', network='vnet1'),
+                                                        _vm('rg1', 'vm3')]
+        summary = self._sync()
+        self.assertEqual(summary['changes'], {'added': 1, 'modified': 1, 'removed': 1})
+        [synced_at] = self._query('SELECT synced_at FROM snapshots')[0]
+        changes = self._query('SELECT kind, id, change FROM changes WHERE synced_at = {!r} ORDER BY change'
+                              .format(synced_at))
+        self.assertEqual([(kind, item_id.rsplit('/', 1)[-1], change) for (kind, item_id, change) in changes],
+                         [('virtual_machines', 'vm3', 'added'), ('virtual_machines', 'vm1', 'modified'),
+                          ('virtual_machines', 'vm2', 'removed')])
+
+    @mock.patch.object(_inventory, 'INVENTORY_CHANGE_SETS', 2)
+    def test_last_change_sets_are_kept(self):
+        for status in ['running', 'stopped', 'running']:
+            self.cloud.resources['virtual_machines'][()][1]['properties']['status'] = status
+            self._sync()
+        synced_at = [row[0] for row in self._query('SELECT DISTINCT synced_at FROM changes ORDER BY synced_at')]
+        self.assertEqual(len(synced_at), 2)
+        self.assertEqual(synced_at[-1], self._query('SELECT synced_at FROM snapshots')[0][0])
+
+    def test_incremental_sync_keeps_unchanged_subtrees(self):
+        self._sync()
+        summary = self._sync(incremental=True)
+        self.assertTrue(summary['incremental'])
+        self.assertEqual(summary['privateCloudsUnchanged'], 1)
+        self.assertEqual(self.cloud.listed('resource_pools'), [('eastus', 'pc1')])
+        self.assertEqual(self.cloud.listed('virtual_networks') + self.cloud.listed('vm_templates'), [])
+        self.assertEqual((summary['virtualNetworks'], summary['vmTemplates']), (1, 1))
+        self.assertEqual(summary['changes'], {'added': 0, 'modified': 0, 'removed': 0})
+
+    def test_incremental_sync_lists_the_subtree_of_changed_resource_pools(self):
+        self._sync()
+        self.cloud.resources['resource_pools'][('eastus', 'pc1')].append(
+            _child('eastus', 'pc1', 'resourcePools', 'pool2'))
+        self.cloud.resources['virtual_networks'][('eastus', 'pc1', 'pool2')] = [
+            _child('eastus', 'pc1', 'virtualNetworks', 'vnet2')]
+        summary = self._sync(incremental=True)
+        self.assertEqual(summary['privateCloudsUnchanged'], 0)
+        self.assertEqual(sorted(self.cloud.listed('virtual_networks')),
+                         [('eastus', 'pc1', 'pool1'), ('eastus', 'pc1', 'pool2')])
+        self.assertEqual((summary['resourcePools'], summary['virtualNetworks']), (2, 2))
+        self.assertEqual(summary['changes'], {'added': 2, 'modified': 0, 'removed': 0})
+
+    def test_incremental_sync_lists_old_subtrees_again(self):
+        self._sync()
+        self.cloud.resources['virtual_networks'][('eastus', 'pc1', 'pool1')][0]['properties']['assignable'] = False
+        # The virtual network changed under an unchanged private cloud and resource pool: it is kept...
+        self.assertEqual(self._sync(incremental=True)['changes']['modified'], 0)
+        # ...until the subtree is older than INVENTORY_SUBTREE_MAX_AGE.
+        with mock.patch.object(_inventory, 'INVENTORY_SUBTREE_MAX_AGE', -1):
+            summary = self._sync(incremental=True)
+        self.assertEqual(summary['privateCloudsUnchanged'], 0)
+        self.assertEqual(self.cloud.listed('virtual_networks'), [('eastus', 'pc1', 'pool1')])
+        self.assertEqual(summary['changes'], {'added': 0, 'modified': 1, 'removed': 0})
+
+
+@mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda _: _SUBSCRIPTION)
+class InventorySnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'inventory.db')
+        self.cmd = mock.Mock()
+        self.cloud = _Cloud()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _sync(self):
+        sync_inventory(self.cmd.cli_ctx, self.cloud, None, self.path)
+        del self.cloud.lists[:]
+
+    def _open(self, offline=False, max_staleness=None):
+        snapshot = open_snapshot(self.cmd.cli_ctx, self.path, offline, max_staleness)
+        if snapshot is not None:
+            self.addCleanup(snapshot._connection.close)  # pylint: disable=protected-access
+        return snapshot
+
+    def test_without_inventory(self):
+        self.assertIsNone(self._open(max_staleness=60))
+        with self.assertRaises(CLIError) as context:
+            self._open(offline=True)
+        self.assertIn('There is no inventory of subscription', str(context.exception))
+
+    def test_inventory_older_than_max_staleness(self):
+        self._sync()
+        self.assertIsNotNone(self._open(max_staleness=60))
+        self.assertIsNone(self._open(max_staleness=-1))
+        with self.assertRaises(CLIError) as context:
+            self._open(offline=True, max_staleness=-1)
+        self.assertIn('more than --max-staleness', str(context.exception))
+
+    def test_virtual_machines_are_served_as_listed(self):
+        self._sync()
+        snapshot = self._open(offline=True)
+        live = list(self.cloud.virtual_machines.list_by_subscription())
+        with mock.patch.object(_inventory, 'INVENTORY_PAGE_SIZE', 1):
+            served = list(snapshot.list_vms(self.cloud.virtual_machines))
+        self.assertEqual(served, live)
+        self.assertEqual([vm.name for vm in snapshot.list_vms(self.cloud.virtual_machines, ['RG2'], ['EastUS'])],
+                         ['vm2'])
+        self.assertEqual(snapshot.get_vm(self.cloud.virtual_machines, 'RG1', 'VM1').name, 'vm1')
+        self.assertIsNone(snapshot.get_vm(self.cloud.virtual_machines, 'rg1', 'vm2'))
+
+    def test_commands_served_offline(self):
+        self._sync()
+        virtual_machines = list_vm(self.cmd, self.cloud.virtual_machines, resource_group_name='rg1', offline=True,
+                                   inventory_file=self.path)
+        self.assertEqual([vm.name for vm in virtual_machines], ['vm1'])
+        with self.assertRaises(CLIError) as context:
+            show_vm(self.cmd, self.cloud.virtual_machines, 'rg1', 'vm3', offline=True, inventory_file=self.path)
+        self.assertIn("'vm3' of resource group 'rg1' is not in the inventory", str(context.exception))
+        # --offline never lists anything live.
+        self.assertEqual(self.cloud.lists, [])
+
+    def test_resource_pool_subtree_older_than_max_staleness(self):
+        self._sync()
+        snapshot = self._open(max_staleness=3600)
+        [vnet] = list(snapshot.list_in_resource_pool(self.cloud.virtual_networks, 'virtual_networks', 'EastUS', 'PC1',
+                                                     'pool1'))
+        self.assertEqual(vnet.name, 'vnet1')
+        self.assertIsNone(snapshot.list_in_resource_pool(self.cloud.virtual_networks, 'virtual_networks', 'eastus',
+                                                         'pc1', 'pool2'))
+        # An incremental sync kept the subtree of the private cloud, listed long ago.
+        with closing(sqlite3.connect(self.path)) as connection:
+            connection.execute('UPDATE private_clouds SET subtree_synced_at = 0')
+            connection.commit()
+        self.assertIsNone(snapshot.list_in_resource_pool(self.cloud.virtual_networks, 'virtual_networks', 'eastus',
+                                                         'pc1', 'pool1'))
+        # The command is then served live, or fails if --offline is set.
+        [vnet] = list(list_virtual_networks(self.cmd, self.cloud.virtual_networks, 'pc1', 'pool1', 'eastus',
+                                            max_staleness=3600, inventory_file=self.path))
+        self.assertEqual(self.cloud.listed('virtual_networks'), [('eastus', 'pc1', 'pool1')])
+        with self.assertRaises(CLIError) as context:
+            list_virtual_networks(self.cmd, self.cloud.virtual_networks, 'pc1', 'pool1', 'eastus', offline=True,
+                                  max_staleness=3600, inventory_file=self.path)
+        self.assertIn('were listed', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+from knack.util import CLIError
+
+from azext_csvmware._paging import (decode_token, encode_token, prefetch_pages, read_slice, skip_token_of,
+                                    stop_prefetch)
+from azext_csvmware.vendored_sdks import models
+from azext_csvmware.vendored_sdks.models import VirtualMachinePaged
+
+_DEPENDENCIES = dict((name, model) for (name, model) in vars(models).items() if isinstance(model, type))
+
+_NEXT_LINK = 'https://management.azure.com/subscriptions/s/providers/Microsoft.VMwareCloudSimple/virtualMachines' \
+             '?api-version=2019-04-01&$skipToken={}'
+
+
+class _Pages(object):  # pylint: disable=too-few-public-methods
+    """
+    A list of vm_count virtual machines, in pages of page_size, whose $skipToken is the index of the first
+    virtual machine of the page, or without $skipToken if not next_links. The list is requested from the page
+    of skip_token.
+    """
+
+    def __init__(self, vm_count, page_size, skip_token=None, next_links=True):
+        self.vm_count = vm_count
+        self.page_size = page_size
+        self.skip_token = skip_token
+        self.next_links = next_links
+        self.requests = []
+
+    def __call__(self, next_link, raw=False):  # pylint: disable=unused-argument
+        start = int(next_link.rsplit('=', 1)[1] if next_link else self.skip_token or 0)
+        self.requests.append(start)
+        end = min(start + self.page_size, self.vm_count)
+        next_link = None
+        if end < self.vm_count:
+            next_link = (_NEXT_LINK if self.next_links else 'https://management.azure.com/next?page={}').format(end)
+        return {'value': [{'name': 'vm{}'.format(index), 'location': 'eastus'} for index in range(start, end)],
+                'nextLink': next_link}
+
+    def paged(self):
+        return VirtualMachinePaged(self, _DEPENDENCIES)
+
+
+def _names(items):
+    return [item.name for item in items]
+
+
+class PagingTest(unittest.TestCase):
+
+    def test_token_round_trip(self):
+        self.assertEqual(decode_token(encode_token('abc+/=', 3)), ('abc+/=', 3))
+        self.assertEqual(decode_token(encode_token(None, 0)), (None, 0))
+
+    def test_invalid_token(self):
+        for token in ('', 'not a token', encode_token('abc', 0)[:-4], 'e30='):
+            with self.assertRaises(CLIError):
+                decode_token(token)
+
+    def test_skip_token_of(self):
+        self.assertEqual(skip_token_of(_NEXT_LINK.format(10)), '10')
+        self.assertEqual(skip_token_of('https://management.azure.com/next?$SkipToken=a%2Bb'), 'a+b')
+        self.assertIsNone(skip_token_of('https://management.azure.com/next?api-version=2019-04-01'))
+
+    def test_whole_list(self):
+        items, token = read_slice(_Pages(7, 3).paged())
+        self.assertEqual(_names(items), ['vm{}'.format(index) for index in range(7)])
+        self.assertIsNone(token)
+
+    def test_slices_resume_where_they_stop(self):
+        expected = ['vm{}'.format(index) for index in range(10)]
+        for max_items in (1, 2, 3, 4, 6, 9, 10, 11):
+            names = []
+            skip_token, offset = None, 0
+            while True:
+                items, token = read_slice(_Pages(10, 3, skip_token).paged(), max_items, skip_token, offset)
+                self.assertLessEqual(len(items), max_items)
+                names.extend(_names(items))
+                if token is None:
+                    break
+                skip_token, offset = decode_token(token)
+            self.assertEqual(names, expected, 'max_items={}'.format(max_items))
+
+    def test_slice_ending_on_a_page_boundary(self):
+        pages = _Pages(9, 3)
+        items, token = read_slice(pages.paged(), 3)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(decode_token(token), ('3', 0))
+        self.assertEqual(pages.requests, [0])
+
+    def test_slice_ending_within_a_page(self):
+        items, token = read_slice(_Pages(9, 3).paged(), 4)
+        self.assertEqual(_names(items)[-1], 'vm3')
+        self.assertEqual(decode_token(token), ('3', 1))
+
+    def test_offset_past_the_end_of_the_last_page(self):
+        items, token = read_slice(_Pages(9, 3, '6').paged(), 5, '6', 3)
+        self.assertEqual(items, [])
+        self.assertIsNone(token)
+
+    def test_list_without_skip_token_can_not_be_resumed(self):
+        with self.assertRaises(CLIError):
+            read_slice(_Pages(9, 3, next_links=False).paged(), 4)
+        items, token = read_slice(_Pages(9, 3, next_links=False).paged(), 2)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(decode_token(token), (None, 2))
+
+    def test_prefetch_stops_at_max_items(self):
+        pages = _Pages(30, 3)
+        paged = prefetch_pages(pages.paged(), depth=4, max_items=5)
+        try:
+            items, _ = read_slice(paged, 5)
+        finally:
+            stop_prefetch(paged)
+        self.assertEqual(len(items), 5)
+        self.assertEqual(pages.requests, [0, 3])
+
+    def test_prefetch_returns_the_whole_list(self):
+        paged = prefetch_pages(_Pages(10, 3).paged(), depth=2)
+        try:
+            self.assertEqual(_names(paged), ['vm{}'.format(index) for index in range(10)])
+        finally:
+            stop_prefetch(paged)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from contextlib import closing
+
+from knack.util import CLIError
+
+from azext_csvmware import _perf_history
+from azext_csvmware._perf_history import _percentile, append, connect, record_of, report
+from azext_csvmware._profiling import _Span
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_VM_URL = 'https://management.azure.com/subscriptions/s/resourceGroups/rg/providers/' \
+          'Microsoft.VMwareCloudSimple/virtualMachines/vm1'
+_OPERATION_URL = 'https://management.azure.com/subscriptions/s/providers/Microsoft.VMwareCloudSimple/' \
+                 'locations/EastUS/operationResults/op1'
+
+
+def _span(name, start, end, **attributes):
+    span = _Span(name, start, attributes)
+    span.end = end
+    return span
+
+
+def _record(recorded_at, duration, operation='vm create', location='eastus', lro_duration=None, outcome='succeeded'):
+    return (recorded_at, operation, location, 'pc', duration, 1, lro_duration, outcome)
+
+
+class PerfHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(_percentile(values, 50), 50)
+        self.assertEqual(_percentile(values, 95), 95)
+        self.assertEqual(_percentile(values, 99), 99)
+        self.assertEqual(_percentile([0.1234], 99), 0.123)
+        self.assertEqual(_percentile([1, 2, 3], 50), 2)
+        self.assertIsNone(_percentile([], 50))
+
+    def test_record_of_command(self):
+        root = _span('csvmware vm create', 100, 112, **{'csvmware.outcome': 'succeeded'})
+        root.children = [
+            _span('PUT virtualMachines', 100, 101, **{'http.method': 'PUT', 'http.url': _VM_URL,
+                                                      'http.status_code': 201}),
+            _span('GET operationResults', 105, 106, **{'http.method': 'GET', 'http.url': _OPERATION_URL,
+                                                       'http.status_code': 200}),
+            _span('GET operationResults', 110, 111, **{'http.method': 'GET', 'http.url': _OPERATION_URL,
+                                                       'http.status_code': 200}),
+        ]
+        namespace = mock.Mock(location=None, private_cloud='/subscriptions/s/.../privateClouds/PC1')
+        self.assertEqual(record_of(root, namespace), (100, 'vm create', 'eastus', 'pc1', 12, 3, 10, 'succeeded'))
+
+    def test_record_of_failed_command_without_requests(self):
+        record = record_of(_span('csvmware  vm list', 100, 100.5), None)
+        self.assertEqual(record, (100, 'vm list', None, None, 0.5, 0, None, 'failed'))
+
+    @mock.patch.object(_perf_history, 'PERF_HISTORY_MAX_RECORDS', 3)
+    def test_history_keeps_the_last_records(self):
+        for index in range(5):
+            append(self.path, _record(index, index))
+        with closing(connect(self.path)) as connection:
+            durations = [row[0] for row in connection.execute('SELECT duration FROM records ORDER BY rowid')]
+        self.assertEqual(durations, [2, 3, 4])
+
+    def test_report_groups_by_operation_region_and_window(self):
+        now = time.time()
+        window_start = now - now % 3600 - 3600
+        for duration in range(1, 21):
+            append(self.path, _record(window_start + 1, duration, lro_duration=duration / 2.0))
+        append(self.path, _record(window_start + 2, 5, outcome='failed'))
+        append(self.path, _record(window_start + 3, 7, location='westus'))
+        append(self.path, _record(window_start + 4, 9, operation='vm list'))
+        append(self.path, _record(now - 30 * 86400, 100))
+
+        rows = report(None, window=3600, history_file=self.path)
+        self.assertEqual([(row['operation'], row['location'], row['count']) for row in rows],
+                         [('vm create', 'eastus', 21), ('vm create', 'westus', 1), ('vm list', 'eastus', 1)])
+        row = rows[0]
+        self.assertEqual((row['failed'], row['p50'], row['p95'], row['p99']), (1, 10, 19, 20))
+        self.assertEqual((row['lroP50'], row['lroP95'], row['lroP99']), (5, 9.5, 10))
+
+        rows = report(None, operation='csvmware vm create', region='WestUS', window=3600, history_file=self.path)
+        self.assertEqual([(row['location'], row['count']) for row in rows], [('westus', 1)])
+
+    def test_report_without_history(self):
+        with self.assertRaises(CLIError):
+            report(None, history_file=self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
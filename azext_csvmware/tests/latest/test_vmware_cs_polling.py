@@ -0,0 +1,99 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import requests
+from msrest.exceptions import ClientRequestError
+from msrestazure.azure_exceptions import CloudError
+
+from azext_csvmware import _polling
+from azext_csvmware._polling import is_transient, wait_for_operations
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+def _response(status_code, body=b'{"error": {"code": "Error", "message": "error"}}'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body  # pylint: disable=protected-access
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+class _Operation(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, status):
+        self.name = 'operation'
+        self.status = status
+        self.error = None
+
+
+class _RawResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, status):
+        self.output = _Operation(status)
+        self.response = _response(200)
+        self.response.headers['Retry-After'] = '0'
+
+
+class _Operations(object):
+    """
+    Returns or raises the given outcomes of the polls of every operation, in order.
+    """
+
+    def __init__(self, outcomes):
+        self.outcomes = dict((operation_id, list(items)) for (operation_id, items) in outcomes.items())
+        self.polls = dict((operation_id, 0) for operation_id in outcomes)
+
+    def get(self, _, operation_id, raw=False):  # pylint: disable=unused-argument
+        self.polls[operation_id] += 1
+        outcome = self.outcomes[operation_id].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _RawResult(outcome)
+
+
+class _Client(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, outcomes):
+        self.operations = _Operations(outcomes)
+
+
+@mock.patch.object(_polling, 'OPERATION_POLL_RETRY_BACKOFF', 0)
+class PollingTest(unittest.TestCase):
+
+    def test_is_transient(self):
+        self.assertTrue(is_transient(ClientRequestError('Connection reset')))
+        self.assertTrue(is_transient(CloudError(_response(503))))
+        self.assertTrue(is_transient(CloudError(_response(429))))
+        self.assertFalse(is_transient(CloudError(_response(404))))
+        self.assertFalse(is_transient(ValueError('not a request error')))
+
+    def test_transient_error_is_polled_again(self):
+        client = _Client({'op1': [ClientRequestError('Connection reset'), CloudError(_response(502)), 'Succeeded']})
+        [(operation, error)] = wait_for_operations(client, [('eastus', 'op1')])
+        self.assertIsNone(error)
+        self.assertEqual(operation.status, 'Succeeded')
+        self.assertEqual(client.operations.polls['op1'], 3)
+
+    def test_error_which_is_not_transient_fails_the_operation(self):
+        client = _Client({'op1': [CloudError(_response(404))], 'op2': ['InProgress', 'Succeeded']})
+        [(_, error), (operation, _)] = wait_for_operations(client, [('eastus', 'op1'), ('eastus', 'op2')])
+        self.assertIsInstance(error, CloudError)
+        self.assertEqual(client.operations.polls['op1'], 1)
+        self.assertEqual(operation.status, 'Succeeded')
+
+    @mock.patch.object(_polling, 'OPERATION_POLL_MAX_ERRORS', 2)
+    def test_operation_fails_after_too_many_errors(self):
+        client = _Client({'op1': [ClientRequestError('Connection reset')] * 2 + ['Succeeded']})
+        [(operation, error)] = wait_for_operations(client, [('eastus', 'op1')])
+        self.assertIsNone(operation)
+        self.assertIsInstance(error, ClientRequestError)
+        self.assertEqual(client.operations.polls['op1'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import argparse
+import threading
+import unittest
+
+from azext_csvmware import _profiling
+from azext_csvmware._profiling import _Span, _on_parsed, Profiler, bind, span, start
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class _Config(object):
+    """
+    The csvmware section of an az configuration holding options.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.config_dir = '/home/user/.azure'
+
+    def get(self, section, option, fallback=None):  # pylint: disable=unused-argument
+        return self.options.get(option, fallback)
+
+    def getboolean(self, section, option, fallback=False):
+        return str(self.get(section, option, fallback)).lower() == 'true'
+
+
+def _cli_ctx(**options):
+    return mock.Mock(config=_Config(**options), data={'headers': {'x-ms-client-request-id': 'request'}})
+
+
+def _namespace(calls, **kwargs):
+    def _check_name(namespace):
+        calls.append(('argument', namespace))
+
+    def _check_command(cmd, namespace):  # pylint: disable=unused-argument
+        calls.append(('command', namespace))
+
+    return argparse.Namespace(_command_validator=_check_command, _argument_validators=[_check_name], **kwargs)
+
+
+def _names(spans):
+    return [child.name for child in spans]
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registered = []
+        for patcher in [mock.patch.object(_profiling, '_profiler', None),
+                        mock.patch.object(_profiling, '_finish_at_exit', False),
+                        mock.patch.object(_profiling.atexit, 'register', self.registered.append)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_span_without_profiler(self):
+        with span('request') as current:
+            self.assertIsNone(current)
+        self.assertEqual(self.registered, [])
+
+    def test_spans_are_nested(self):
+        profiler = start('csvmware vm show', report=False)
+        with span('request', method='GET'):
+            with span('deserialize'):
+                pass
+        with self.assertRaises(ValueError):
+            with span('output'):
+                raise ValueError('invalid')
+        [request, output] = profiler.root.children
+        self.assertEqual((request.name, request.attributes), ('request', {'method': 'GET'}))
+        self.assertEqual(_names(request.children), ['deserialize'])
+        self.assertTrue(request.start <= request.children[0].start <= request.children[0].end <= request.end)
+        self.assertEqual(output.attributes, {'exception.type': 'ValueError', 'exception.message': 'invalid'})
+        self.assertEqual(self.registered, [_profiling.finish])
+
+    def test_bind_records_the_spans_of_a_thread_under_its_caller(self):
+        profiler = start('csvmware vm start', report=False)
+
+        def _request():
+            with span('request'):
+                pass
+
+        with span('start'):
+            threads = [threading.Thread(target=bind(_request)), threading.Thread(target=_request, name='worker')]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        [started, worker] = profiler.root.children
+        self.assertEqual(_names(started.children), ['request'])
+        # A thread which is not bound records its spans under a span named after it.
+        self.assertEqual((worker.name, _names(worker.children)), ('worker', ['request']))
+
+    def test_report_merges_the_siblings_of_the_same_name(self):
+        profiler = Profiler('csvmware vm list', report=False)
+        profiler.root = _Span('csvmware vm list', 0)
+        for (start_time, end) in [(0, 0.25), (0.25, 0.75)]:
+            request = profiler.add(profiler.root, _Span('GET virtualMachines', start_time))
+            request.end = end
+            deserialize = profiler.add(request, _Span('deserialize', start_time))
+            deserialize.end = start_time + 0.125
+        profiler.finish(succeeded=True)
+        self.assertEqual(profiler.root.attributes['csvmware.outcome'], 'succeeded')
+        self.assertEqual(profiler.report().splitlines(), [
+            'Profile of csvmware vm list (750.0 ms):',
+            '  total ms    self ms  calls  span',
+            '     750.0        0.0      1  csvmware vm list',
+            '     750.0      500.0      2    GET virtualMachines',
+            '     250.0      250.0      2      deserialize'])
+
+    def test_command_is_not_profiled_by_default(self):
+        calls = []
+        args = _namespace(calls)
+        validators = (args._command_validator, args._argument_validators)  # pylint: disable=protected-access
+        _on_parsed(_cli_ctx(), command='csvmware vm list', args=args)
+        self.assertIsNone(_profiling._profiler)  # pylint: disable=protected-access
+        self.assertEqual((args._command_validator, args._argument_validators),  # pylint: disable=protected-access
+                         validators)
+        self.assertEqual(self.registered, [])
+
+    def test_profiled_command_records_its_validators(self):
+        calls = []
+        args = _namespace(calls, _profile=True)
+        _on_parsed(_cli_ctx(), command='csvmware vm show', args=args)
+        profiler = _profiling._profiler  # pylint: disable=protected-access
+        self.assertTrue(profiler.report_tree)
+        self.assertIsNone(profiler.history_file)
+        self.assertEqual(profiler.root.attributes['az.client_request_id'], 'request')
+
+        args._argument_validators[0](cmd=None, namespace=args)  # pylint: disable=protected-access
+        args._command_validator(cmd=None, namespace=args)  # pylint: disable=protected-access
+        self.assertEqual(calls, [('argument', args), ('command', args)])
+        self.assertEqual(_names(profiler.root.children), ['_check_name', '_check_command'])
+
+    def test_recorded_command_keeps_its_validators(self):
+        calls = []
+        args = _namespace(calls)
+        validator = args._command_validator  # pylint: disable=protected-access
+        _on_parsed(_cli_ctx(perf_history='true'), command='csvmware vm show', args=args)
+        profiler = _profiling._profiler  # pylint: disable=protected-access
+        self.assertFalse(profiler.report_tree)
+        self.assertTrue(profiler.history_file.endswith('csvmware_perf_history.db'))
+        self.assertIs(args._command_validator, validator)  # pylint: disable=protected-access
+
+        # The reports of the history are not recorded in it.
+        _profiling._profiler = None  # pylint: disable=protected-access
+        _on_parsed(_cli_ctx(perf_history='true'), command='csvmware perf report', args=_namespace(calls))
+        self.assertIsNone(_profiling._profiler)  # pylint: disable=protected-access
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+
+import requests
+from msrest.exceptions import HttpOperationError
+
+from azext_csvmware import _cache
+from azext_csvmware._cache import get_resource_group_location, is_location_error, refresh_stale_location
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+def _error(status_code, code):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = '{{"error": {{"code": "{}", "message": "error"}}}}'.format(code).encode('utf-8')  # pylint: disable=protected-access
+    return HttpOperationError(None, response)
+
+
+class _Config(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+
+class _CliContext(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, config_dir):
+        self.config = _Config(config_dir)
+
+
+class _ResourceGroups(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, location):
+        self.location = location
+        self.reads = 0
+
+    def get(self, _):
+        self.reads += 1
+        return mock.Mock(location=self.location)
+
+
+@mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda _: 'subscription')
+class ResourceGroupLocationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.cli_ctx = _CliContext(self.config_dir)
+        self.resource_groups = _ResourceGroups('westus')
+        patcher = mock.patch('azext_csvmware._client_factory.cf_resource_groups', lambda _: self.resource_groups)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(_cache._served.clear)  # pylint: disable=protected-access
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def test_is_location_error(self):
+        self.assertTrue(is_location_error(_error(404, 'ResourceGroupNotFound')))
+        self.assertTrue(is_location_error(_error(400, 'InvalidResourceLocation')))
+        self.assertTrue(is_location_error(_error(400, 'LocationNotAvailableForResourceType')))
+        self.assertFalse(is_location_error(_error(400, 'InvalidParameter')))
+        # A missing resource is not a sign of a stale location.
+        self.assertFalse(is_location_error(_error(404, 'ResourceNotFound')))
+        self.assertFalse(is_location_error(_error(404, 'NotFound')))
+        self.assertFalse(is_location_error(HttpOperationError(None, requests.Response())))
+        self.assertFalse(is_location_error(ValueError('no response')))
+
+    def test_location_is_cached(self):
+        self.assertEqual(get_resource_group_location(self.cli_ctx, 'rg'), 'westus')
+        self.assertEqual(get_resource_group_location(self.cli_ctx, 'rg'), 'westus')
+        self.assertEqual(self.resource_groups.reads, 1)
+
+    def test_stale_location_is_refreshed(self):
+        get_resource_group_location(self.cli_ctx, 'rg')
+        self.resource_groups.location = 'eastus'
+        self.assertEqual(get_resource_group_location(self.cli_ctx, 'rg'), 'westus')
+        self.assertEqual(refresh_stale_location(self.cli_ctx, 'rg', 'westus'), 'eastus')
+        self.assertEqual(get_resource_group_location(self.cli_ctx, 'rg'), 'eastus')
+        self.assertEqual(self.resource_groups.reads, 2)
+
+    def test_location_not_served_from_cache_is_not_retried(self):
+        get_resource_group_location(self.cli_ctx, 'rg', refresh=True)
+        self.resource_groups.location = 'eastus'
+        self.assertIsNone(refresh_stale_location(self.cli_ctx, 'rg', 'westus'))
+        # The entry is dropped all the same, so that the next command reads the location again.
+        self.assertEqual(get_resource_group_location(self.cli_ctx, 'rg'), 'eastus')
+
+
+if __name__ == '__main__':
+    unittest.main()
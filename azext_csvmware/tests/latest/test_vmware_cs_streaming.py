@@ -0,0 +1,105 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import io
+import json
+import unittest
+from collections import OrderedDict
+
+from knack.output import format_json, format_table
+from knack.util import CommandResultItem
+
+from azext_csvmware._streaming import stream_output, to_output
+from azext_csvmware.vendored_sdks import models
+from azext_csvmware.vendored_sdks.models import VirtualMachinePaged
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_DEPENDENCIES = dict((name, model) for (name, model) in vars(models).items() if isinstance(model, type))
+_PRIVATE_CLOUD = '/subscriptions/s/providers/Microsoft.VMwareCloudSimple/locations/eastus/privateClouds/pc'
+
+
+def _vm(resource_group, name, status=None):
+    return {'id': '/subscriptions/s/resourceGroups/{}/providers/Microsoft.VMwareCloudSimple/virtualMachines/{}'
+                  .format(resource_group, name),
+            'name': name, 'location': 'eastus', 'type': 'Microsoft.VMwareCloudSimple/virtualMachines',
+            'properties': {'privateCloudId': _PRIVATE_CLOUD, 'amountOfRam': 1024, 'numberOfCores': 1,
+                           'status': status, 'nics': [{'virtualNicName': 'Network adapter 1'}]}}
+
+
+_PAGES = [[_vm('rg1', 'vm1', 'running'), _vm('rg2', 'vm22222')], [_vm('rg1', 'vm3', 'deallocated')]]
+
+
+def _paged(pages=None):
+    pages = pages or _PAGES
+
+    def _page(next_link, raw=False):  # pylint: disable=unused-argument
+        index = int(next_link.rsplit('=', 1)[1]) if next_link else 0
+        next_link = 'https://management.azure.com/next?page={}'.format(index + 1) if index + 1 < len(pages) else None
+        return {'value': copy.deepcopy(pages[index]), 'nextLink': next_link}
+
+    return VirtualMachinePaged(_page, _DEPENDENCIES)
+
+
+def _name_and_status(vm_list):
+    return [OrderedDict([('Name', vm['name']), ('Status', vm['status'])]) for vm in vm_list]
+
+
+def _stream(items, stream, table_transformer=None):
+    cli_ctx = mock.Mock(out_file=io.StringIO())
+    stream_output(cli_ctx, items, stream, table_transformer)
+    return cli_ctx.out_file.getvalue()
+
+
+def _formatted(formatter, items, table_transformer=None):
+    return formatter(CommandResultItem(to_output(list(items)), table_transformer=table_transformer))
+
+
+class StreamingTest(unittest.TestCase):
+
+    def test_to_output_adds_the_resource_group(self):
+        result = to_output([{'id': '/subscriptions/s/resourceGroups/RG1/providers/P/t/a',
+                             'nested': {'id': '/subscriptions/s/resourceGroups/rg2/providers/P/t/b'}},
+                            {'id': '/subscriptions/s/resourceGroups/rg1/providers/P/t/c', 'resourceGroup': 'kept'},
+                            {'id': _PRIVATE_CLOUD}, {'id': None}, 'text'])
+        self.assertEqual(result[0]['resourceGroup'], 'RG1')
+        self.assertEqual(result[0]['nested']['resourceGroup'], 'rg2')
+        self.assertEqual(result[1]['resourceGroup'], 'kept')
+        self.assertNotIn('resourceGroup', result[2])
+        self.assertNotIn('resourceGroup', result[3])
+
+    def test_jsonl_has_the_items_of_the_json_output(self):
+        lines = _stream(_paged(), 'jsonl').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual([json.loads(line) for line in lines], json.loads(_formatted(format_json, _paged())))
+        self.assertEqual(json.loads(lines[0])['resourceGroup'], 'rg1')
+
+    def test_table_of_a_single_page_is_the_table_output(self):
+        pages = _PAGES[:1]
+        self.assertEqual(_stream(_paged(pages), 'table'), _formatted(format_table, _paged(pages)))
+        self.assertEqual(_stream(_paged(pages), 'table', _name_and_status),
+                         _formatted(format_table, _paged(pages), _name_and_status))
+
+    def test_table_is_written_a_page_at_a_time(self):
+        lines = _stream(_paged(), 'table', _name_and_status).splitlines()
+        self.assertEqual(lines[:4], _formatted(format_table, _paged(_PAGES[:1]), _name_and_status).splitlines())
+        # The widths of the columns are set by the first page, a wider value is written in full.
+        self.assertEqual(lines[4], 'vm3      deallocated')
+
+    def test_table_starts_again_on_new_columns(self):
+        lines = _stream(_paged([[_vm('rg1', 'vm1')], [_vm('rg1', 'vm2', 'running')]]), 'table').splitlines()
+        self.assertEqual(lines[0].split(), ['AmountOfRam', 'Location', 'Name', 'NumberOfCores', 'PrivateCloudId',
+                                            'ResourceGroup'])
+        self.assertEqual(lines[3], '')
+        self.assertEqual(lines[4].split()[-1], 'Status')
+        self.assertEqual(len(lines), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
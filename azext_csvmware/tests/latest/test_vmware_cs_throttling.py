@@ -0,0 +1,151 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from email.utils import formatdate
+
+import requests
+
+from azext_csvmware import _throttling
+from azext_csvmware._config import DEFAULT_MAX_PARALLEL, THROTTLE_RETRY_AFTER
+from azext_csvmware._throttling import ThrottleController, _TokenBucket, request_kind, retry_after
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class _Clock(object):  # pylint: disable=too-few-public-methods
+    """
+    Stands for the time module in _throttling.py. The time only moves when the test moves it.
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class RetryAfterTest(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(retry_after({'Retry-After': '7'}), 7)
+        self.assertEqual(retry_after({'Retry-After': '-3'}), 0)
+
+    def test_http_date(self):
+        delay = retry_after({'Retry-After': formatdate(_throttling.time.time() + 60, usegmt=True)})
+        self.assertTrue(55 <= delay <= 60, delay)
+        self.assertEqual(retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}), 0)
+
+    def test_missing_or_invalid(self):
+        self.assertEqual(retry_after({}), THROTTLE_RETRY_AFTER)
+        self.assertEqual(retry_after({'Retry-After': 'soon'}, default=3), 3)
+
+    def test_request_kind(self):
+        self.assertEqual(request_kind('get'), 'reads')
+        self.assertEqual(request_kind('DELETE'), 'deletes')
+        self.assertEqual(request_kind('PATCH'), 'writes')
+
+
+class ThrottleControllerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch.object(_throttling, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_bucket(self):
+        bucket = _TokenBucket(2, 4)
+        self.assertEqual(bucket.take(self.clock.now), 0)
+        self.assertEqual(bucket.take(self.clock.now), 0)
+        self.assertEqual(bucket.take(self.clock.now), 0.25)
+        self.assertEqual(bucket.take(self.clock.now + 0.25), 0)
+        self.assertEqual(bucket.take(self.clock.now + 10), 0)
+        self.assertEqual(bucket.tokens, 1)
+
+    def test_remaining_header_limits_the_bucket(self):
+        bucket = _TokenBucket(250, 25)
+        bucket.limit(self.clock.now, 0)
+        self.assertEqual(bucket.take(self.clock.now), 1 / 25.0)
+
+        controller = ThrottleController()
+        sent_at = controller.acquire('writes')
+        controller.release('writes', sent_at, _response(200, {'x-ms-ratelimit-remaining-subscription-writes': '3'}))
+        self.assertEqual(controller._buckets['writes'].tokens, 3)  # pylint: disable=protected-access
+        self.assertEqual(controller._buckets['reads'].tokens, 250)  # pylint: disable=protected-access
+
+    def test_throttled_request_pauses_and_halves_the_limit(self):
+        controller = ThrottleController()
+        sent_at = controller.acquire('reads')
+        self.assertEqual(controller.in_flight, 1)
+        self.clock.now += 1
+        self.assertTrue(controller.release('reads', sent_at, _response(429, {'Retry-After': '7'})))
+        self.assertEqual(controller.in_flight, 0)
+        self.assertEqual(controller.throttled, 1)
+        self.assertEqual(controller.paused_until, self.clock.now + 7)
+        self.assertEqual(controller.limit, DEFAULT_MAX_PARALLEL / 2.0)
+
+    def test_pause_is_not_shortened(self):
+        controller = ThrottleController()
+        first, second = controller.acquire('reads'), controller.acquire('reads')
+        controller.release('reads', first, _response(429, {'Retry-After': '30'}))
+        controller.release('reads', second, _response(429, {'Retry-After': '5'}))
+        self.assertEqual(controller.paused_until, self.clock.now + 30)
+
+    def test_requests_sent_before_a_decrease_do_not_halve_the_limit_again(self):
+        controller = ThrottleController()
+        in_flight = [controller.acquire('reads') for _ in range(4)]
+        self.clock.now += 1
+        for sent_at in in_flight:
+            controller.release('reads', sent_at, _response(429, {'Retry-After': '0'}))
+        self.assertEqual(controller.limit, DEFAULT_MAX_PARALLEL / 2.0)
+        self.assertEqual(controller.throttled, 4)
+
+        self.clock.now += 1
+        sent_at = controller.acquire('reads')
+        controller.release('reads', sent_at, _response(429, {'Retry-After': '0'}))
+        self.assertEqual(controller.limit, DEFAULT_MAX_PARALLEL / 4.0)
+
+    def test_limit_is_at_least_one(self):
+        controller = ThrottleController()
+        for _ in range(10):
+            self.clock.now += 1
+            controller.release('reads', controller.acquire('reads'), _response(429, {'Retry-After': '0'}))
+        self.assertEqual(controller.limit, 1)
+
+    def test_limit_grows_by_one_per_limit_completed_requests(self):
+        controller = ThrottleController()
+        for _ in range(DEFAULT_MAX_PARALLEL):
+            controller.release('reads', controller.acquire('reads'), _response(200))
+        self.assertAlmostEqual(controller.limit, DEFAULT_MAX_PARALLEL + 1, delta=0.1)
+
+    def test_slow_request_halves_the_limit(self):
+        controller = ThrottleController()
+        controller.release('reads', controller.acquire('reads'), _response(200))
+        limit = controller.limit
+        sent_at = controller.acquire('reads')
+        self.clock.now += 60
+        self.assertFalse(controller.release('reads', sent_at, _response(200)))
+        self.assertEqual(controller.limit, limit / 2)
+
+    def test_request_without_response_only_frees_its_slot(self):
+        controller = ThrottleController()
+        sent_at = controller.acquire('deletes')
+        self.assertFalse(controller.release('deletes', sent_at))
+        self.assertEqual((controller.in_flight, controller.limit, controller.throttled), (0, DEFAULT_MAX_PARALLEL, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import unittest
+
+from azext_csvmware._profiling import _Span
+from azext_csvmware._tracing import STATUS_CODE_ERROR, STATUS_CODE_OK, to_otlp
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_TRACE_ID = '0af7651916cd43dd8448eb211c80319c'
+_PARENT_ID = 'b7ad6b7169203331'
+
+
+def _span(name, start, end, **attributes):
+    span = _Span(name, start, attributes)
+    span.end = end
+    return span
+
+
+def _command():
+    root = _span('csvmware vm show', 100, 101.5, **{'csvmware.outcome': 'succeeded'})
+    request = _span('GET virtualMachines', 100.25, 101, **{'http.method': 'GET', 'http.status_code': 404,
+                                                           'http.response_content_length': None})
+    request.children = [_span('deserialize CSRPError', 100.75, 100.875)]
+    root.children = [request]
+    return root
+
+
+class OtlpExportTest(unittest.TestCase):
+
+    def _spans(self, environ):
+        with mock.patch.dict(os.environ, environ, clear=True):
+            request = to_otlp(_command())
+        [resource_spans] = request['resourceSpans']
+        [scope_spans] = resource_spans['scopeSpans']
+        return scope_spans['spans']
+
+    def test_spans_are_linked_to_their_parent(self):
+        (root, request, deserialize) = self._spans({})
+        self.assertEqual(len({root['traceId'], request['traceId'], deserialize['traceId']}), 1)
+        self.assertEqual(len(root['traceId']), 32)
+        self.assertNotIn('parentSpanId', root)
+        self.assertEqual(request['parentSpanId'], root['spanId'])
+        self.assertEqual(deserialize['parentSpanId'], request['spanId'])
+        self.assertEqual((request['startTimeUnixNano'], request['endTimeUnixNano']), ('100250000000', '101000000000'))
+
+    def test_trace_is_continued_from_traceparent(self):
+        (root, _, _) = self._spans({'TRACEPARENT': '00-{}-{}-01'.format(_TRACE_ID, _PARENT_ID)})
+        self.assertEqual((root['traceId'], root['parentSpanId']), (_TRACE_ID, _PARENT_ID))
+
+    def test_invalid_traceparent_starts_a_new_trace(self):
+        (root, _, _) = self._spans({'TRACEPARENT': '00-not-a-trace-01'})
+        self.assertNotEqual(root['traceId'], _TRACE_ID)
+        self.assertNotIn('parentSpanId', root)
+
+    def test_kind_status_and_attributes(self):
+        (root, request, deserialize) = self._spans({})
+        self.assertEqual(root['status'], {'code': STATUS_CODE_OK})
+        self.assertEqual(request['status'], {'code': STATUS_CODE_ERROR, 'message': 'HTTP 404'})
+        self.assertNotEqual(root['kind'], request['kind'])
+        self.assertEqual(root['kind'], deserialize['kind'])
+        attributes = dict((attribute['key'], attribute['value']) for attribute in request['attributes'])
+        self.assertEqual(attributes['http.status_code'], {'intValue': '404'})
+        self.assertEqual(attributes['http.method'], {'stringValue': 'GET'})
+        self.assertNotIn('http.response_content_length', attributes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from knack.util import CLIError
+
+from azext_csvmware.custom import BLUEPRINT_VERSION, compile_vm_blueprint, create_vm
+from azext_csvmware.vendored_sdks.models import VirtualDisk, VirtualMachineTemplate, VirtualNetwork, VirtualNic
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+_PRIVATE_CLOUD = '/subscriptions/{}/providers/Microsoft.VMwareCloudSimple/locations/eastus/privateClouds/pc' \
+    .format(_SUBSCRIPTION)
+
+
+class _VirtualMachineTemplates(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.reads = 0
+
+    def get(self, location, private_cloud, template):  # pylint: disable=unused-argument
+        self.reads += 1
+        nic = VirtualNic(nic_type='VMXNET3', power_on_boot=True, network=VirtualNetwork(id='network'))
+        nic.virtual_nic_name = 'Network adapter 1'
+        disk = VirtualDisk(controller_id='1000', independence_mode='persistent', total_size=16777216)
+        disk.virtual_disk_name = 'Hard disk 1'
+        return VirtualMachineTemplate(amount_of_ram=1024, number_of_cores=2, private_cloud_id=_PRIVATE_CLOUD,
+                                      nics=[nic], disks=[disk])
+
+
+class _VirtualMachines(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.created = []
+
+    def create_or_update(self, resource_group_name, vm_name, virtual_machine):
+        self.created.append((resource_group_name, vm_name, virtual_machine))
+        return 'poller'
+
+
+class _Client(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.virtual_machine_templates = _VirtualMachineTemplates()
+        self.virtual_machines = _VirtualMachines()
+
+
+@mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda _: _SUBSCRIPTION)
+class VmBlueprintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'blueprint.json')
+        self.cmd = mock.Mock()
+        self.client = _Client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _compile(self):
+        return compile_vm_blueprint(self.cmd, self.client, 'pc', 'template', 'pool', location='eastus',
+                                    number_of_cores='4',
+                                    nics=[{'name': 'nic2', 'virtual-network': 'vnet', 'adapter': 'E1000',
+                                           'power-on-boot': True}],
+                                    disks=[{'name': 'disk2', 'controller': '1000', 'mode': 'persistent',
+                                            'size': 41943040}],
+                                    blueprint_file=self.path)
+
+    def _edit(self, edit):
+        with open(self.path, 'r') as f:
+            content = json.load(f)
+        edit(content)
+        with open(self.path, 'w') as f:
+            json.dump(content, f)
+
+    def _create_error(self):
+        with self.assertRaises(CLIError) as context:
+            create_vm(self.cmd, self.client, 'rg', 'vm1', blueprint=self.path)
+        self.assertEqual(self.client.virtual_machines.created, [])
+        return str(context.exception)
+
+    def test_create_from_compiled_blueprint(self):
+        blueprint = self._compile()
+        self.assertEqual(blueprint['version'], BLUEPRINT_VERSION)
+        self.assertTrue(blueprint['hash'].startswith('sha256:'))
+        with open(self.path, 'r') as f:
+            self.assertEqual(json.load(f), json.loads(json.dumps(blueprint)))
+
+        self.assertEqual(create_vm(self.cmd, self.client, 'rg', 'vm1', blueprint=self.path), 'poller')
+        # The blueprint is sent as it is, without reading the vm-template again.
+        self.assertEqual(self.client.virtual_machine_templates.reads, 1)
+        [(resource_group_name, vm_name, virtual_machine)] = self.client.virtual_machines.created
+        self.assertEqual((resource_group_name, vm_name), ('rg', 'vm1'))
+        self.assertEqual(virtual_machine.serialize(), blueprint['virtualMachine'])
+        self.assertEqual(virtual_machine.number_of_cores, 4)
+        self.assertEqual([nic.nic_type for nic in virtual_machine.nics], ['VMXNET3', 'E1000'])
+        self.assertEqual([disk.total_size for disk in virtual_machine.disks], [16777216, 41943040])
+
+    def test_modified_blueprint_is_refused(self):
+        self._compile()
+
+        def _more_cores(content):
+            content['virtualMachine']['properties']['numberOfCores'] = 8
+        self._edit(_more_cores)
+        self.assertIn('content hash of blueprint', self._create_error())
+
+    def test_blueprint_of_another_version_is_refused(self):
+        self._compile()
+
+        def _next_version(content):
+            content['version'] = BLUEPRINT_VERSION + 1
+        self._edit(_next_version)
+        self.assertIn('is not a valid blueprint', self._create_error())
+
+    def test_unreadable_blueprint_is_refused(self):
+        with open(self.path, 'w') as f:
+            f.write('{"version": ')
+        self.assertIn('Unable to read blueprint', self._create_error())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from knack.util import CLIError
+
+from azext_csvmware.custom import _read_vm_manifest, create_vm_batch
+from azext_csvmware.vendored_sdks.models import VirtualDisk, VirtualMachineTemplate, VirtualNetwork, VirtualNic
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+_PRIVATE_CLOUD = '/subscriptions/{}/providers/Microsoft.VMwareCloudSimple/locations/eastus/privateClouds/pc' \
+    .format(_SUBSCRIPTION)
+
+_MANIFEST = """
+defaults:
+  resource-group: rg
+  location: eastus
+  private-cloud: pc
+  template: template
+  resource-pool: pool
+vms:
+  - name: vm1
+  - name: vm2
+    cores: 4
+    nics:
+      - name: Network adapter 1
+        adapter: E1000E
+      - name: nic2
+        virtual-network: vnet
+        adapter: VMXNET3
+        power-on-boot: "false"
+    disks:
+      - name: disk2
+        controller: 1000
+        mode: persistent
+        size: "41943040"
+"""
+
+
+class _RawResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, resource_group_name, vm_name):
+        self.output = mock.Mock(id='/subscriptions/{}/resourceGroups/{}/providers/Microsoft.VMwareCloudSimple/'
+                                   'virtualMachines/{}'.format(_SUBSCRIPTION, resource_group_name, vm_name))
+        self.response = mock.Mock(headers={})
+
+
+class _VirtualMachineTemplates(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.reads = []
+
+    def get(self, location, private_cloud, template):
+        self.reads.append((location, private_cloud, template))
+        nic = VirtualNic(nic_type='VMXNET3', power_on_boot=True, network=VirtualNetwork(id='network'))
+        nic.virtual_nic_name = 'Network adapter 1'
+        disk = VirtualDisk(controller_id='1000', independence_mode='persistent', total_size=16777216)
+        disk.virtual_disk_name = 'Hard disk 1'
+        return VirtualMachineTemplate(amount_of_ram=1024, number_of_cores=2, private_cloud_id=_PRIVATE_CLOUD,
+                                      nics=[nic], disks=[disk])
+
+
+class _VirtualMachines(object):  # pylint: disable=too-few-public-methods
+    """
+    Accepts every creation, except those of the virtual machines named in failing.
+    """
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.created = {}
+        self._lock = threading.Lock()
+
+    def create_or_update(self, resource_group_name, vm_name, virtual_machine, raw=False, polling=True):  # pylint: disable=unused-argument
+        if vm_name in self.failing:
+            raise CLIError('Quota exceeded')
+        with self._lock:
+            self.created[vm_name] = virtual_machine
+        return mock.Mock(result=lambda: _RawResult(resource_group_name, vm_name))
+
+
+class _Client(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, failing=()):
+        self.virtual_machine_templates = _VirtualMachineTemplates()
+        self.virtual_machines = _VirtualMachines(failing)
+
+
+@mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda _: _SUBSCRIPTION)
+class VmCreateBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cmd = mock.Mock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _manifest(self, content):
+        path = os.path.join(self.directory, 'manifest.yaml')
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_manifest_defaults_and_conversions(self):
+        [vm1, vm2] = _read_vm_manifest(self._manifest(_MANIFEST))
+        self.assertEqual((vm1['vm_name'], vm1['resource_group_name'], vm1['template']), ('vm1', 'rg', 'template'))
+        self.assertNotIn('nics', vm1)
+        self.assertEqual(vm2['number_of_cores'], 4)
+        self.assertEqual(vm2['nics'][1], {'name': 'nic2', 'virtual-network': 'vnet', 'adapter': 'VMXNET3',
+                                          'power-on-boot': False})
+        self.assertEqual(vm2['disks'], [{'name': 'disk2', 'controller': '1000', 'mode': 'persistent',
+                                         'size': 41943040}])
+
+    def test_manifest_errors(self):
+        for (content, message) in [
+                ('vms: [{name: vm1, colour: red}]', 'Unknown key colour'),
+                ('- {template: t}', 'should have a name'),
+                ('vms: {name: vm1}', 'list of virtual machines'),
+                ('- {name: vm1, nics: [{name: nic1, adaptor: E1000}]}', 'Unknown key adaptor in nics of virtual '
+                                                                         'machine vm1'),
+                ('- {name: vm1, nics: [{name: nic1, power-on-boot: maybe}]}', 'power-on-boot should be true or false'),
+                ('- {name: vm1, nics: [{adapter: E1000}]}', 'name parameter not specified'),
+                ('- {name: vm1, disks: [{name: disk1, size: big}]}', 'Size should be a postive integer'),
+                ('- {name: vm1, disks: name=disk1}', 'should be a list'),
+                ('vms: [}', 'Unable to read manifest')]:
+            with self.assertRaises(CLIError) as context:
+                _read_vm_manifest(self._manifest(content))
+            self.assertIn(message, str(context.exception))
+
+    def test_create_from_manifest(self):
+        client = _Client()
+        results = create_vm_batch(self.cmd, client, manifest=self._manifest(_MANIFEST))
+        self.assertEqual([(result['name'], result['status']) for result in results],
+                         [('vm1', 'Succeeded'), ('vm2', 'Succeeded')])
+        self.assertTrue(results[1]['id'].endswith('/virtualMachines/vm2'))
+        # The vm-template is read once for the whole batch.
+        self.assertEqual(client.virtual_machine_templates.reads, [('eastus', 'pc', 'template')])
+
+        vm1 = client.virtual_machines.created['vm1']
+        vm2 = client.virtual_machines.created['vm2']
+        self.assertEqual((vm1.number_of_cores, vm2.number_of_cores), (2, 4))
+        self.assertEqual(vm1.private_cloud_id, _PRIVATE_CLOUD)
+        self.assertEqual([nic.nic_type for nic in vm1.nics], ['VMXNET3'])
+        self.assertEqual([(nic.nic_type, nic.power_on_boot) for nic in vm2.nics],
+                         [('E1000E', True), ('VMXNET3', False)])
+        self.assertTrue(vm2.nics[1].network.id.endswith('/privateClouds/pc/virtualnetworks/vnet'))
+        self.assertEqual([disk.total_size for disk in vm2.disks], [16777216, 41943040])
+
+    def test_create_count_with_name_prefix(self):
+        client = _Client()
+        results = create_vm_batch(self.cmd, client, resource_group_name='rg', location='eastus',
+                                  private_cloud='pc', template='template', resource_pool='pool',
+                                  count='3', name_prefix='web', amount_of_ram='2048', max_parallel=2)
+        self.assertEqual([result['name'] for result in results], ['web1', 'web2', 'web3'])
+        self.assertEqual(sorted(client.virtual_machines.created), ['web1', 'web2', 'web3'])
+        self.assertTrue(all(vm.amount_of_ram == '2048' for vm in client.virtual_machines.created.values()))
+
+    def test_partial_failure(self):
+        manifest = self._manifest(_MANIFEST + '  - name: vm3\n    template: ""\n')
+        client = _Client(failing=('vm1',))
+        results = create_vm_batch(self.cmd, client, manifest=manifest)
+        self.assertEqual([(result['name'], result['status']) for result in results],
+                         [('vm1', 'Failed'), ('vm2', 'Succeeded'), ('vm3', 'Failed')])
+        self.assertEqual(results[0]['error'], 'Quota exceeded')
+        self.assertEqual(results[2]['error'], 'template not specified for virtual machine vm3.')
+        self.assertEqual(list(client.virtual_machines.created), ['vm2'])
+
+    def test_partial_failure_without_wait(self):
+        client = _Client(failing=('vm2',))
+        with self.assertRaises(CLIError) as context:
+            create_vm_batch(self.cmd, client, manifest=self._manifest(_MANIFEST), no_wait=True)
+        self.assertIn('vm2: Quota exceeded', str(context.exception))
+        self.assertEqual(list(client.virtual_machines.created), ['vm1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+
+from knack.util import CLIError
+
+from azext_csvmware.custom import list_vm
+from azext_csvmware.vendored_sdks import models
+from azext_csvmware.vendored_sdks.models import VirtualMachinePaged
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_DEPENDENCIES = dict((name, model) for (name, model) in vars(models).items() if isinstance(model, type))
+_SUBSCRIPTIONS = {'sub1': '00000000-0000-0000-0000-000000000001', 'sub2': '00000000-0000-0000-0000-000000000002'}
+
+
+def _vm(subscription_id, resource_group, name, location='eastus'):
+    return {'id': '/subscriptions/{}/resourceGroups/{}/providers/Microsoft.VMwareCloudSimple/virtualMachines/{}'
+                  .format(subscription_id, resource_group, name),
+            'name': name, 'location': location,
+            'properties': {'privateCloudId': 'pc', 'amountOfRam': 1024, 'numberOfCores': 1}}
+
+
+class _VirtualMachines(object):
+    """
+    The virtual machines of a subscription, in a single page per scope, recording the scopes listed.
+    """
+
+    def __init__(self, subscription_id, vms, lists, failing=()):
+        self.subscription_id = subscription_id
+        self.vms = vms
+        self.lists = lists
+        self.failing = failing
+        self._lock = threading.Lock()
+
+    def _paged(self, resource_group, vms):
+        with self._lock:
+            self.lists.append((self.subscription_id, resource_group))
+        if resource_group in self.failing:
+            raise CLIError('Forbidden')
+        page = {'value': vms, 'nextLink': None}
+        return VirtualMachinePaged(lambda _: page, _DEPENDENCIES)
+
+    def list_by_subscription(self, **_):
+        return self._paged(None, self.vms)
+
+    def list_by_resource_group(self, resource_group_name, **_):
+        # The resource group of a resource id is case insensitive.
+        return self._paged(resource_group_name, [vm for vm in self.vms if
+                                                 '/resourcegroups/{}/'.format(resource_group_name.lower())
+                                                 in vm['id'].lower()])
+
+
+class _Profile(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, cli_ctx=None):
+        self.cli_ctx = cli_ctx
+
+    @staticmethod
+    def get_subscription(subscription):
+        return {'id': _SUBSCRIPTIONS[subscription]}
+
+
+@mock.patch('azure.cli.core._profile.Profile', _Profile)
+class VmListTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lists = []
+        sub1 = _SUBSCRIPTIONS['sub1']
+        sub2 = _SUBSCRIPTIONS['sub2']
+        self.clients = {
+            None: _VirtualMachines(sub1, [_vm(sub1, 'rg1', 'vm1'), _vm(sub1, 'RG1', 'vm2', 'westus'),
+                                          _vm(sub1, 'rg2', 'vm3')], self.lists),
+            sub2: _VirtualMachines(sub2, [_vm(sub2, 'rg1', 'vm4')], self.lists, failing=('rg2',)),
+        }
+        self.clients[sub1] = self.clients[None]
+        patcher = mock.patch('azext_csvmware._client_factory.cf_vmware_cs',
+                             lambda _, subscription_id=None: mock.Mock(virtual_machines=self.clients[subscription_id]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _list(self, **kwargs):
+        return list_vm(mock.Mock(), self.clients[None], **kwargs)
+
+    def test_single_resource_group(self):
+        for resource_group_name in [u'rg1', ('rg1',)]:
+            del self.lists[:]
+            self.assertEqual([vm.name for vm in self._list(resource_group_name=resource_group_name)],
+                             ['vm1', 'vm2'])
+            self.assertEqual(self.lists, [(_SUBSCRIPTIONS['sub1'], 'rg1')])
+
+    def test_resource_groups_and_subscriptions_are_listed_concurrently(self):
+        result = self._list(resource_group_name=['rg1', 'rg2'], subscriptions=['sub1'], max_parallel=2)
+        self.assertEqual(sorted(self.lists), [(_SUBSCRIPTIONS['sub1'], 'rg1'), (_SUBSCRIPTIONS['sub1'], 'rg2')])
+        self.assertEqual([vm.name for vm in result], ['vm1', 'vm2', 'vm3'])
+
+    def test_virtual_machines_listed_twice_are_merged(self):
+        # rg1 and RG1 are the same resource group: each virtual machine is returned once.
+        result = self._list(resource_group_name=['rg1', 'RG1'])
+        self.assertEqual(len(self.lists), 2)
+        self.assertEqual([vm.name for vm in result], ['vm1', 'vm2'])
+
+    def test_locations_filter_every_scope(self):
+        result = self._list(resource_group_name=['rg1'], subscriptions=['sub1', 'sub2'], locations=['EastUS'])
+        self.assertEqual([vm.name for vm in result], ['vm1', 'vm4'])
+
+    def test_failed_scope_is_reported(self):
+        with self.assertRaises(CLIError) as context:
+            self._list(resource_group_name=['rg1', 'rg2'], subscriptions=['sub2'])
+        self.assertEqual(str(context.exception), 'Unable to list virtual machines in resource group rg2 in '
+                                                 'subscription {}: Forbidden'.format(_SUBSCRIPTIONS['sub2']))
+
+    def test_paging_needs_a_single_scope(self):
+        with self.assertRaises(CLIError):
+            self._list(resource_group_name=['rg1', 'rg2'], max_items='10')
+        self.assertEqual(self.lists, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+
+import requests
+from knack.util import CLIError
+
+from azext_csvmware.custom import start_vm, stop_vm
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+_OPERATION = 'https://management.azure.com/subscriptions/s/providers/Microsoft.VMwareCloudSimple/' \
+             'locations/eastus/operationResults/{}'
+
+
+class _RawResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, output=None, headers=None):
+        self.output = output
+        self.response = requests.Response()
+        self.response.status_code = 202 if headers else 200
+        self.response.headers.update(headers or {})
+
+
+class _Operation(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name, status):
+        self.name = name
+        self.status = status
+        self.error = None
+
+
+class _VirtualMachines(object):
+    """
+    Starts a long running operation per virtual machine, except for those named in refused.
+    The operation of the virtual machines named in failing fails.
+    """
+
+    def __init__(self, refused=(), failing=()):
+        self.refused = refused
+        self.failing = failing
+        self.requests = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def _operation(self, action, resource_group_name, vm_name, stop_mode=None, raw=False, polling=True):
+        with self._lock:
+            self.requests.append((action, resource_group_name, vm_name, stop_mode, raw, polling))
+            self.threads.add(threading.current_thread().name)
+        if vm_name in self.refused:
+            raise CLIError('Conflict')
+        raw_result = _RawResult(headers={'Azure-AsyncOperation': _OPERATION.format(vm_name), 'Retry-After': '0'})
+        return mock.Mock(result=lambda: raw_result)
+
+    def start(self, resource_group_name, vm_name, **kwargs):
+        return self._operation('start', resource_group_name, vm_name, **kwargs)
+
+    def stop(self, resource_group_name, vm_name, stop_mode=None, **kwargs):
+        return self._operation('stop', resource_group_name, vm_name, stop_mode, **kwargs)
+
+
+class _Operations(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, virtual_machines):
+        self.virtual_machines = virtual_machines
+        self.polls = []
+
+    def get(self, region, operation_id, raw=False):  # pylint: disable=unused-argument
+        self.polls.append((region, operation_id))
+        status = 'Failed' if operation_id in self.virtual_machines.failing else 'Succeeded'
+        return _RawResult(_Operation(operation_id, status))
+
+
+class _Client(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, refused=(), failing=()):
+        self.virtual_machines = _VirtualMachines(refused, failing)
+        self.operations = _Operations(self.virtual_machines)
+
+
+def _statuses(results):
+    return [(result['name'], result['status'], result['error']) for result in results]
+
+
+class VmPowerTest(unittest.TestCase):
+
+    def test_single_virtual_machine_is_sent_as_it_is(self):
+        client = _Client()
+        poller = start_vm(client, 'rg', ['vm1'])
+        self.assertEqual(poller.result().response.status_code, 202)
+        self.assertEqual(client.virtual_machines.requests, [('start', 'rg', 'vm1', None, False, True)])
+        self.assertEqual(client.operations.polls, [])
+
+    def test_virtual_machines_are_started_in_parallel(self):
+        client = _Client()
+        results = start_vm(client, 'rg', ['vm1', 'vm2', 'vm3'], max_parallel=3)
+        self.assertEqual(_statuses(results), [('vm1', 'Succeeded', None), ('vm2', 'Succeeded', None),
+                                              ('vm3', 'Succeeded', None)])
+        self.assertEqual(sorted(request[2:] for request in client.virtual_machines.requests),
+                         [('vm1', None, True, False), ('vm2', None, True, False), ('vm3', None, True, False)])
+        self.assertNotIn(threading.current_thread().name, client.virtual_machines.threads)
+        # The operations are tracked by a single polling loop.
+        self.assertEqual(sorted(client.operations.polls), [('eastus', 'vm1'), ('eastus', 'vm2'), ('eastus', 'vm3')])
+
+    def test_ids_and_stop_mode(self):
+        client = _Client()
+        ids = ['/subscriptions/s/resourceGroups/{}/providers/Microsoft.VMwareCloudSimple/virtualMachines/{}'
+               .format(resource_group, vm_name) for (resource_group, vm_name) in [('rg1', 'vm1'), ('rg2', 'vm2')]]
+        results = stop_vm(client, stop_mode='shutdown', ids=ids)
+        self.assertEqual([(result['resourceGroup'], result['name']) for result in results],
+                         [('rg1', 'vm1'), ('rg2', 'vm2')])
+        self.assertEqual(sorted(request[:4] for request in client.virtual_machines.requests),
+                         [('stop', 'rg1', 'vm1', 'shutdown'), ('stop', 'rg2', 'vm2', 'shutdown')])
+
+    def test_partial_failure(self):
+        client = _Client(refused=('vm1',), failing=('vm3',))
+        results = start_vm(client, 'rg', ['vm1', 'vm2', 'vm3'])
+        self.assertEqual(_statuses(results), [('vm1', 'Failed', 'Conflict'), ('vm2', 'Succeeded', None),
+                                              ('vm3', 'Failed', 'Operation vm3 failed.')])
+        self.assertEqual(sorted(client.operations.polls), [('eastus', 'vm2'), ('eastus', 'vm3')])
+
+    def test_no_wait_does_not_poll(self):
+        client = _Client()
+        results = stop_vm(client, 'rg', ['vm1', 'vm2'], no_wait=True)
+        self.assertEqual(_statuses(results), [('vm1', 'Accepted', None), ('vm2', 'Accepted', None)])
+        self.assertEqual(client.operations.polls, [])
+
+    def test_no_wait_reports_the_requests_not_sent(self):
+        client = _Client(refused=('vm2',))
+        with self.assertRaises(CLIError) as context:
+            stop_vm(client, 'rg', ['vm1', 'vm2'], no_wait=True)
+        self.assertEqual(str(context.exception), 'vm2: Conflict. The requests for the other resources were accepted.')
+        self.assertEqual(len(client.virtual_machines.requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import requests
+from knack.util import CLIError
+from msrest import Deserializer
+
+from azext_csvmware import _config
+from azext_csvmware.custom import _update_vm_with_retry, add_vdisk, add_vnic
+from azext_csvmware.vendored_sdks import models
+from azext_csvmware.vendored_sdks.models import CSRPErrorException, VirtualMachine
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{"error": {"code": "PreconditionFailed", "message": "ETag mismatch"}}'  # pylint: disable=protected-access
+    response.headers.update(headers or {})
+    return response
+
+
+class _RawResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, output, headers):
+        self.output = output
+        self.response = _response(200, headers)
+
+
+class _VirtualMachines(object):
+    """
+    A VM whose ETag changes on every read. The first conflicting_writes writes fail with HTTP 412,
+    as if another writer had modified the VM between the read and the write.
+    Without ETags, the amount of RAM of the VM changes on each of the first conflicting_reads reads instead.
+    """
+
+    def __init__(self, etags=True, conflicting_writes=0, conflicting_reads=0):
+        self.etags = etags
+        self.conflicting_writes = conflicting_writes
+        self.conflicting_reads = conflicting_reads
+        self.reads = 0
+        self.writes = []
+
+    def get(self, resource_group_name, vm_name, raw=False):  # pylint: disable=unused-argument
+        self.reads += 1
+        amount_of_ram = 1024 * min(self.reads, self.conflicting_reads + 1)
+        virtual_machine = VirtualMachine(location='eastus', amount_of_ram=amount_of_ram, number_of_cores=1,
+                                         private_cloud_id='pc', tags={}, nics=[], disks=[])
+        if not raw:
+            return virtual_machine
+        headers = {'ETag': 'W/"{}"'.format(self.reads)} if self.etags else {}
+        return _RawResult(virtual_machine, headers)
+
+    def create_or_update(self, resource_group_name, vm_name, virtual_machine, custom_headers=None):  # pylint: disable=unused-argument
+        self.writes.append((virtual_machine, custom_headers))
+        if self.conflicting_writes:
+            self.conflicting_writes -= 1
+            raise CSRPErrorException(Deserializer(dict((name, model) for (name, model) in vars(models).items()
+                                                       if isinstance(model, type))), _response(412))
+        return 'poller'
+
+
+def _tag(virtual_machine):
+    virtual_machine.tags['edited'] = 'true'
+    return 'delta'
+
+
+@mock.patch.object(_config, 'VM_UPDATE_RETRY_BACKOFF', 0)
+class VmUpdateTest(unittest.TestCase):
+
+    def test_update_is_conditional_on_etag(self):
+        client = _VirtualMachines()
+        self.assertEqual(_update_vm_with_retry(client, 'rg', 'vm', _tag), ('poller', 'delta'))
+        [(virtual_machine, custom_headers)] = client.writes
+        self.assertEqual(custom_headers, {'If-Match': 'W/"1"'})
+        self.assertEqual(virtual_machine.tags, {'edited': 'true'})
+
+    def test_update_without_etag_compares_before_writing(self):
+        client = _VirtualMachines(etags=False)
+        self.assertEqual(_update_vm_with_retry(client, 'rg', 'vm', _tag), ('poller', 'delta'))
+        self.assertEqual(client.reads, 2)
+        self.assertEqual([custom_headers for (_, custom_headers) in client.writes], [None])
+
+    def test_update_without_etag_reapplies_on_a_changed_vm(self):
+        client = _VirtualMachines(etags=False, conflicting_reads=2)
+        self.assertEqual(_update_vm_with_retry(client, 'rg', 'vm', _tag), ('poller', 'delta'))
+        # Read 1 and 2 differ, so do read 2 and 3; read 3 and 4 match and the write is sent once.
+        self.assertEqual(client.reads, 4)
+        [(virtual_machine, _)] = client.writes
+        self.assertEqual((virtual_machine.amount_of_ram, virtual_machine.tags), (3072, {'edited': 'true'}))
+
+    @mock.patch.object(_config, 'VM_UPDATE_MAX_RETRIES', 1)
+    def test_update_without_etag_gives_up_after_max_retries(self):
+        client = _VirtualMachines(etags=False, conflicting_reads=5)
+        with self.assertRaises(CLIError):
+            _update_vm_with_retry(client, 'rg', 'vm', _tag)
+        self.assertEqual((client.reads, client.writes), (4, []))
+
+    def test_precondition_failed_reads_again_and_reapplies(self):
+        client = _VirtualMachines(conflicting_writes=2)
+        self.assertEqual(_update_vm_with_retry(client, 'rg', 'vm', _tag), ('poller', 'delta'))
+        self.assertEqual(client.reads, 3)
+        self.assertEqual([custom_headers['If-Match'] for (_, custom_headers) in client.writes],
+                         ['W/"1"', 'W/"2"', 'W/"3"'])
+        self.assertTrue(all(vm.tags == {'edited': 'true'} for (vm, _) in client.writes))
+
+    @mock.patch.object(_config, 'VM_UPDATE_MAX_RETRIES', 1)
+    def test_gives_up_after_max_retries(self):
+        client = _VirtualMachines(conflicting_writes=5)
+        with self.assertRaises(CLIError):
+            _update_vm_with_retry(client, 'rg', 'vm', _tag)
+        self.assertEqual(len(client.writes), 2)
+
+
+@mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda _: 'subscription')
+class VmAddNicDiskTest(unittest.TestCase):
+
+    def test_nics_are_added_in_a_single_update(self):
+        client = _VirtualMachines()
+        add_vnic(mock.Mock(), client, 'rg', 'vm', virtual_network='vnet1', adapter='E1000',
+                 nics=[{}, {'virtual-network': 'vnet2', 'adapter': 'VMXNET3', 'power-on-boot': 'True'}])
+        self.assertEqual(client.reads, 1)
+        [(virtual_machine, _)] = client.writes
+        # The arguments are the defaults of the nics given with --nic.
+        self.assertEqual([(nic.network.id.rsplit('/', 1)[-1], nic.nic_type, nic.power_on_boot)
+                          for nic in virtual_machine.nics],
+                         [('vnet1', 'E1000', False), ('vnet2', 'VMXNET3', True)])
+        self.assertTrue(virtual_machine.nics[0].network.id.startswith('/subscriptions/subscription/providers/'
+                                                                      'Microsoft.VMwareCloudSimple/locations/eastus/'
+                                                                      'privateClouds/pc/'))
+
+    def test_invalid_nics_are_not_sent(self):
+        for (kwargs, message) in [({}, 'usage error'),
+                                  ({'nics': [{'virtual-network': 'vnet1'}, {'adapter': 'E1000'}]},
+                                   'virtual-network parameter not specified'),
+                                  ({'virtual_network': 'vnet1', 'nics': [{'colour': 'red'}]}, 'Unknown key colour')]:
+            client = _VirtualMachines()
+            with self.assertRaises(CLIError) as context:
+                add_vnic(mock.Mock(), client, 'rg', 'vm', **kwargs)
+            self.assertIn(message, str(context.exception))
+            self.assertEqual((client.reads, client.writes), (0, []))
+
+    def test_disks_are_added_in_a_single_update(self):
+        client = _VirtualMachines()
+        add_vdisk(client, 'rg', 'vm', independence_mode='independent_persistent', size=41943040,
+                  disks=[{}, {'controller': '1001', 'size': 8388608}])
+        self.assertEqual(client.reads, 1)
+        [(virtual_machine, _)] = client.writes
+        self.assertEqual([(disk.controller_id, disk.independence_mode, disk.total_size)
+                          for disk in virtual_machine.disks],
+                         [('1000', 'independent_persistent', 41943040), ('1001', 'independent_persistent', 8388608)])
+
+    def test_invalid_disks_are_not_sent(self):
+        for (kwargs, message) in [({'disks': [{'size': '-1'}]}, 'Size should be a postive integer'),
+                                  ({'disks': [{'mode': 'persistent', 'colour': 'red'}]}, 'Unknown key colour')]:
+            client = _VirtualMachines()
+            with self.assertRaises(CLIError) as context:
+                add_vdisk(client, 'rg', 'vm', **kwargs)
+            self.assertIn(message, str(context.exception))
+            self.assertEqual((client.reads, client.writes), (0, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
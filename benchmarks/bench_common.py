@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+Helpers shared by the benchmark scripts: sample statistics, JSON baselines and their comparison.
+"""
+
+import json
+import platform
+import sys
+import time
+
+
+def stats(samples):
+    """
+    Summarizes samples, in milliseconds.
+    """
+    ordered = sorted(samples)
+    return {
+        'median_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'min_ms': round(ordered[0], 3),
+        'samples': len(ordered),
+    }
+
+
+def measure(func, repeat):
+    """
+    Calls func repeat times and returns the statistics of its duration.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return stats(samples)
+
+
+def add_report_arguments(parser):
+    parser.add_argument('--repeat', type=int, default=10, help='Samples per metric.')
+    parser.add_argument('--out', help='Write the results to this JSON baseline file.')
+    parser.add_argument('--compare', help='Compare the results with this JSON baseline file.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative increase of a median before it is a regression.')
+
+
+def compare(metrics, baseline, tolerance):
+    """
+    Prints the metrics next to the baseline. Returns the names of the regressed metrics.
+    """
+    regressions = []
+    print('{:<70} {:>10} {:>10} {:>8}'.format('metric', 'base (ms)', 'now (ms)', 'delta'))
+    for (name, current) in sorted(metrics.items()):
+        base = baseline.get('metrics', {}).get(name)
+        if base is None:
+            print('{:<70} {:>10} {:>10.2f} {:>8}'.format(name, '-', current['median_ms'], 'new'))
+            continue
+        delta = (current['median_ms'] - base['median_ms']) / base['median_ms'] if base['median_ms'] else 0
+        flag = ''
+        if delta > tolerance and current['median_ms'] - base['median_ms'] > 1:
+            regressions.append(name)
+            flag = ' REGRESSION'
+        print('{:<70} {:>10.2f} {:>10.2f} {:>+7.0%}{}'.format(name, base['median_ms'], current['median_ms'],
+                                                              delta, flag))
+    return regressions
+
+
+def report(args, metrics, **meta):
+    """
+    Writes the baseline file and prints the metrics, or their comparison with a baseline.
+    Exits with status 1 if a metric regressed.
+    """
+    from azure.cli.core import __version__ as core_version
+
+    meta.update({
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'azure-cli-core': core_version,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'repeat': args.repeat,
+    })
+
+    if args.out:
+        with open(args.out, 'w') as out_file:
+            json.dump({'meta': meta, 'metrics': metrics}, out_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            regressions = compare(metrics, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print('Regressions: ' + ', '.join(regressions))
+            sys.exit(1)
+    else:
+        for (name, current) in sorted(metrics.items()):
+            print('{:<70} median {:>9.2f} ms   p95 {:>9.2f} ms'.format(name, current['median_ms'], current['p95_ms']))
@@ -0,0 +1,439 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+Replays the recorded YAML cassettes of the scenario tests through the real VMwareCloudSimpleClient
+and the custom.py command functions, with no network, and measures where the time goes.
+
+Measured:
+    replay.*       A command function end to end: request building, the msrest pipeline and deserialization.
+                   Responses are served from the cassettes by a fake requests transport.
+    deserialize.*  msrest deserialization of a recorded payload into the SDK model.
+    serialize.*    msrest serialization of a recorded request body.
+    transform.*    todict and the table transformer applied to a command result, as az does for -o table.
+    scale.*        vm list, with and without --compact or --fields, over a synthetic fleet built from a recorded virtual machine
+                   (--scale, --page-size), and the deserialization of its pages by msrest and by the fast path
+                   of _fast_deserializer. The time to the first row of vm list --stream jsonl, and the memory
+                   retained by the result of vm list, are reported too.
+
+Usage:
+    python benchmarks/bench_replay.py [--repeat N] [--scale 1000,10000] [--page-size 100]
+                                      [--out FILE] [--compare FILE] [--tolerance RATIO]
+"""
+
+import argparse
+import copy
+import glob
+import json
+import os
+import re
+import time
+from collections import defaultdict
+
+from bench_common import add_report_arguments, measure, report, stats
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDINGS = os.path.join(REPO_ROOT, 'azext_csvmware', 'tests', 'latest', 'recordings')
+ARM = 'https://management.azure.com'
+SUBSCRIPTION_ID = '00000000-0000-0000-0000-000000000000'
+
+# Names used in the recordings.
+LOCATION = 'eastus'
+PRIVATE_CLOUD = 'avs-test-eastus'
+RESOURCE_POOL = 'resgroup-169'
+VIRTUAL_NETWORK = 'dvportgroup-85'
+TEMPLATE = 'vm-125'
+VM_RESOURCE_GROUP = 'az_cli_cs_test'
+VM_NAME = 'cli-test000001'
+LIST_RESOURCE_GROUP = 'cli_test_vmware_cs000001'
+
+
+def _key(method, url):
+    path = re.sub(r'^https?://[^/]+', '', url.split('?', 1)[0])
+    return method.upper(), path.lower()
+
+
+def load_cassettes(directory=RECORDINGS):
+    """
+    Returns the successful interactions of all the cassettes, as (method, url, status, headers, body) tuples.
+    """
+    import yaml
+
+    interactions = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.yaml'))):
+        with open(path, 'r') as cassette:
+            recorded = yaml.safe_load(cassette)
+        for interaction in recorded.get('interactions', []):
+            request, response = interaction['request'], interaction['response']
+            status = response['status']['code']
+            if status >= 300:
+                continue
+            headers = {key: values[0] for (key, values) in (response.get('headers') or {}).items()}
+            body = (response.get('body') or {}).get('string') or ''
+            interactions.append((request['method'], request['uri'], status, headers,
+                                 body.encode('utf-8') if not isinstance(body, bytes) else body))
+    return interactions
+
+
+class ReplayTransport(object):
+    """
+    Serves requests from recorded interactions, in recorded order and then cyclically, per method and path.
+    Retry-After headers are dropped so that replayed long running operations do not sleep.
+    Synthetic list sources can be registered for a path, see add_pages. Their pages are served after
+    latency seconds, to stand for the round trip of a request to Azure.
+    """
+
+    def __init__(self, interactions, latency=0):
+        self.latency = latency
+        self._recorded = defaultdict(list)
+        self._next = defaultdict(int)
+        self._pages = {}
+        for (method, url, status, headers, body) in interactions:
+            headers = {k: v for (k, v) in headers.items() if k.lower() != 'retry-after'}
+            self._recorded[_key(method, url)].append((status, headers, body))
+        self._patcher = None
+
+    def add_pages(self, path, items, page_size):
+        """
+        Serves items as a paged list on path. The pages are encoded once, up front.
+        """
+        pages = []
+        for start in range(0, max(len(items), 1), page_size):
+            next_link = None
+            if start + page_size < len(items):
+                next_link = ARM + path + '?api-version=2019-04-01&$skipToken=' + str(start + page_size)
+            pages.append(json.dumps({'value': items[start:start + page_size], 'nextLink': next_link}).encode('utf-8'))
+        self._pages[_key('GET', path)] = (pages, page_size)
+
+    def _respond(self, request):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        key = _key(request.method, request.url)
+        if key in self._pages:
+            (pages, page_size) = self._pages[key]
+            token = re.search(r'\$skipToken=(\d+)', request.url)
+            if self.latency:
+                time.sleep(self.latency)
+            status, headers, body = 200, {'Content-Type': 'application/json'}, \
+                pages[int(token.group(1)) // page_size if token else 0]
+        elif key in self._recorded:
+            responses = self._recorded[key]
+            status, headers, body = responses[self._next[key] % len(responses)]
+            self._next[key] += 1
+        else:
+            raise KeyError('No recorded response for ' + request.method + ' ' + request.url)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body  # pylint: disable=protected-access
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def __enter__(self):
+        from unittest import mock
+        transport = self
+
+        def _send(_, request, **__):
+            return transport._respond(request)  # pylint: disable=protected-access
+
+        self._patcher = mock.patch('requests.adapters.HTTPAdapter.send', _send)
+        self._patcher.start()
+        return self
+
+    def __exit__(self, *_):
+        self._patcher.stop()
+
+
+class _CliContext(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.data = {'subscription_id': SUBSCRIPTION_ID}
+
+
+class _Command(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.cli_ctx = _CliContext()
+
+
+def make_client():
+    from msrest.authentication import BasicTokenAuthentication
+    from azext_csvmware.vendored_sdks import VMwareCloudSimpleClient
+    from azext_csvmware._config import REFERER
+
+    client = VMwareCloudSimpleClient(BasicTokenAuthentication({'access_token': 'replay'}),
+                                     SUBSCRIPTION_ID, REFERER, base_url=ARM)
+    client.config.long_running_operation_timeout = 0
+    return client
+
+
+def _recorded_body(interactions, method, pattern):
+    for (recorded_method, url, _, _, body) in interactions:
+        if recorded_method == method and re.search(pattern, url, re.IGNORECASE) and body:
+            return json.loads(body.decode('utf-8'))
+    raise KeyError('No recorded body for ' + method + ' ' + pattern)
+
+
+def replay_scenarios(client):
+    """
+    The command functions to replay, as (name, callable) tuples.
+    """
+    from azext_csvmware import custom
+
+    vms = client.virtual_machines
+    return [
+        ('vm show', lambda: custom.get_vm(vms, VM_RESOURCE_GROUP, VM_NAME)),
+        ('vm list', lambda: list(custom.list_vm(_Command(), vms, resource_group_name=LIST_RESOURCE_GROUP))),
+        ('vm nic list', lambda: custom.list_vnics(_Command(), vms, VM_RESOURCE_GROUP, VM_NAME)),
+        ('vm disk list', lambda: custom.list_vdisks(_Command(), vms, VM_RESOURCE_GROUP, VM_NAME)),
+        ('private-cloud list', lambda: list(custom.list_private_cloud(_Command(), client.private_clouds,
+                                                                      LOCATION))),
+        ('private-cloud show', lambda: custom.show_private_cloud(client.private_clouds, PRIVATE_CLOUD, LOCATION)),
+        ('resource-pool list', lambda: list(custom.list_resource_pool(_Command(), client.resource_pools,
+                                                                      PRIVATE_CLOUD, LOCATION))),
+        ('resource-pool show', lambda: custom.show_resource_pool(client.resource_pools, PRIVATE_CLOUD,
+                                                                 RESOURCE_POOL, LOCATION)),
+        ('virtual-network list', lambda: list(custom.list_virtual_networks(_Command(), client.virtual_networks,
+                                                                           PRIVATE_CLOUD, RESOURCE_POOL, LOCATION))),
+        ('virtual-network show', lambda: custom.show_virtual_network(client.virtual_networks, PRIVATE_CLOUD,
+                                                                     VIRTUAL_NETWORK, LOCATION)),
+        ('vm-template list', lambda: list(custom.list_vm_template(_Command(), client.virtual_machine_templates,
+                                                                  PRIVATE_CLOUD, RESOURCE_POOL, LOCATION))),
+        ('vm-template show', lambda: custom.show_vm_template(client.virtual_machine_templates, PRIVATE_CLOUD,
+                                                             TEMPLATE, LOCATION)),
+        ('vm create (build request)', lambda: custom._build_virtual_machine(  # pylint: disable=protected-access
+            _Command(), client, client.virtual_machine_templates.get(LOCATION, PRIVATE_CLOUD, TEMPLATE),
+            VM_RESOURCE_GROUP, VM_NAME, PRIVATE_CLOUD, TEMPLATE, RESOURCE_POOL,
+            None, None, LOCATION, None, None, None)),
+    ]
+
+
+def to_output(result):
+    """
+    What the az invoker does to a command result before the output formatter sees it.
+    """
+    from knack.util import todict
+    from azure.cli.core.commands.transform import _add_resource_group
+
+    result = todict(result)
+    _add_resource_group(result)
+    return result
+
+
+def run_replay(interactions, repeat):
+    from azext_csvmware._format import transform_vm_table_output, transform_vm_table_list
+
+    client = make_client()
+    metrics = {}
+    with ReplayTransport(interactions):
+        for (name, scenario) in replay_scenarios(client):
+            scenario()
+            metrics['replay.' + name] = measure(scenario, repeat)
+
+        vm = client.virtual_machines.get(VM_RESOURCE_GROUP, VM_NAME)
+        metrics['transform.vm show'] = measure(lambda: transform_vm_table_output(to_output(vm)), repeat)
+        vm_list = [vm] * 10
+        metrics['transform.vm list (10)'] = measure(lambda: transform_vm_table_list(to_output(vm_list)), repeat)
+
+    deserialize = client.virtual_machines._deserialize  # pylint: disable=protected-access
+    serialize = client.virtual_machines._serialize  # pylint: disable=protected-access
+    payloads = [
+        ('VirtualMachine', _recorded_body(interactions, 'GET', '/virtualMachines/' + VM_NAME + r'\?')),
+        ('PrivateCloud', _recorded_body(interactions, 'GET', '/privateClouds/' + PRIVATE_CLOUD + r'\?')),
+        ('ResourcePool', _recorded_body(interactions, 'GET', '/resourcePools/' + RESOURCE_POOL + r'\?')),
+        ('VirtualNetwork', _recorded_body(interactions, 'GET', '/virtualNetworks/' + VIRTUAL_NETWORK + r'\?')),
+        ('VirtualMachineTemplate', _recorded_body(interactions, 'GET', '/virtualMachineTemplates/' + TEMPLATE + r'\?')),
+    ]
+    for (model, payload) in payloads:
+        metrics['deserialize.' + model] = measure(lambda: deserialize(model, payload),  # pylint: disable=cell-var-from-loop
+                                                  repeat)
+
+    put_body = deserialize('VirtualMachine', _recorded_body(interactions, 'PUT', r'/virtualMachines/[^/?]+\?'))
+    metrics['serialize.VirtualMachine'] = measure(lambda: serialize.body(put_body, 'VirtualMachine'), repeat)
+    return metrics
+
+
+def scaled_vms(interactions, count):
+    """
+    count copies of a recorded virtual machine, with distinct names and ids.
+    """
+    template = _recorded_body(interactions, 'GET', '/virtualMachines/' + VM_NAME + r'\?')
+    vms = []
+    for i in range(count):
+        vm = copy.deepcopy(template)
+        vm['name'] = 'vm' + str(i)
+        vm['id'] = template['id'].rsplit('/', 1)[0] + '/vm' + str(i)
+        vms.append(vm)
+    return vms
+
+
+def measure_pages(client, items, page_size, repeat):
+    """
+    Deserialization of the pages of a vm list, by msrest and by the fast path of _fast_deserializer,
+    which must build the same objects.
+    """
+    from msrest.serialization import Deserializer
+    from azext_csvmware._fast_deserializer import fast_pages
+    from azext_csvmware.vendored_sdks.models import VirtualMachinePaged
+
+    dependencies = client.virtual_machines._deserialize.dependencies  # pylint: disable=protected-access
+    pages = [{'value': items[start:start + page_size], 'nextLink': None}
+             for start in range(0, len(items), page_size)]
+
+    def _msrest():
+        paged = VirtualMachinePaged(None, dependencies)
+        return [list(Deserializer(dependencies)(paged, page).current_page) for page in pages]
+
+    def _fast():
+        paged = fast_pages(VirtualMachinePaged(None, dependencies))
+        return [list(paged._derserializer(paged, page).current_page) for page in pages]  # pylint: disable=protected-access
+
+    if _msrest() != _fast():
+        raise AssertionError('The fast deserializer does not build the same objects as msrest.')
+    return {
+        'scale.pages msrest ({})'.format(len(items)): measure(_msrest, repeat),
+        'scale.pages fast ({})'.format(len(items)): measure(_fast, repeat),
+    }
+
+
+def retained_memory(func):
+    """
+    The memory, in MB, still allocated by func when it returns, i.e. the size of its result.
+    """
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return round(size / 1e6, 1)
+
+
+class _FirstWrite(object):
+    """
+    An output file which records when it is first written to.
+    """
+
+    def __init__(self):
+        self.at = None
+
+    def write(self, _):
+        if self.at is None:
+            self.at = time.perf_counter()
+
+    def flush(self):
+        pass
+
+
+def measure_first_row(func, repeat):
+    """
+    Calls func(cmd) repeat times and returns the statistics of the time to its first output.
+    """
+    samples = []
+    for _ in range(repeat):
+        cmd = _Command()
+        cmd.cli_ctx.out_file = _FirstWrite()
+        start = time.perf_counter()
+        func(cmd)
+        samples.append((cmd.cli_ctx.out_file.at - start) * 1000)
+    return stats(samples)
+
+
+def measure_prefetch(client, path, items, page_size, latency_ms, repeat):
+    """
+    Returns the time of vm list --stream jsonl, with and without prefetching, when every page takes
+    latency_ms to be served.
+    """
+    from azext_csvmware import custom
+
+    metrics = {}
+    transport = ReplayTransport([], latency=latency_ms / 1000.0)
+    transport.add_pages(path, items, page_size)
+    with transport:
+        for depth in [0, 2]:
+            def _stream():
+                cmd = _Command()
+                cmd.cli_ctx.out_file = _FirstWrite()
+                custom.list_vm(cmd, client.virtual_machines, resource_group_name=VM_RESOURCE_GROUP,
+                               stream='jsonl', prefetch_depth=depth)  # pylint: disable=cell-var-from-loop
+            metrics['scale.vm list --stream jsonl, {} ms/page, --prefetch-depth {} ({})'.format(
+                latency_ms, depth, len(items))] = measure(_stream, repeat)
+    return metrics
+
+
+def run_scale(interactions, sizes, page_size, repeat, latency_ms=0):
+    """
+    Returns the scale.* metrics, and the memory retained by the results of vm list, by size.
+    If latency_ms is set, the effect of prefetching on pages served with this latency is measured too.
+    """
+    from azext_csvmware import custom
+    from azext_csvmware._format import transform_vm_table_list
+
+    client = make_client()
+    path = '/subscriptions/' + SUBSCRIPTION_ID + '/resourceGroups/' + VM_RESOURCE_GROUP + \
+        '/providers/Microsoft.VMwareCloudSimple/virtualMachines'
+    metrics = {}
+    memory = {}
+    for size in sizes:
+        items = scaled_vms(interactions, size)
+        transport = ReplayTransport([])
+        transport.add_pages(path, items, page_size)
+        with transport:
+            for (name, options) in [('vm list', {}), ('vm list --compact', {'compact': True}),
+                                    ('vm list --fields name status privateCloudId',
+                                     {'fields': ['name', 'status', 'privateCloudId']})]:
+                def _list_vm():
+                    return list(custom.list_vm(_Command(), client.virtual_machines,  # pylint: disable=cell-var-from-loop
+                                               resource_group_name=VM_RESOURCE_GROUP, **options))
+                if len(_list_vm()) != size:
+                    raise AssertionError(name + ' did not return ' + str(size) + ' virtual machines.')
+                metrics['scale.{} ({})'.format(name, size)] = measure(_list_vm, repeat)
+                memory['{} ({})'.format(name, size)] = retained_memory(_list_vm)
+            metrics['scale.vm list --stream jsonl, first row ({})'.format(size)] = measure_first_row(
+                lambda cmd: custom.list_vm(cmd, client.virtual_machines, resource_group_name=VM_RESOURCE_GROUP,
+                                           stream='jsonl'), repeat)
+            result = list(custom.list_vm(_Command(), client.virtual_machines, resource_group_name=VM_RESOURCE_GROUP))
+        metrics.update(measure_pages(client, items, page_size, repeat))
+        if latency_ms:
+            metrics.update(measure_prefetch(client, path, items, page_size, latency_ms, repeat))
+        metrics['scale.todict ({})'.format(size)] = measure(lambda: to_output(result), repeat)
+        as_dicts = to_output(result)
+        metrics['scale.table ({})'.format(size)] = measure(lambda: transform_vm_table_list(as_dicts), repeat)
+    return metrics, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline replay benchmarks of the csvmware extension.')
+    add_report_arguments(parser)
+    parser.add_argument('--scale', default='1000,10000',
+                        help='Comma-separated sizes of the synthetic vm list. Empty to skip.')
+    parser.add_argument('--page-size', type=int, default=100, help='Virtual machines per list page.')
+    parser.add_argument('--scale-repeat', type=int, default=3, help='Samples per scale metric.')
+    parser.add_argument('--latency-ms', type=int, default=20,
+                        help='Latency of a list page in the prefetch metrics. 0 to skip them.')
+    args = parser.parse_args()
+
+    interactions = load_cassettes()
+    metrics = run_replay(interactions, args.repeat)
+    memory = {}
+    sizes = [int(size) for size in args.scale.split(',') if size.strip()]
+    if sizes:
+        (scale_metrics, memory) = run_scale(interactions, sizes, args.page_size, args.scale_repeat,
+                                             args.latency_ms)
+        metrics.update(scale_metrics)
+        for (name, size) in sorted(memory.items()):
+            print('{:<70} retains {:>9.1f} MB'.format('memory.' + name, size))
+    report(args, metrics, cassettes=RECORDINGS, page_size=args.page_size, latency_ms=args.latency_ms,
+           retained_mb=memory)
+
+
+if __name__ == '__main__':
+    main()
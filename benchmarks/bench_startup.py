@@ -0,0 +1,149 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+Startup and per-command latency benchmarks for the csvmware extension. Runs offline.
+
+Measured:
+    import.*     Cold import of the extension, of the vendored SDK and of the profiling hooks registered
+                 when the arguments are loaded, each in a fresh interpreter in which azure.cli.core is
+                 already imported, as it is in az.
+    loader.*     Cold load_command_table and load_arguments of VmwareCsCommandsLoader, in a fresh interpreter.
+    client.*     cf_vmware_cs client construction, the first one and the following ones.
+    command.*    End to end latency of az csvmware commands, invoked in process against a local stub of ARM.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--out FILE] [--compare FILE] [--tolerance RATIO]
+
+--out writes the results as a JSON baseline. --compare reads a baseline, prints the deltas, and exits
+with status 1 if the median of a metric regressed by more than the tolerance (and by more than 1 ms).
+The extension must be importable, e.g. installed with 'pip install -e .'.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_common import add_report_arguments, measure, report, stats
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every probe runs in a fresh interpreter and prints the measured milliseconds.
+_PROBE_PRELUDE = '''
+import sys, time
+import azure.cli.core
+from azure.cli.core.mock import DummyCli
+'''
+
+PROBES = {
+    'import.extension': _PROBE_PRELUDE + '''
+start = time.perf_counter()
+import azext_csvmware
+print((time.perf_counter() - start) * 1000)
+''',
+    'import.vendored_sdk': _PROBE_PRELUDE + '''
+start = time.perf_counter()
+import azext_csvmware.vendored_sdks.models
+print((time.perf_counter() - start) * 1000)
+''',
+    'import.profiling': _PROBE_PRELUDE + '''
+start = time.perf_counter()
+import azext_csvmware._profiling
+elapsed = (time.perf_counter() - start) * 1000
+assert 'msrest' not in sys.modules, 'Registering the --profile hooks imports msrest.'
+print(elapsed)
+''',
+    'loader.command_table': _PROBE_PRELUDE + '''
+cli = DummyCli()
+start = time.perf_counter()
+from azext_csvmware import VmwareCsCommandsLoader
+VmwareCsCommandsLoader(cli_ctx=cli).load_command_table(None)
+print((time.perf_counter() - start) * 1000)
+''',
+    'loader.arguments': _PROBE_PRELUDE + '''
+cli = DummyCli()
+class _Invocation(object):
+    data = {'command_string': 'csvmware vm create'}
+cli.invocation = _Invocation()
+from azext_csvmware import VmwareCsCommandsLoader
+loader = VmwareCsCommandsLoader(cli_ctx=cli)
+loader.load_command_table(None)
+start = time.perf_counter()
+loader.load_arguments('csvmware vm create')
+print((time.perf_counter() - start) * 1000)
+''',
+}
+
+COMMANDS = [
+    'csvmware vm show -n vm1 -g rg0',
+    'csvmware vm list -g rg0',
+    'csvmware vm list',
+    'csvmware vm disk list --vm-name vm1 -g rg0',
+    'csvmware vm nic list --vm-name vm1 -g rg0',
+    'csvmware private-cloud list --location eastus',
+    'csvmware vm-template list -p MyPrivateCloud -r resgroup-169 --location eastus',
+    'csvmware vm start -n vm1 -g rg0',
+]
+
+
+def run_probes(repeat, env):
+    results = {}
+    for (name, code) in sorted(PROBES.items()):
+        samples = []
+        for _ in range(repeat):
+            output = subprocess.check_output([sys.executable, '-c', code], env=env, cwd=REPO_ROOT)
+            samples.append(float(output.decode('utf-8').strip().splitlines()[-1]))
+        results[name] = stats(samples)
+    return results
+
+
+def run_in_process(repeat):
+    """
+    Client construction and command latency, against the stub server.
+    """
+    from stub_server import StubArmServer, SyntheticResponder, fake_credentials, offline_cli
+
+    results = {}
+    fake_credentials()
+    with StubArmServer(SyntheticResponder(vm_count=100, rg_size=50)) as server:
+        cli = offline_cli(server.base_url)
+        from azext_csvmware._client_factory import cf_vmware_cs
+
+        results['client.first'] = measure(lambda: cf_vmware_cs(cli), 1)
+        results['client.next'] = measure(lambda: cf_vmware_cs(cli), repeat)
+
+        with open(os.devnull, 'w') as devnull:
+            for command in COMMANDS:
+                args = command.split() + ['-o', 'json']
+                # The first invocation builds the command index and imports the modules.
+                exit_code = cli.invoke(args, out_file=devnull)
+                if exit_code:
+                    raise RuntimeError('az ' + command + ' failed with exit code ' + str(exit_code))
+                results['command.' + command.replace('csvmware ', '', 1)] = measure(
+                    lambda: cli.invoke(args, out_file=devnull), repeat)  # pylint: disable=cell-var-from-loop
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline startup benchmarks of the csvmware extension.')
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    # A private configuration directory keeps the run offline and independent of the user's az setup.
+    config_dir = tempfile.mkdtemp(prefix='csvmware-bench-')
+    os.environ['AZURE_CONFIG_DIR'] = config_dir
+    os.environ['AZURE_CORE_COLLECT_TELEMETRY'] = 'no'
+    os.environ['AZURE_CORE_ONLY_SHOW_ERRORS'] = 'true'
+    os.environ.setdefault('AZURE_EXTENSION_DEV_SOURCES', os.path.dirname(REPO_ROOT))
+
+    metrics = run_probes(args.repeat, dict(os.environ))
+    metrics.update(run_in_process(args.repeat))
+
+    report(args, metrics)
+
+
+if __name__ == '__main__':
+    main()
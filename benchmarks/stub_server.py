@@ -0,0 +1,287 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+"""
+A local stand-in for the ARM endpoints used by the csvmware extension, so that benchmarks run offline.
+
+The server answers every request through a responder, a callable taking
+(method, path, query, body) and returning (status, body, headers).
+SyntheticResponder generates CloudSimple payloads of any size.
+
+offline_cli() returns an az CLI whose ARM endpoint is the stub, and whose credentials are faked,
+so that commands can be invoked end to end without logging in.
+"""
+
+import copy
+import json
+import re
+import threading
+import uuid
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+SUBSCRIPTION_ID = '00000000-0000-0000-0000-000000000000'
+TENANT_ID = '00000000-0000-0000-0000-000000000001'
+LOCATION = 'eastus'
+PRIVATE_CLOUD = 'MyPrivateCloud'
+PROVIDER = '/providers/Microsoft.VMwareCloudSimple'
+
+
+def _location_prefix():
+    return '/subscriptions/' + SUBSCRIPTION_ID + PROVIDER + '/locations/' + LOCATION
+
+
+def private_cloud_payload(name=PRIVATE_CLOUD):
+    return {
+        'id': _location_prefix() + '/privateClouds/' + name,
+        'location': LOCATION,
+        'name': name,
+        'type': 'Microsoft.VMwareCloudSimple/privateClouds',
+        'properties': {
+            'availabilityZoneId': 'az1', 'availabilityZoneName': 'AZ1', 'clustersNumber': 1,
+            'createdBy': 'admin@cloudsimple.local', 'createdOn': '2019-05-20T10:00:00Z',
+            'dnsServers': ['10.0.0.10'], 'expires': 'N/A', 'nsxType': 'Advanced',
+            'placementGroupId': 'n1', 'placementGroupName': 'Placement Group 1',
+            'privateCloudId': '00000000-0000-0000-0000-0000000000aa', 'resourcePools': [],
+            'state': 'operational', 'totalCpuCores': 128, 'totalNodes': 4, 'totalRam': 2048,
+            'totalStorage': 51.2, 'type': 'General', 'vSphereVersion': '6.7',
+            'vcenterFqdn': 'vcsa.cloudsimple.local', 'vcenterRefid': '10.0.0.1',
+            'virtualMachineTemplates': [], 'virtualNetworks': [], 'vrOpsEnabled': False,
+        },
+    }
+
+
+def resource_pool_payload(name='resgroup-169'):
+    return {
+        'id': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD + '/resourcePools/' + name,
+        'location': LOCATION,
+        'name': name,
+        'privateCloudId': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD,
+        'type': 'Microsoft.VMwareCloudSimple/resourcePools',
+        'properties': {'fullName': 'Datacenter/Cluster/' + name},
+    }
+
+
+def virtual_network_payload(name='dvportgroup-85'):
+    return {
+        'id': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD + '/virtualNetworks/' + name,
+        'location': LOCATION,
+        'name': name,
+        'assignable': True,
+        'type': 'Microsoft.VMwareCloudSimple/virtualNetworks',
+        'properties': {'privateCloudId': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD},
+    }
+
+
+def template_payload(name='vm-125'):
+    return {
+        'id': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD + '/virtualMachineTemplates/' + name,
+        'location': LOCATION,
+        'name': name,
+        'type': 'Microsoft.VMwareCloudSimple/virtualMachineTemplates',
+        'properties': {
+            'amountOfRam': 1024, 'numberOfCores': 1, 'exposeToGuestVM': False, 'guestOS': 'Ubuntu Linux (64-bit)',
+            'guestOSType': 'linux', 'path': 'Datacenter/Templates', 'vSphereNetworks': ['VM Network'],
+            'vSphereTags': [], 'vmwaretools': '10336',
+            'controllers': [{'id': '1000', 'name': 'SCSI controller 0', 'subType': 'LSI_PARALLEL', 'type': 'SCSI'}],
+            'disks': [_disk_payload(0)],
+            'nics': [_nic_payload(0)],
+            'privateCloudId': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD,
+        },
+    }
+
+
+def _disk_payload(index):
+    return {'controllerId': '1000', 'independenceMode': 'persistent', 'totalSize': 16777216,
+            'virtualDiskId': str(2000 + index), 'virtualDiskName': 'Hard disk ' + str(index + 1)}
+
+
+def _nic_payload(index):
+    return {'network': {'id': virtual_network_payload()['id'], 'name': 'Datacenter/Workload01',
+                        'assignable': True, 'location': LOCATION},
+            'nicType': 'VMXNET3', 'powerOnBoot': True, 'ipAddresses': ['10.0.0.' + str(index + 10)],
+            'macAddress': '00:50:56:00:00:%02x' % (index % 256),
+            'virtualNicId': str(4000 + index), 'virtualNicName': 'Network adapter ' + str(index + 1)}
+
+
+def vm_payload(resource_group, name, disks=1, nics=1):
+    return {
+        'id': '/subscriptions/' + SUBSCRIPTION_ID + '/resourceGroups/' + resource_group + PROVIDER +
+              '/virtualMachines/' + name,
+        'location': LOCATION,
+        'name': name,
+        'type': 'Microsoft.VMwareCloudSimple/virtualMachines',
+        'tags': {'owner': 'benchmark'},
+        'properties': {
+            'amountOfRam': 1024, 'numberOfCores': 1, 'exposeToGuestVM': False,
+            'controllers': [{'id': '1000', 'name': 'SCSI controller 0', 'subType': 'LSI_PARALLEL', 'type': 'SCSI'}],
+            'disks': [_disk_payload(i) for i in range(disks)],
+            'nics': [_nic_payload(i) for i in range(nics)],
+            'dnsname': name + '.cloudsimple.local', 'folder': 'Datacenter/vm', 'guestOS': 'Ubuntu Linux (64-bit)',
+            'guestOSType': 'linux', 'provisioningState': 'Succeeded', 'publicIP': None, 'status': 'running',
+            'privateCloudId': _location_prefix() + '/privateClouds/' + PRIVATE_CLOUD,
+            'resourcePool': resource_pool_payload(),
+            'templateId': template_payload()['id'],
+            'username': 'root', 'vmId': 'vm-' + name, 'vmwaretools': '10336',
+        },
+    }
+
+
+class SyntheticResponder(object):
+    """
+    Answers the CloudSimple and resource group APIs with generated payloads.
+    vm_count virtual machines are spread over resource groups of rg_size virtual machines,
+    and are listed page_size at a time.
+    """
+
+    def __init__(self, vm_count=50, page_size=100, rg_size=50, disks=1, nics=1):
+        self.vm_count = vm_count
+        self.page_size = page_size
+        self.rg_size = rg_size
+        self.disks = disks
+        self.nics = nics
+        self.base_url = None
+        self._vms = None
+        self._lock = threading.Lock()
+
+    def vms(self):
+        with self._lock:
+            if self._vms is None:
+                self._vms = [vm_payload('rg' + str(i // self.rg_size), 'vm' + str(i), self.disks, self.nics)
+                             for i in range(self.vm_count)]
+            return self._vms
+
+    def _page(self, path, items, query):
+        start = int(query.get('$skipToken', ['0'])[0])
+        size = int(query.get('$top', [self.page_size])[0])
+        body = {'value': items[start:start + size], 'nextLink': None}
+        if start + size < len(items):
+            body['nextLink'] = self.base_url + path + '?api-version=2019-04-01&$skipToken=' + str(start + size)
+        return 200, body, {}
+
+    def _operation(self):
+        url = (self.base_url + '/subscriptions/' + SUBSCRIPTION_ID + PROVIDER.lower() + '/locations/' + LOCATION +
+               '/operationresults/' + str(uuid.uuid4()) + '?api-version=2019-04-01')
+        return {'Azure-AsyncOperation': url, 'Location': url, 'Retry-After': '0'}
+
+    def __call__(self, method, path, query, body):  # pylint: disable=too-many-return-statements
+        lower = path.lower()
+        if re.search(r'/resourcegroups/[^/]+$', lower):
+            return 200, {'id': path, 'name': path.rsplit('/', 1)[-1], 'location': LOCATION,
+                         'properties': {'provisioningState': 'Succeeded'}}, {}
+        if '/operationresults/' in lower:
+            return 200, {'id': path, 'name': path.rsplit('/', 1)[-1], 'status': 'Succeeded',
+                         'startTime': '2019-11-01T08:03:09Z', 'endTime': '2019-11-01T08:03:19Z'}, {}
+        match = re.search(r'/resourcegroups/([^/]+)/providers/microsoft.vmwarecloudsimple/virtualmachines/([^/]+)(/start|/stop)?$', lower)
+        if match:
+            if match.group(3):
+                return 202, None, self._operation()
+            if method == 'PUT':
+                vm = copy.deepcopy(body or {})
+                vm.update({k: v for k, v in vm_payload(match.group(1), match.group(2)).items() if k not in vm})
+                return 201, vm, self._operation()
+            if method == 'DELETE':
+                return 202, None, self._operation()
+            return 200, vm_payload(match.group(1), match.group(2), self.disks, self.nics), {'ETag': '"1"'}
+        match = re.search(r'(/resourcegroups/([^/]+))?/providers/microsoft.vmwarecloudsimple/virtualmachines$', lower)
+        if match:
+            vms = self.vms()
+            if match.group(2):
+                vms = [vm for vm in vms if '/resourcegroups/' + match.group(2) + '/' in vm['id'].lower()]
+            return self._page(path, vms, query)
+        if lower.endswith('/privateclouds'):
+            return self._page(path, [private_cloud_payload()], query)
+        if re.search(r'/privateclouds/[^/]+$', lower):
+            return 200, private_cloud_payload(path.rsplit('/', 1)[-1]), {}
+        for (collection, payload) in [('resourcepools', resource_pool_payload),
+                                      ('virtualnetworks', virtual_network_payload),
+                                      ('virtualmachinetemplates', template_payload)]:
+            if lower.endswith('/' + collection):
+                return self._page(path, [payload()], query)
+            if re.search('/' + collection + '/[^/]+$', lower):
+                return 200, payload(path.rsplit('/', 1)[-1]), {}
+        return 404, {'error': {'code': 'NotFound', 'message': 'No stub for ' + method + ' ' + path}}, {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *_):  # pylint: disable=arguments-differ
+        pass
+
+    def _handle(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8')) if length else None
+        status, payload, headers = self.server.responder(self.command, url.path, parse_qs(url.query), body)
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for (key, value) in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_PUT = do_POST = do_PATCH = do_DELETE = _handle
+
+
+class StubArmServer(ThreadingMixIn, HTTPServer):
+    """
+    Serves a responder on a free local port, from a background thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, responder):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.responder = responder
+        self.base_url = 'http://127.0.0.1:' + str(self.server_address[1])
+        if hasattr(responder, 'base_url'):
+            responder.base_url = self.base_url
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
+        self.server_close()
+
+
+def fake_credentials():
+    """
+    Patches the az profile so that no login is needed. Returns the patchers, which are already started.
+    """
+    from unittest import mock
+    from msrest.authentication import BasicTokenAuthentication
+
+    def _get_login_credentials(*_, **__):
+        return BasicTokenAuthentication({'access_token': 'offline'}), SUBSCRIPTION_ID, TENANT_ID
+
+    patchers = [
+        mock.patch('azure.cli.core._profile.Profile.get_login_credentials', _get_login_credentials),
+        mock.patch('azure.cli.core._profile.Profile.get_subscription_id', lambda *_, **__: SUBSCRIPTION_ID),
+        mock.patch('azure.cli.core._profile.Profile.get_subscription',
+                   lambda *_, **__: {'id': SUBSCRIPTION_ID, 'tenantId': TENANT_ID,
+                                     'user': {'name': 'offline@example.com', 'type': 'user'}}),
+    ]
+    for patcher in patchers:
+        patcher.start()
+    return patchers
+
+
+def offline_cli(base_url):
+    """
+    Returns an az CLI whose ARM endpoint is the stub server.
+    fake_credentials() must have been called.
+    """
+    from azure.cli.core import get_default_cli
+
+    cli = get_default_cli()
+    cli.cloud.endpoints.resource_manager = base_url
+    return cli